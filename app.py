@@ -5,9 +5,19 @@ from flask import Flask
 from flask_cors import CORS
 
 import models  # noqa: F401 – ensure models are imported for migrations
+from auth.passwords import passwords
+from auth.ratelimit import login_limiter
 from auth.routes import auth_bp
+from auth.sessions import init_sessions
 from extensions import db, migrate
 from main.api_routes import api_bp
+from main.cache import result_cache
+from main.compression import init_compression
+from main.jobs import jobs
+from main.json_provider import init_json
+from main.metrics import init_metrics
+from main.profiling import init_profiling
+from main.querywatch import init_query_watch
 from main.routes import main_bp
 
 # Pytest sets this env var while running tests; skip guard when present
@@ -26,17 +36,34 @@ def create_app() -> Flask:
     app.config.from_pyfile("config.py")
 
     # ------------------------------------------------------------------
-    # 1a) If running tests under pytest, override to in-memory SQLite
-    #    (applies only when TESTING or during pytest collection)
+    # 1a) If running tests under pytest, override to in-memory SQLite, or
+    #    to the per-worker database tests/conftest.py puts in
+    #    TEST_DATABASE_URL (applies only when TESTING or during pytest runs)
     # ------------------------------------------------------------------
     if app.config.get("TESTING", False) or os.getenv(PYTEST_ENV_VAR):
-        app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+        app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv(
+            "TEST_DATABASE_URL", "sqlite:///:memory:"
+        )
+
+    # ------------------------------------------------------------------
+    # 1b) JSON encoding: orjson when installed (JSON_PROVIDER = "default"
+    #     keeps the stdlib encoder)
+    # ------------------------------------------------------------------
+    init_json(app)
 
     # ------------------------------------------------------------------
     # 2) Initialise extensions
     # ------------------------------------------------------------------
     db.init_app(app)
     migrate.init_app(app, db)
+    jobs.init_app(app)
+    result_cache.init_app(app)
+    passwords.init_app(app)
+    login_limiter.init_app(app)
+    init_sessions(app)
+    init_metrics(app)
+    init_profiling(app)
+    init_query_watch(app)
 
     # ------------------------------------------------------------------
     # 3) SAFETY GUARD – protect Postgres in dev/prod
@@ -52,7 +79,9 @@ def create_app() -> Flask:
             from sqlalchemy import inspect
 
             inspector = inspect(db.engine)
-            required_tables = {"users", "transactions"}
+            required_tables = {"users", "transactions", "analysis_jobs"}
+            if app.config["SESSION_BACKEND"] == "sql":
+                required_tables.add("user_sessions")
             missing = required_tables.difference(inspector.get_table_names())
             if missing:
                 missing_csv = ", ".join(sorted(missing))
@@ -89,6 +118,11 @@ def create_app() -> Flask:
     app.register_blueprint(main_bp)
     app.register_blueprint(api_bp)
 
+    # ------------------------------------------------------------------
+    # 6) Response compression (gzip / brotli) around the WSGI app
+    # ------------------------------------------------------------------
+    init_compression(app)
+
     return app
 
 
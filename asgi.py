@@ -0,0 +1,419 @@
+# asgi.py
+"""
+ASGI entry point.
+
+The read-heavy API endpoints (transaction listing, regression and A/B
+analysis) are served natively async: rows are fetched through SQLAlchemy's
+asyncio engine (asyncpg on Postgres, aiosqlite on SQLite) and stats + chart
+rendering run in a process pool, so a slow query or chart never pins the
+event loop. They share the Flask views' result cache entries, metrics
+(request durations and spans) and query watching; a request asking to be
+profiled is served by the Flask view instead. Session lookups and cache
+reads run on threads. Every other request is handed to the regular Flask
+app, so auth, CRUD and the HTML pages behave exactly as under WSGI.
+
+Run with:
+    uvicorn --factory asgi:create_asgi_app --workers 4
+"""
+
+import asyncio
+import contextvars
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from urllib.parse import parse_qs, parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+from flask import request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header, parse_etags
+
+from app import create_app
+from main.analysis import (
+    TRANSACTION_SHAPES,
+    ab_test_records,
+    ab_test_result,
+    filter_pairs,
+    grouped_regression_result,
+    listing_rows,
+    parse_ab_test_params,
+    parse_regression_args,
+    regression_result,
+    transactions_payload,
+)
+from main.arrow import ARROW_STREAM, JSON_MIMETYPE
+from main.cache import result_cache
+from main.compression import (
+    choose_encoding,
+    compressor_for,
+    encoded_etag,
+    not_modified_etag,
+    strip_etag_suffix,
+)
+from main.conditional import compute_etag, data_version_query
+from main.metrics import observe_request, span
+from main.queries import FILTER_PARAMS, parse_transaction_filters, transactions_select
+from main.querywatch import warn_if_suspicious, watch_queries
+from models import Transaction
+
+# sync dialect -> asyncio driver
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+CORS_ORIGIN = "http://localhost:3000"
+
+
+def async_database_url(url):
+    """Rewrite a sync SQLAlchemy URL to its asyncio driver equivalent."""
+    scheme, rest = url.split("://", 1)
+    dialect = scheme.split("+", 1)[0]
+    if dialect not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No asyncio driver configured for {dialect!r}")
+    return f"{ASYNC_DRIVERS[dialect]}://{rest}"
+
+
+class AsyncAPI:
+    """
+    ASGI app serving selected /api endpoints async and delegating the rest
+    to the wrapped Flask app.
+    """
+
+    def __init__(self, flask_app, database_url=None, executor=None):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.engine = create_async_engine(
+            async_database_url(
+                database_url or flask_app.config["SQLALCHEMY_DATABASE_URI"]
+            )
+        )
+        self.executor = executor or ProcessPoolExecutor(
+            max_workers=flask_app.config["ASYNC_CPU_WORKERS"] or None,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        # key -> asyncio.Future of an in-flight fetch + computation
+        self._in_flight = {}
+        self.coalesced = 0
+        # (method, path) -> (handler, the Flask endpoint serving it under WSGI)
+        self.routes = {
+            ("GET", "/api/transactions"): (
+                self.list_transactions,
+                "api.list_transactions",
+            ),
+            ("GET", "/api/analysis/regression"): (
+                self.regression,
+                "api.api_regression",
+            ),
+            ("GET", "/api/analysis/abtest"): (self.ab_test, "api.api_ab_test"),
+            ("POST", "/api/analysis/abtest"): (self.ab_test, "api.api_ab_test"),
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        route = None
+        if scope["type"] == "http":
+            route = self.routes.get((scope["method"], scope["path"]))
+        headers = {}
+        if route is not None:
+            headers = {
+                k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]
+            }
+            # Arrow (and 406) responses are produced by the Flask views, as
+            # are filtered listings, chartless regressions (served from the
+            # analytics store) and profiled requests
+            if (
+                not self._wants_json(headers.get("accept"))
+                or (
+                    scope["path"] == "/api/transactions"
+                    and self._has_filters(scope["query_string"])
+                )
+                or (
+                    scope["path"] == "/api/analysis/regression"
+                    and ("chart", "0") in parse_qsl(scope["query_string"].decode())
+                )
+                or self._wants_profile(headers, scope["query_string"])
+            ):
+                route = None
+        if route is None:
+            return await self.wsgi(scope, receive, send)
+
+        handler, endpoint = route
+        config = self.flask_app.config
+        started = time.perf_counter()
+        watch = nullcontext()
+        if config["QUERY_WATCH_ENABLED"]:
+            watch = watch_queries(
+                config["SLOW_QUERY_MS"], config["QUERY_WATCH_EXPLAIN"]
+            )
+        with watch as log:
+            status, data, extra = await self._respond(scope, receive, headers, handler)
+        if log is not None:
+            extra.append((b"x-query-count", str(len(log)).encode()))
+            warn_if_suspicious(self.flask_app, log, scope["method"], scope["path"])
+        await self._send(send, status, data, extra)
+        observe_request(
+            time.perf_counter() - started, endpoint, scope["method"], status
+        )
+
+    async def _respond(self, scope, receive, headers, handler):
+        """(status, body, headers) for a request to one of the async routes."""
+        user_id = await self._run_sync(self._session_user_id, headers.get("cookie", ""))
+        if not user_id:
+            # same behaviour as auth.utils.login_required
+            return 302, b"", [(b"location", b"/login")]
+
+        query_string = scope["query_string"].decode()
+        query = {k: v[0] for k, v in parse_qs(query_string).items()}
+        cors = []
+        vary = ["Accept"]
+        if headers.get("origin") == CORS_ORIGIN:
+            cors = [
+                (b"access-control-allow-origin", CORS_ORIGIN.encode()),
+                (b"access-control-allow-credentials", b"true"),
+            ]
+            vary.append("Origin")
+        config = self.flask_app.config
+        encoding = None
+        if config["COMPRESS_ENABLED"]:
+            encoding = choose_encoding(headers.get("accept-encoding"))
+            vary.append("Accept-Encoding")
+        cors.append((b"vary", ", ".join(vary).encode()))
+
+        etag = None
+        if scope["method"] == "GET":
+            # same tag as main.conditional.conditional_get gives under Flask;
+            # every route here reads all users' rows: table-wide version
+            version = tuple((await self._fetch(data_version_query()))[0])
+            items = parse_qsl(query_string, keep_blank_values=True)
+            etag = compute_etag(scope["path"], items, user_id, version)
+            if_none_match = strip_etag_suffix(headers.get("if-none-match", ""))
+            if parse_etags(if_none_match).contains(etag):
+                tag = not_modified_etag(
+                    f'"{etag}"', encoding, headers.get("if-none-match")
+                )
+                return 304, b"", cors + self._etag_headers(tag)
+
+        body = await self._read_body(receive)
+        status, payload = await handler(user_id, query, body)
+        data = self.flask_app.json.dumps(payload).encode()
+        extra = cors
+        if encoding and len(data) >= config["COMPRESS_MIN_SIZE"]:
+            compressor = compressor_for(
+                encoding, config["COMPRESS_LEVEL"], config["COMPRESS_BR_QUALITY"]
+            )
+            data = compressor.compress(data) + compressor.finish()
+            extra = extra + [(b"content-encoding", encoding.encode())]
+        else:
+            encoding = None
+        if etag and status == 200:
+            tag = f'"{etag}"'
+            if encoding:
+                tag = encoded_etag(tag, encoding)
+            extra = extra + self._etag_headers(tag)
+        return status, data, [(b"content-type", b"application/json")] + extra
+
+    # --- handlers -----------------------------------------------------------
+    # Each reads the same result_cache entries as the Flask view it replaces.
+
+    async def list_transactions(self, user_id, query, body):
+        shape = query.get("shape", "rows")
+        if shape not in TRANSACTION_SHAPES:
+            return 400, {"error": f"shape must be one of {TRANSACTION_SHAPES}"}
+        filters = parse_transaction_filters(query)  # unfiltered: all defaults
+        max_rows = self.flask_app.config["CACHE_MAX_ROWS"]
+
+        async def compute():
+            rows = await self._fetch(transactions_select(filters))
+            return transactions_payload(rows, shape)
+
+        return 200, await self._cached(
+            "transactions",
+            user_id,
+            (shape, tuple(sorted(filters.items()))),
+            compute,
+            cacheable=lambda payload: listing_rows(payload) <= max_rows,
+        )
+
+    async def regression(self, user_id, query, body):
+        try:
+            key = parse_regression_args(query)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+        group_by, hours, start_dt, end_dt = key
+
+        async def compute():
+            with span("regression.fetch"):
+                rows = await self._fetch(
+                    select(Transaction.date_time, Transaction.amount).order_by(
+                        Transaction.date_time
+                    )
+                )
+            with span("regression.filter"):
+                pairs = filter_pairs(rows, hours, start_dt, end_dt)
+            if group_by:
+                return await self._run_cpu(grouped_regression_result, pairs, group_by)
+            return await self._run_cpu(regression_result, pairs)
+
+        return 200, await self._cached("regression", user_id, key, compute)
+
+    async def ab_test(self, user_id, query, body):
+        params = n_resamples = None
+        if body:
+            try:
+                params = self.flask_app.json.loads(body)
+            except ValueError:
+                return 400, {"error": "Invalid JSON body"}
+            try:
+                n_resamples, _ = parse_ab_test_params(
+                    params, self.flask_app.config["RESAMPLING_MAX_RESAMPLES"]
+                )
+            except ValueError as e:
+                return 400, {"error": str(e)}
+
+        async def compute():
+            with span("abtest.fetch"):
+                rows = await self._fetch(
+                    select(
+                        Transaction.date_time,
+                        Transaction.description,
+                        Transaction.amount,
+                    )
+                )
+            with span("abtest.records"):
+                records = ab_test_records(rows)
+            if params is None:
+                return await self._run_cpu(ab_test_result, records)
+            # resampling already runs inside an executor process; don't nest
+            # pools
+            return await self._run_cpu(ab_test_result, records, params, n_resamples, 1)
+
+        key = None if params is None else json.dumps(params, sort_keys=True)
+        return 200, await self._cached("abtest", user_id, key, compute)
+
+    # --- helpers ------------------------------------------------------------
+
+    async def _fetch(self, stmt):
+        async with self.engine.connect() as conn:
+            return (await conn.execute(stmt)).all()
+
+    async def _run_cpu(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    @staticmethod
+    async def _run_sync(func, *args):
+        """
+        func(*args) on a thread, so blocking I/O (session store, cache file)
+        doesn't stall the event loop; in a copy of this context, so the SQL
+        it issues is still watched.
+        """
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(None, partial(context.run, func, *args))
+
+    async def _cached(self, endpoint, user_id, args, compute, cacheable=None):
+        """
+        The result_cache entry the Flask view keeps for these arguments, or
+        await compute() and store its result there. Concurrent misses with
+        the same arguments and data generation share one compute().
+        """
+        key, generation, value = await self._run_sync(
+            result_cache.lookup, endpoint, user_id, args
+        )
+        if value is None:
+            value = await self._shared((endpoint, args, generation), compute)
+            if cacheable is None or cacheable(value):
+                await self._run_sync(result_cache.store, key, value)
+        return value
+
+    async def _shared(self, key, compute):
+        """
+        Await compute(), but concurrent requests with the same key await a
+        single run instead of each fetching rows and occupying a pool
+        process.
+        """
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+        future = asyncio.ensure_future(compute())
+        self._in_flight[key] = future
+        try:
+            return await asyncio.shield(future)
+        finally:
+            if self._in_flight.get(key) is future:
+                del self._in_flight[key]
+
+    def _wants_profile(self, headers, query_string):
+        # the Flask app runs the profiler and checks the token
+        if not self.flask_app.config["PROFILING_ENABLED"]:
+            return False
+        names = {name for name, _ in parse_qsl(query_string.decode())}
+        return "x-profile" in headers or "_profile" in names
+
+    @staticmethod
+    def _has_filters(query_string):
+        names = {name for name, _ in parse_qsl(query_string.decode())}
+        return bool(names.intersection(FILTER_PARAMS))
+
+    @staticmethod
+    def _wants_json(accept):
+        if not accept:
+            return True
+        offered = [JSON_MIMETYPE, ARROW_STREAM]
+        best = parse_accept_header(accept, MIMEAccept).best_match(offered)
+        return best == JSON_MIMETYPE
+
+    @staticmethod
+    def _etag_headers(tag):
+        return [
+            (b"etag", tag.encode()),
+            (b"cache-control", b"private, no-cache"),
+        ]
+
+    def _session_user_id(self, cookie_header):
+        app = self.flask_app
+        with app.test_request_context(headers={"Cookie": cookie_header}):
+            sess = app.session_interface.open_session(app, request)
+            return sess.get("user_id") if sess is not None else None
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        more = True
+        while more:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more = message.get("more_body", False)
+        return b"".join(chunks)
+
+    @staticmethod
+    async def _send(send, status, body, headers):
+        headers = headers + [(b"content-length", str(len(body)).encode())]
+        await send(
+            {"type": "http.response.start", "status": status, "headers": headers}
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def create_asgi_app(database_url=None):
+    """ASGI application factory (use with `uvicorn --factory`)."""
+    return AsyncAPI(create_app(), database_url or os.getenv("ASYNC_DATABASE_URL"))
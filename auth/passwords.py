@@ -0,0 +1,127 @@
+# auth/passwords.py
+"""
+Bounded password hashing.
+
+pbkdf2/scrypt cost hundreds of milliseconds of CPU per call. Hashes are
+computed on a small thread pool (hashlib releases the GIL while it works),
+so at most PASSWORD_HASH_WORKERS run at once whatever the server's thread
+count. The calling request thread still waits for its result: the pool caps
+CPU use rather than freeing the caller. At most PASSWORD_HASH_MAX_PENDING
+calls may be queued or running at a time; beyond that, callers get
+PasswordHashingBusy straight away instead of piling up behind an attacker's
+requests.
+
+PASSWORD_HASH_METHOD defaults to the installed werkzeug's own default
+(scrypt on werkzeug 3, pbkdf2:sha256 on 2.x). Hashes weaker than it (a
+weaker function, lower cost parameters or a legacy plain digest) are
+detected by needs_rehash() so they can be upgraded after a successful
+login, while the plaintext is at hand. A hash is never replaced by a weaker
+one: configuring pbkdf2 leaves existing scrypt hashes alone.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when PASSWORD_HASH_MAX_PENDING hashes are already in flight."""
+
+
+# key derivation functions, weakest first
+KDF_STRENGTH = ("pbkdf2", "scrypt")
+# pbkdf2 digests that are always upgraded
+WEAK_DIGESTS = ("md5", "sha1")
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method=None):
+    # werkzeug expands e.g. "pbkdf2:sha256" to "pbkdf2:sha256:260000" in the
+    # hash; None is werkzeug's default method
+    kwargs = {} if method is None else {"method": method}
+    return generate_password_hash("", **kwargs).split("$", 1)[0]
+
+
+def _weaker(stored, target):
+    """Whether hash prefix stored is weaker than target ("scrypt:32768:8:1")."""
+    stored, target = stored.split(":"), target.split(":")
+    if stored[0] not in KDF_STRENGTH:
+        return True  # legacy plain digest or unknown
+    if stored[0] != target[0]:
+        return KDF_STRENGTH.index(stored[0]) < KDF_STRENGTH.index(target[0])
+    try:
+        if stored[0] == "pbkdf2":
+            # pbkdf2:<digest>:<iterations>
+            return stored[1] in WEAK_DIGESTS or int(stored[2]) < int(target[2])
+        # scrypt:<n>:<r>:<p>
+        return any(int(s) < int(t) for s, t in zip(stored[1:], target[1:]))
+    except (IndexError, ValueError):
+        return True
+
+
+class PasswordHasher:
+    """Flask extension owning the bounded hashing pool."""
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self.method = None  # werkzeug's default
+        self._workers = 2
+        self._max_pending = 16
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("PASSWORD_HASH_METHOD", None)
+        app.config.setdefault("PASSWORD_HASH_WORKERS", 2)
+        app.config.setdefault("PASSWORD_HASH_MAX_PENDING", 16)
+        self.method = app.config["PASSWORD_HASH_METHOD"]
+        self._workers = app.config["PASSWORD_HASH_WORKERS"]
+        self._max_pending = app.config["PASSWORD_HASH_MAX_PENDING"]
+        app.extensions["password_hasher"] = self
+
+    def _run(self, func, *args):
+        """
+        Run func(*args) on the pool and block until it returns. Raises
+        PasswordHashingBusy at once if PASSWORD_HASH_MAX_PENDING are in flight.
+        """
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="password-hash"
+                )
+                self._slots = threading.BoundedSemaphore(self._max_pending)
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHashingBusy()
+
+        def task():
+            try:
+                return func(*args)
+            finally:
+                self._slots.release()
+
+        try:
+            future = self._executor.submit(task)
+        except BaseException:
+            self._slots.release()
+            raise
+        return future.result()
+
+    def hash(self, password):
+        method = self.method or _method_prefix()
+        return self._run(generate_password_hash, password, method)
+
+    def check(self, pw_hash, password):
+        return self._run(check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """Whether pw_hash is weaker than PASSWORD_HASH_METHOD would make it."""
+        stored = pw_hash.split("$", 1)[0]
+        target = _method_prefix(self.method)
+        return stored != target and _weaker(stored, target)
+
+
+passwords = PasswordHasher()
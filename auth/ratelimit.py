@@ -0,0 +1,94 @@
+# auth/ratelimit.py
+"""
+Token-bucket rate limiting for the login and register endpoints.
+
+Every attempt takes one token from the client IP's bucket and, for logins,
+one from the bucket for that account from that IP, before any password
+hashing happens; an empty bucket means 429 with a Retry-After. Keying the
+account bucket by IP too means someone guessing at an account can't lock
+its owner out from another address. Buckets refill continuously at
+<per minute>/60 tokens per second up to their burst size.
+
+State is per process (so the effective limit scales with the worker count)
+and bounded: the least recently used buckets are dropped beyond
+LOGIN_RATE_LIMIT_MAX_KEYS. Behind a proxy, make request.remote_addr the
+client address (werkzeug's ProxyFix) or every client shares one bucket.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+class TokenBucket:
+    """Keyed token buckets: burst tokens each, refilled at rate per second."""
+
+    def __init__(self, burst, rate, max_keys=100_000, clock=time.monotonic):
+        self.burst = burst
+        self.rate = rate
+        self.max_keys = max_keys
+        self._clock = clock
+        self._buckets = OrderedDict()  # key -> (tokens, last refill time)
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Spend a token for key; 0 if allowed, else seconds until one is."""
+        now = self._clock()
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        if allowed:
+            return 0.0
+        return (1 - tokens) / self.rate if self.rate > 0 else float("inf")
+
+
+class LoginLimiter:
+    """Flask extension holding the per-IP and per-(account, IP) buckets."""
+
+    def __init__(self, app=None):
+        self.by_ip = self.by_account = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        config = app.config
+        config.setdefault("LOGIN_RATE_LIMIT_ENABLED", True)
+        config.setdefault("LOGIN_IP_BURST", 20)
+        config.setdefault("LOGIN_IP_PER_MINUTE", 10)
+        config.setdefault("LOGIN_ACCOUNT_BURST", 5)
+        config.setdefault("LOGIN_ACCOUNT_PER_MINUTE", 5)
+        config.setdefault("LOGIN_RATE_LIMIT_MAX_KEYS", 100_000)
+        self.configure(config)
+        app.extensions["login_limiter"] = self
+
+    def configure(self, config):
+        """(Re)build the buckets from config, dropping all state."""
+        max_keys = config["LOGIN_RATE_LIMIT_MAX_KEYS"]
+        self.by_ip = TokenBucket(
+            config["LOGIN_IP_BURST"], config["LOGIN_IP_PER_MINUTE"] / 60, max_keys
+        )
+        self.by_account = TokenBucket(
+            config["LOGIN_ACCOUNT_BURST"],
+            config["LOGIN_ACCOUNT_PER_MINUTE"] / 60,
+            max_keys,
+        )
+
+    def check(self, ip, account=None):
+        """Seconds the client must wait, or 0 if the attempt may proceed."""
+        if not current_app.config["LOGIN_RATE_LIMIT_ENABLED"]:
+            return 0.0
+        wait = self.by_ip.take(ip)
+        if not wait and account is not None:
+            wait = self.by_account.take((account.lower(), ip))
+        return wait
+
+
+login_limiter = LoginLimiter()
@@ -2,12 +2,27 @@
 
 
 from flask import Blueprint, flash, redirect, render_template, request, session, url_for
-from werkzeug.security import check_password_hash, generate_password_hash
+
+from extensions import db
+from models import User
+
+from .passwords import PasswordHashingBusy, passwords
+from .ratelimit import login_limiter
+from .utils import authenticate, retry_after_seconds
 
 auth_bp = Blueprint("auth", __name__, template_folder="../templates")
 
-# In-memory for now
-users = []
+
+def _too_many_attempts(template, wait):
+    flash("Too many attempts; try again later", "danger")
+    return render_template(template), 429, {"Retry-After": retry_after_seconds(wait)}
+
+
+@auth_bp.errorhandler(PasswordHashingBusy)
+def _hashing_busy(exc):
+    flash("Server busy; try again shortly", "danger")
+    template = "login.html" if request.endpoint == "auth.login" else "register.html"
+    return render_template(template), 503, {"Retry-After": "1"}
 
 
 @auth_bp.route("/")
@@ -19,8 +34,15 @@ def splash():
 def register():
     if request.method == "POST":
         email = request.form["email"]
-        pw_hash = generate_password_hash(request.form["password"])
-        users.append({"id": len(users) + 1, "email": email, "pw_hash": pw_hash})
+        wait = login_limiter.check(request.remote_addr)
+        if wait:
+            return _too_many_attempts("register.html", wait)
+        if User.query.filter_by(name=email).first():
+            flash("Email already registered", "danger")
+            return render_template("register.html"), 400
+        pw_hash = passwords.hash(request.form["password"])
+        db.session.add(User(name=email, password_hash=pw_hash))
+        db.session.commit()
         flash("Registered—please log in.", "success")
         return redirect(url_for("auth.login"))
     return render_template("register.html")
@@ -30,10 +52,12 @@ def register():
 def login():
     if request.method == "POST":
         email = request.form["email"]
-        pw = request.form["password"]
-        user = next((u for u in users if u["email"] == email), None)
-        if user and check_password_hash(user["pw_hash"], pw):
-            session["user_id"] = user["id"]
+        wait = login_limiter.check(request.remote_addr, email)
+        if wait:
+            return _too_many_attempts("login.html", wait)
+        user = authenticate(email, request.form["password"])
+        if user:
+            session["user_id"] = user.id
             return redirect(url_for("main.get_transactions"))
         flash("Invalid credentials", "danger")
     return render_template("login.html")
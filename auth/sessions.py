@@ -0,0 +1,192 @@
+# auth/sessions.py
+"""
+Server-side sessions (SESSION_BACKEND = "sql").
+
+The cookie carries only a signed random session id; the session data lives
+in the user_sessions table with an expiry, so sessions can be revoked (log
+out everywhere, or all sessions of a compromised account) and nothing but
+the id leaves the server. The default "cookie" backend keeps Flask's signed
+cookie sessions.
+
+To keep the row lookup off most requests, loaded sessions are cached in
+process for SESSION_CACHE_TTL seconds: a revocation made by another worker
+process takes effect there within that many seconds. Rows are rewritten
+only when the session changes or half its lifetime has passed, the id is
+rotated whenever the logged-in user changes, and expired rows are swept at
+most every SESSION_SWEEP_INTERVAL seconds.
+
+Reads and writes use their own connections, so they never commit or roll
+back the request's ORM session.
+"""
+
+import secrets
+import time
+from datetime import datetime, timezone
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from sqlalchemy import delete, insert, select, update
+from werkzeug.datastructures import CallbackDict
+
+from extensions import db
+from main.cache import MemoryCache
+from models import UserSession
+
+SESSION_BACKENDS = ("cookie", "sql")
+
+_table = UserSession.__table__
+
+
+def _utcnow():
+    # naive UTC like the other expiry columns
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = sid is None
+        self.expires_at = expires_at
+        self.loaded_user_id = self.get("user_id")
+        self.modified = False
+
+
+class SQLSessionInterface(SessionInterface):
+    salt = "server-side-session"
+    serializer = TaggedJSONSerializer()
+
+    def __init__(self, cache_ttl=5, sweep_interval=300):
+        self.cache_ttl = cache_ttl
+        self.sweep_interval = sweep_interval
+        self._cache = MemoryCache(max_entries=10000)
+        self._last_sweep = time.monotonic()
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt)
+
+    def _load(self, sid):
+        entry = self._cache.get(sid)
+        if entry is None:
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(_table.c.data, _table.c.expires_at).where(_table.c.id == sid)
+                ).first()
+            if row is None:
+                return None
+            entry = (row.data, row.expires_at)
+            self._cache.set(sid, entry, self.cache_ttl)
+        return entry
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie:
+            return ServerSession()
+        try:
+            sid = self._signer(app).unsign(cookie).decode()
+        except BadSignature:
+            return ServerSession()
+        entry = self._load(sid)
+        if entry is None or entry[1] < _utcnow():
+            return ServerSession()
+        return ServerSession(self.serializer.loads(entry[0]), sid, entry[1])
+
+    def _store(self, sid, user_id, data, expires_at):
+        values = {"user_id": user_id, "data": data, "expires_at": expires_at}
+        with db.engine.begin() as conn:
+            updated = conn.execute(
+                update(_table).where(_table.c.id == sid).values(**values)
+            ).rowcount
+            if not updated:
+                conn.execute(
+                    insert(_table).values(id=sid, created_at=_utcnow(), **values)
+                )
+        self._cache.set(sid, (data, expires_at), self.cache_ttl)
+
+    def delete(self, sids):
+        with db.engine.begin() as conn:
+            conn.execute(delete(_table).where(_table.c.id.in_(sids)))
+        for sid in sids:
+            self._cache.delete(sid)
+
+    def revoke_user(self, user_id):
+        """End every session of user_id; returns how many there were."""
+        with db.engine.connect() as conn:
+            sids = conn.scalars(
+                select(_table.c.id).where(_table.c.user_id == user_id)
+            ).all()
+        if sids:
+            self.delete(sids)
+        return len(sids)
+
+    def sweep(self):
+        """Delete expired sessions; returns the number removed."""
+        self._last_sweep = time.monotonic()
+        with db.engine.begin() as conn:
+            return conn.execute(
+                delete(_table).where(_table.c.expires_at < _utcnow())
+            ).rowcount
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.sid is not None and session.modified:
+                self.delete([session.sid])
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        now = _utcnow()
+        lifetime = app.permanent_session_lifetime
+        rotate = session.sid is not None and (
+            session.get("user_id") != session.loaded_user_id
+        )
+        refresh = session.expires_at is None or session.expires_at - now < lifetime / 2
+        if not (session.modified or rotate or refresh):
+            return
+
+        if rotate:
+            # a new login gets a new id so a planted cookie can't ride along
+            self.delete([session.sid])
+            session.sid = None
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        self._store(
+            session.sid,
+            session.get("user_id"),
+            self.serializer.dumps(dict(session)),
+            now + lifetime,
+        )
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        response.vary.add("Cookie")
+        if time.monotonic() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+
+def init_sessions(app):
+    """Install the session interface selected by SESSION_BACKEND."""
+    app.config.setdefault("SESSION_BACKEND", "cookie")
+    app.config.setdefault("SESSION_CACHE_TTL", 5)
+    app.config.setdefault("SESSION_SWEEP_INTERVAL", 300)
+    backend = app.config["SESSION_BACKEND"]
+    if backend not in SESSION_BACKENDS:
+        raise ValueError(f"SESSION_BACKEND must be one of {SESSION_BACKENDS}")
+    if backend == "sql":
+        app.session_interface = SQLSessionInterface(
+            cache_ttl=app.config["SESSION_CACHE_TTL"],
+            sweep_interval=app.config["SESSION_SWEEP_INTERVAL"],
+        )
@@ -1,8 +1,22 @@
 # auth/utils.py
 
+import math
+from collections import namedtuple
 from functools import wraps
 
-from flask import current_app, redirect, session, url_for
+from flask import current_app, redirect, request, session, url_for
+from sqlalchemy import select
+
+from extensions import db
+from main.cache import MemoryCache
+from models import User
+
+from .passwords import passwords
+
+# what handlers need of the logged-in user, cached across requests for
+# USER_CACHE_TTL seconds so it costs no query per request
+CachedUser = namedtuple("CachedUser", "id name")
+_user_cache = MemoryCache(max_entries=4096)
 
 
 def check_credentials(email: str, password: str):
@@ -29,3 +43,48 @@ def login_required(view):
         return view(*args, **kwargs)
 
     return wrapped
+
+
+def current_user():
+    """
+    The logged-in user as a CachedUser, or None. Looked up at most once per
+    request, and served from the process-wide cache when fresh.
+    """
+    # memoised in the WSGI environ: unlike g, it never outlives the request
+    environ = request.environ
+    if "auth.current_user" not in environ:
+        user_id = session.get("user_id")
+        user = _user_cache.get(user_id) if user_id else None
+        if user_id and user is None:
+            row = db.session.get(User, user_id)
+            if row is not None:
+                user = CachedUser(row.id, row.name)
+                ttl = current_app.config.get("USER_CACHE_TTL", 30)
+                _user_cache.set(user_id, user, ttl)
+        environ["auth.current_user"] = user
+    return environ["auth.current_user"]
+
+
+def forget_user(user_id: int):
+    """Drop a user from this process's cache, e.g. after it changed."""
+    _user_cache.delete(user_id)
+
+
+def authenticate(name: str, password: str):
+    """
+    The User with these credentials, or None. A hash made with outdated
+    parameters is replaced by one using PASSWORD_HASH_METHOD on success.
+    May raise PasswordHashingBusy.
+    """
+    user = db.session.execute(select(User).filter_by(name=name)).scalar_one_or_none()
+    if user is None or not passwords.check(user.password_hash, password):
+        return None
+    if passwords.needs_rehash(user.password_hash):
+        user.password_hash = passwords.hash(password)
+        db.session.commit()
+    return user
+
+
+def retry_after_seconds(wait: float) -> str:
+    """Retry-After header value for a wait in seconds."""
+    return str(max(1, math.ceil(wait)))
@@ -0,0 +1,115 @@
+"""
+Compare concurrent request throughput of the WSGI and ASGI serving modes.
+
+Start the app both ways against the same seeded database, e.g.:
+    gunicorn -w 1 --threads 8 -b 127.0.0.1:8001 "app:create_app()"
+    uvicorn --factory asgi:create_asgi_app --workers 1 --port 8002
+
+then drive each with the same load:
+    python benchmarks/bench_async_api.py http://127.0.0.1:8001 --concurrency 64
+    python benchmarks/bench_async_api.py http://127.0.0.1:8002 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from urllib.parse import urlsplit
+
+
+async def http_request(host, port, method, path, headers=None, body=b""):
+    """Minimal HTTP/1.1 client: one connection per request."""
+    reader, writer = await asyncio.open_connection(host, port)
+    lines = [f"{method} {path} HTTP/1.1", f"Host: {host}", "Connection: close"]
+    for name, value in (headers or {}).items():
+        lines.append(f"{name}: {value}")
+    lines.append(f"Content-Length: {len(body)}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    status_line, *header_lines = head.decode("latin-1").split("\r\n")
+    response_headers = {}
+    for line in header_lines:
+        name, _, value = line.partition(":")
+        response_headers.setdefault(name.strip().lower(), []).append(value.strip())
+    return int(status_line.split()[1]), response_headers, payload
+
+
+async def login(host, port, email, password):
+    body = json.dumps({"email": email, "password": password}).encode()
+    status, headers, _ = await http_request(
+        host, port, "POST", "/api/login", {"Content-Type": "application/json"}, body
+    )
+    if status != 200:
+        raise SystemExit(f"login failed with HTTP {status}")
+    return "; ".join(c.split(";", 1)[0] for c in headers.get("set-cookie", []))
+
+
+async def run(base_url, path, total, concurrency, email, password):
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    cookie = await login(host, port, email, password)
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            try:
+                status, _, _ = await http_request(
+                    host, port, "GET", path, {"Cookie": cookie}
+                )
+                if status != 200:
+                    errors += 1
+            except OSError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "url": base_url + path,
+        "requests": total,
+        "concurrency": concurrency,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(total / elapsed, 1),
+        "p50_ms": round(1000 * statistics.median(latencies), 1),
+        "p95_ms": round(1000 * latencies[int(0.95 * (len(latencies) - 1))], 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base_url")
+    parser.add_argument("--path", default="/api/analysis/regression")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--email", default="demo_user")
+    parser.add_argument("--password", default="password123")
+    args = parser.parse_args()
+    result = asyncio.run(
+        run(
+            args.base_url,
+            args.path,
+            args.requests,
+            args.concurrency,
+            args.email,
+            args.password,
+        )
+    )
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Compare JSON encoding of the transaction listing: stdlib vs orjson provider,
+row-oriented vs column-oriented payloads.
+
+Usage:
+    python benchmarks/bench_json.py --rows 100000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SECRET_KEY", "bench")
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from main.analysis import transactions_payload  # noqa: E402
+from main.json_provider import OrjsonProvider, orjson  # noqa: E402
+
+
+def make_rows(n):
+    start = datetime(2024, 1, 1)
+    return [
+        (i, start + timedelta(minutes=7 * i), Decimal(f"{(i * 37) % 10000}.25"), None)
+        for i in range(1, n + 1)
+    ]
+
+
+def best_of(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.app_context().push()
+    providers = {"stdlib": DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers["orjson"] = OrjsonProvider(app)
+    else:
+        print("orjson not installed; only the stdlib provider is measured")
+
+    header = ("rows", "shape", "build s", "provider", "encode s", "MB")
+    print("{:>9} {:>8} {:>8} {:>8} {:>9} {:>7}".format(*header))
+    for n in args.rows:
+        rows = make_rows(n)
+        for shape in ("rows", "columns"):
+            build, payload = best_of(lambda: transactions_payload(rows, shape), 1)
+            for name, provider in providers.items():
+                # response() is what jsonify uses (compact separators)
+                encode, response = best_of(
+                    lambda: provider.response(payload), args.repeat
+                )
+                size = len(response.get_data()) / 1e6
+                print(
+                    f"{n:>9,} {shape:>8} {build:>8.3f} {name:>8} "
+                    f"{encode:>9.3f} {size:>7.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Login latency for legitimate users (each logging in once from their own
+address) while attacker threads flood /api/login with wrong passwords for
+one account, with the rate limiter off and on.
+
+Usage:
+    python benchmarks/bench_login.py --attackers 16 --users 40
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["FLASK_SKIP_GUARD"] = "1"
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+
+def make_app(db_path, limited, users):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    from app import create_app
+    from auth.ratelimit import login_limiter
+    from extensions import db
+    from models import User
+
+    app = create_app()
+    app.config.update(COMPRESS_ENABLED=False, LOGIN_RATE_LIMIT_ENABLED=limited)
+    login_limiter.configure(app.config)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        pw_hash = generate_password_hash("correct horse")
+        for name in ["victim"] + [f"user{i}" for i in range(users)]:
+            db.session.add(User(name=name, password_hash=pw_hash))
+        db.session.commit()
+    return app
+
+
+def attacker(app, ip, stop, counts):
+    client = app.test_client()
+    while not stop.is_set():
+        resp = client.post(
+            "/api/login",
+            json={"email": "victim", "password": "guess"},
+            environ_base={"REMOTE_ADDR": ip},
+        )
+        counts[resp.status_code] = counts.get(resp.status_code, 0) + 1
+
+
+def run(app, attackers, users):
+    stop = threading.Event()
+    counts = [{} for _ in range(attackers)]
+    threads = [
+        threading.Thread(
+            target=attacker, args=(app, f"10.0.{i // 250}.{i % 250}", stop, c)
+        )
+        for i, c in enumerate(counts)
+    ]
+    for thread in threads:
+        thread.start()
+
+    latencies, ok = [], 0
+    began = time.perf_counter()
+    try:
+        for i in range(users):
+            start = time.perf_counter()
+            resp = app.test_client().post(
+                "/api/login",
+                json={"email": f"user{i}", "password": "correct horse"},
+                environ_base={"REMOTE_ADDR": f"192.0.2.{i % 250}"},
+            )
+            latencies.append(time.perf_counter() - start)
+            ok += resp.status_code == 200
+    finally:
+        elapsed = time.perf_counter() - began
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    total = {}
+    for c in counts:
+        for code, n in c.items():
+            total[code] = total.get(code, 0) + n
+    return latencies, ok, total, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--attackers", type=int, default=16)
+    parser.add_argument("--users", type=int, default=40)
+    args = parser.parse_args()
+
+    header = ("limiter", "ok", "logins/s", "p50 ms", "p95 ms", "attack/s", "429", "503")
+    print("{:>8} {:>5} {:>9} {:>8} {:>8} {:>9} {:>7} {:>7}".format(*header))
+    with tempfile.TemporaryDirectory() as tmp:
+        for limited in (False, True):
+            db_path = os.path.join(tmp, f"login-{limited}.db")
+            app = make_app(db_path, limited, args.users)
+            latencies, ok, codes, elapsed = run(app, args.attackers, args.users)
+            latencies.sort()
+            print(
+                "{:>8} {:>5} {:>9.1f} {:>8.1f} {:>8.1f} {:>9.1f} {:>7} {:>7}".format(
+                    "on" if limited else "off",
+                    f"{ok}/{len(latencies)}",
+                    len(latencies) / elapsed,
+                    statistics.median(latencies) * 1000,
+                    latencies[int(len(latencies) * 0.95)] * 1000,
+                    sum(codes.values()) / elapsed,
+                    codes.get(429, 0),
+                    codes.get(503, 0),
+                )
+            )
+
+
+if __name__ == "__main__":
+    main()
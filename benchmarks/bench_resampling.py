@@ -0,0 +1,46 @@
+"""
+Benchmark the permutation/bootstrap engine in main/stats/resampling.py.
+
+Usage:
+    python benchmarks/bench_resampling.py --rows 100000 --resamples 10000 --workers 8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from main.stats.resampling import bootstrap_ci, permutation_test  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000, help="rows per group")
+    parser.add_argument("--resamples", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    group_a = rng.normal(100.0, 15.0, args.rows).tolist()
+    group_b = rng.normal(100.5, 15.0, args.rows).tolist()
+
+    print(
+        f"{args.rows:,} rows/group, {args.resamples:,} resamples, "
+        f"{args.workers} worker(s)"
+    )
+    for name, func in (("permutation", permutation_test), ("bootstrap", bootstrap_ci)):
+        start = time.perf_counter()
+        result = func(
+            group_a, group_b, args.resamples, seed=args.seed, workers=args.workers
+        )
+        elapsed = time.perf_counter() - start
+        print(f"{name:<12} {elapsed:8.2f}s  {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Fixtures for the pytest-benchmark suite (benchmarks/perf_*.py, which plain
+`pytest` runs don't collect).
+
+Data sizes come from BENCH_SIZES (default "1000,100000"; add 1000000 for the
+full run) and every timed call runs BENCH_ROUNDS times (default 5) after one
+warm-up. Endpoint benchmarks use a SQLite file, plus Postgres when
+BENCH_POSTGRES_URL is set; its tables are dropped and recreated.
+The result cache is off so each round does the full work.
+
+Run with benchmarks/perf.py, or directly:
+    pytest benchmarks -o python_files="perf_*.py"
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+os.environ.setdefault("SECRET_KEY", "bench")
+os.environ["FLASK_SKIP_GUARD"] = "1"
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    # the plugin is optional (requirements-dev.txt)
+    collect_ignore_glob = ["perf_*.py"]
+
+SIZES = [int(n) for n in os.getenv("BENCH_SIZES", "1000,100000").split(",")]
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "5"))
+BACKENDS = ["sqlite"] + (["postgres"] if os.getenv("BENCH_POSTGRES_URL") else [])
+START = datetime(2024, 1, 1)
+INSERT_BATCH = 50_000
+
+
+@pytest.fixture
+def timed(benchmark):
+    """timed(func, *args) benchmarks func with fixed rounds, returns its result."""
+
+    def run(func, *args, **kwargs):
+        return benchmark.pedantic(
+            func, args=args, kwargs=kwargs, rounds=ROUNDS, warmup_rounds=1
+        )
+
+    return run
+
+
+@pytest.fixture(scope="session", params=SIZES, ids=lambda n: f"{n}rows")
+def size(request):
+    return request.param
+
+
+@pytest.fixture(scope="session")
+def synthetic(size):
+    """(datetimes, amounts) spread over two years, with a few outliers."""
+    rng = np.random.default_rng(42)
+    offsets = np.sort(rng.integers(0, 2 * 365 * 24 * 3600, size))
+    amounts = np.round(rng.gamma(2.0, 50.0, size), 2)
+    amounts[rng.integers(0, size, max(size // 100, 1))] *= 20
+    dts = [START + timedelta(seconds=int(s)) for s in offsets]
+    return dts, amounts.tolist()
+
+
+@pytest.fixture(scope="session")
+def records(synthetic):
+    """Transaction dicts shaped like main/data.py's."""
+    dts, amounts = synthetic
+    return [
+        {"dateTime": dt.isoformat(), "amount": amount}
+        for dt, amount in zip(dts, amounts)
+    ]
+
+
+def _database_url(backend, tmp_dir, size):
+    if backend == "postgres":
+        return os.environ["BENCH_POSTGRES_URL"]
+    return f"sqlite:///{tmp_dir / f'bench-{size}.db'}"
+
+
+@pytest.fixture(scope="session", params=BACKENDS)
+def bench_app(request, synthetic, size, tmp_path_factory):
+    os.environ["DATABASE_URL"] = _database_url(
+        request.param, tmp_path_factory.getbasetemp(), size
+    )
+    os.environ["CACHE_BACKEND"] = "none"
+    from werkzeug.security import generate_password_hash
+
+    from app import create_app
+    from extensions import db
+    from models import Transaction, User
+
+    app = create_app()
+    app.config.update(LOGIN_RATE_LIMIT_ENABLED=False)
+    dts, amounts = synthetic
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(name="bench", password_hash=generate_password_hash("bench"))
+        db.session.add(user)
+        db.session.commit()
+        rows = [
+            {"user_id": user.id, "date_time": dt, "amount": amount}
+            for dt, amount in zip(dts, amounts)
+        ]
+        for i in range(0, len(rows), INSERT_BATCH):
+            db.session.execute(db.insert(Transaction), rows[i : i + INSERT_BATCH])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def api_client(bench_app):
+    client = bench_app.test_client()
+    resp = client.post("/api/login", json={"email": "bench", "password": "bench"})
+    assert resp.status_code == 200
+    return client
@@ -0,0 +1,347 @@
+"""
+Load-test the app with a dashboard-like mix of logins, transaction CRUD,
+listings and analysis requests, and write a JSON report.
+
+By default a SQLite database is seeded in a temporary directory and served
+by gunicorn (started and stopped here); pass --url and --account to drive a
+server you started yourself:
+    python benchmarks/load_test.py --duration 30 --concurrency 16 \\
+        --workers 2 --threads 4 --rows 100000 --output load-report.json
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 \\
+        --account demo_user --password password123
+
+--mix sets the relative weight of each scenario, e.g.
+"list=40,regression=15,abtest=10,groups=10,create=10,update=8,delete=5,login=2".
+The report has requests/s, p50/p95/p99 latency and error rates overall and
+per scenario; the exit status is 1 if the error rate exceeds --max-error-rate.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+from bench_async_api import http_request
+
+os.environ.setdefault("SECRET_KEY", "load-test")
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_MIX = (
+    "list=40,regression=15,abtest=10,groups=10,create=10,update=8,delete=5,login=2"
+)
+START = datetime(2024, 1, 1)
+DAYS = 2 * 365
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; one of {sorted(SCENARIOS)}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(
+        int(round(pct / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1
+    )
+    return round(sorted_values[index] * 1000, 1)
+
+
+class VirtualUser:
+    """One logged-in client working through the mix."""
+
+    def __init__(self, host, port, email, password, rng):
+        self.host = host
+        self.port = port
+        self.email = email
+        self.password = password
+        self.rng = rng
+        self.cookie = ""
+        self.created = []
+
+    async def request(self, method, path, body=None):
+        headers = {"Cookie": self.cookie} if self.cookie else {}
+        payload = b""
+        if body is not None:
+            headers.update(JSON_HEADERS)
+            payload = json.dumps(body).encode()
+        status, response_headers, data = await http_request(
+            self.host, self.port, method, path, headers, payload
+        )
+        return status, response_headers, data
+
+    async def login(self):
+        status, headers, _ = await self.request(
+            "POST", "/api/login", {"email": self.email, "password": self.password}
+        )
+        if status == 200:
+            self.cookie = "; ".join(
+                c.split(";", 1)[0] for c in headers.get("set-cookie", [])
+            )
+        return status
+
+    def _random_day(self):
+        return START + timedelta(days=self.rng.randrange(DAYS))
+
+    async def list(self):
+        start = self._random_day()
+        end = start + timedelta(days=30)
+        path = (
+            f"/api/transactions?start={start:%Y-%m-%d}&end={end:%Y-%m-%d}"
+            "&include=total,count"
+        )
+        return (await self.request("GET", path))[0]
+
+    async def regression(self):
+        return (await self.request("GET", "/api/analysis/regression"))[0]
+
+    async def abtest(self):
+        return (await self.request("GET", "/api/analysis/abtest"))[0]
+
+    async def groups(self):
+        group_by = self.rng.choice(("weekday", "month", "time"))
+        path = f"/api/analysis/groups?group_by={group_by}"
+        return (await self.request("GET", path))[0]
+
+    async def create(self):
+        body = {
+            "dateTime": self._random_day().isoformat(),
+            "amount": round(self.rng.uniform(5, 500), 2),
+        }
+        status, _, data = await self.request("POST", "/api/transactions", body)
+        if status == 201:
+            self.created.append(json.loads(data)["id"])
+        return status
+
+    async def update(self):
+        if not self.created:
+            return await self.create()
+        txn_id = self.rng.choice(self.created)
+        body = {"amount": round(self.rng.uniform(5, 500), 2)}
+        return (await self.request("PUT", f"/api/transactions/{txn_id}", body))[0]
+
+    async def delete(self):
+        if not self.created:
+            return await self.create()
+        txn_id = self.created.pop()
+        return (await self.request("DELETE", f"/api/transactions/{txn_id}"))[0]
+
+
+SCENARIOS = {
+    name: getattr(VirtualUser, name)
+    for name in (
+        "list",
+        "regression",
+        "abtest",
+        "groups",
+        "create",
+        "update",
+        "delete",
+        "login",
+    )
+}
+
+
+async def drive(host, port, args, mix):
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    samples = {name: [] for name in names}  # name -> [(seconds, status)]
+    deadline = time.perf_counter() + args.duration
+
+    async def run_user(index):
+        rng = random.Random(args.seed + index)
+        email = args.account[index % len(args.account)]
+        user = VirtualUser(host, port, email, args.password, rng)
+        if await user.login() != 200:
+            raise SystemExit(f"login as {email!r} failed")
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            start = time.perf_counter()
+            try:
+                status = await SCENARIOS[name](user)
+            except OSError:
+                status = None
+            samples[name].append((time.perf_counter() - start, status))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(run_user(i) for i in range(args.concurrency)))
+    return samples, time.perf_counter() - started
+
+
+def summarise(samples, elapsed):
+    latencies = sorted(seconds for seconds, _ in samples)
+    errors = sum(1 for _, status in samples if status is None or status >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "requests_per_second": round(len(samples) / elapsed, 1),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": percentile(latencies, 100),
+    }
+
+
+def seed_database(db_path, users, rows, password, seed):
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ["FLASK_SKIP_GUARD"] = "1"
+    sys.path.insert(0, ROOT)
+    from werkzeug.security import generate_password_hash
+
+    from app import create_app
+    from extensions import db
+    from models import Transaction, User
+
+    rng = random.Random(seed)
+    app = create_app()
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        pw_hash = generate_password_hash(password)
+        accounts = [User(name=f"load{i}", password_hash=pw_hash) for i in range(users)]
+        db.session.add_all(accounts)
+        db.session.commit()
+        mappings = [
+            {
+                "user_id": accounts[i % users].id,
+                "date_time": START + timedelta(seconds=rng.randrange(DAYS * 86400)),
+                "amount": round(rng.gammavariate(2.0, 50.0), 2),
+            }
+            for i in range(rows)
+        ]
+        db.session.execute(db.insert(Transaction), mappings)
+        db.session.commit()
+
+
+def start_server(port, args, env):
+    cmd = [
+        "gunicorn",
+        "-w",
+        str(args.workers),
+        "--threads",
+        str(args.threads),
+        "-b",
+        f"127.0.0.1:{port}",
+        "--log-level",
+        "warning",
+        "app:create_app()",
+    ]
+    server = subprocess.Popen(cmd, cwd=ROOT, env=env)
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"gunicorn exited with status {server.returncode}")
+        try:
+            asyncio.run(http_request("127.0.0.1", port, "GET", "/api/me"))
+            return server
+        except OSError:
+            time.sleep(0.25)
+    server.terminate()
+    raise SystemExit("gunicorn did not start within 60s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--url", help="drive this server instead of starting one")
+    parser.add_argument("--duration", type=float, default=30, help="seconds")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX)
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=20_000, help="seeded rows")
+    parser.add_argument("--users", type=int, default=8, help="accounts to seed")
+    parser.add_argument(
+        "--account",
+        action="append",
+        help="account to log in as (repeatable); default: the seeded ones",
+    )
+    parser.add_argument("--password", default="load-test")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="load-report.json")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+    if not args.account:
+        if args.url:
+            parser.error("--url needs at least one --account")
+        args.account = [f"load{i}" for i in range(args.users)]
+
+    server = None
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            parts = urlsplit(args.url)
+            host, port = parts.hostname, parts.port or 80
+        else:
+            host, port = "127.0.0.1", args.port
+            db_path = os.path.join(tmp, "load.db")
+            seed_database(db_path, args.users, args.rows, args.password, args.seed)
+            env = {
+                **os.environ,
+                "DATABASE_URL": f"sqlite:///{db_path}",
+                "FLASK_SKIP_GUARD": "1",
+                # every virtual user logs in from 127.0.0.1
+                "LOGIN_RATE_LIMIT_ENABLED": "0",
+            }
+            server = start_server(port, args, env)
+        started_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        try:
+            samples, elapsed = asyncio.run(drive(host, port, args, mix))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=30)
+
+    everything = [s for per_scenario in samples.values() for s in per_scenario]
+    status_codes = {}
+    for _, status in everything:
+        key = str(status) if status is not None else "connection_error"
+        status_codes[key] = status_codes.get(key, 0) + 1
+    report = {
+        "started_at": started_at,
+        "target": args.url or f"gunicorn -w {args.workers} --threads {args.threads}",
+        "duration_s": round(elapsed, 3),
+        "concurrency": args.concurrency,
+        "mix": mix,
+        "seeded_rows": None if args.url else args.rows,
+        "totals": summarise(everything, elapsed),
+        "scenarios": {name: summarise(s, elapsed) for name, s in samples.items()},
+        "status_codes": status_codes,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+
+    header = ("scenario", "requests", "req/s", "p50 ms", "p95 ms", "p99 ms", "errors")
+    print("{:>10} {:>9} {:>8} {:>8} {:>8} {:>8} {:>7}".format(*header))
+    rows = list(report["scenarios"].items()) + [("total", report["totals"])]
+    for name, s in rows:
+        print(
+            "{:>10} {:>9} {:>8} {:>8} {:>8} {:>8} {:>7}".format(
+                name,
+                s["requests"],
+                s["requests_per_second"],
+                s["p50_ms"] if s["p50_ms"] is not None else "-",
+                s["p95_ms"] if s["p95_ms"] is not None else "-",
+                s["p99_ms"] if s["p99_ms"] is not None else "-",
+                s["errors"],
+            )
+        )
+    print(f"report written to {args.output}")
+    return 1 if report["totals"]["error_rate"] > args.max_error_rate else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
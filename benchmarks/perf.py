@@ -0,0 +1,58 @@
+"""
+Save a pytest-benchmark baseline, or compare against the latest one and fail
+on regressions.
+
+Usage:
+    python benchmarks/perf.py save
+    python benchmarks/perf.py check --max-regression 10
+    BENCH_SIZES=1000,100000,1000000 python benchmarks/perf.py save
+
+Baselines are stored per machine under benchmarks/.benchmarks. `check` exits
+non-zero if any benchmark's median is more than --max-regression percent
+slower than in the latest saved run. Extra arguments go to pytest, e.g.
+`check -k api`.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+STORAGE = "file://" + os.path.join(HERE, ".benchmarks")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=("save", "check"))
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        default=10.0,
+        help="percent slowdown of the median that fails `check`",
+    )
+    parser.add_argument("--name", default="baseline", help="label for `save`")
+    args, pytest_args = parser.parse_known_args()
+
+    cmd = [
+        sys.executable,
+        "-m",
+        "pytest",
+        HERE,
+        "-o",
+        "python_files=perf_*.py",
+        "--benchmark-only",
+        f"--benchmark-storage={STORAGE}",
+    ]
+    if args.command == "save":
+        cmd.append(f"--benchmark-save={args.name}")
+    else:
+        cmd += [
+            "--benchmark-compare",
+            f"--benchmark-compare-fail=median:{args.max_regression:g}%",
+        ]
+    return subprocess.call(cmd + pytest_args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
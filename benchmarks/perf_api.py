@@ -0,0 +1,19 @@
+"""API endpoints over BENCH_SIZES synthetic rows, per database backend."""
+
+import pytest
+
+ENDPOINTS = [
+    "/api/transactions",
+    "/api/transactions?shape=columns",
+    "/api/transactions?include=total,count&min_amount=100",
+    "/api/analysis/regression",
+    "/api/analysis/abtest",
+    "/api/analysis/groups?group_by=weekday",
+]
+
+
+@pytest.mark.benchmark(group="api")
+@pytest.mark.parametrize("url", ENDPOINTS)
+def test_endpoint(timed, api_client, url):
+    resp = timed(api_client.get, url)
+    assert resp.status_code == 200
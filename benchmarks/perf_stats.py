@@ -0,0 +1,56 @@
+"""Statistics and chart rendering at BENCH_SIZES rows."""
+
+import pytest
+
+from main.analysis import regression_result
+from main.stats.abtest import remove_outliers, run_ab_test, t_test
+from main.stats.regression import compute_regression
+
+AB_GROUPS = {
+    "half": ("1", "2"),
+    "weekday": ("0", "5"),
+    "time": ("morning", "evening"),
+    "month": ("1", "7"),
+}
+
+
+@pytest.mark.benchmark(group="stats")
+def test_remove_outliers(timed, synthetic):
+    kept = timed(remove_outliers, synthetic[1])
+    assert len(kept) < len(synthetic[1])
+
+
+@pytest.mark.benchmark(group="stats")
+def test_t_test(timed, synthetic):
+    amounts = synthetic[1]
+    mid = len(amounts) // 2
+    t_stat, p_value = timed(t_test, amounts[:mid], amounts[mid:])
+    assert p_value is not None
+
+
+@pytest.mark.benchmark(group="stats")
+def test_compute_regression(timed, synthetic):
+    pairs = [(dt.timestamp(), amount) for dt, amount in zip(*synthetic)]
+    result = timed(compute_regression, pairs)
+    assert result["slope"] is not None
+
+
+@pytest.mark.benchmark(group="charts")
+@pytest.mark.parametrize("group_by", sorted(AB_GROUPS))
+def test_run_ab_test(timed, records, group_by):
+    param_a, param_b = AB_GROUPS[group_by]
+    result = timed(
+        run_ab_test,
+        group_by=group_by,
+        param_a=param_a,
+        param_b=param_b,
+        records=records,
+    )
+    assert result["boxplot_img"]
+
+
+@pytest.mark.benchmark(group="charts")
+def test_regression_chart(timed, synthetic):
+    pairs = list(zip(*synthetic))
+    result = timed(regression_result, pairs)
+    assert result["chart_img"]
@@ -12,3 +12,86 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 SECRET_KEY = os.getenv("SECRET_KEY")
 if not SECRET_KEY:
     raise RuntimeError("SECRET_KEY not set in .env")
+
+# Password hashing: werkzeug method for new hashes (unset: werkzeug's
+# default; weaker hashes are upgraded on login), hashing threads and the cap
+# on queued + running hashes
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+
+# Login/register token buckets per client IP and per account (per process)
+LOGIN_RATE_LIMIT_ENABLED = os.getenv("LOGIN_RATE_LIMIT_ENABLED", "1") == "1"
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_ACCOUNT_BURST = int(os.getenv("LOGIN_ACCOUNT_BURST", "5"))
+LOGIN_ACCOUNT_PER_MINUTE = float(os.getenv("LOGIN_ACCOUNT_PER_MINUTE", "5"))
+
+# Sessions: "cookie" (Flask signed cookies) or "sql" (user_sessions table,
+# revocable); seconds a loaded session / user is cached in process, and
+# between sweeps of expired session rows
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "cookie")
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "5"))
+SESSION_SWEEP_INTERVAL = int(os.getenv("SESSION_SWEEP_INTERVAL", "300"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+
+# Prometheus metrics at /metrics (request/SQL/pool timings, stage spans);
+# METRICS_TOKEN, if set, is required as a bearer token to scrape
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0") == "1"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# On-demand cProfile + SQL capture of single requests tagged with
+# "X-Profile: <PROFILING_TOKEN>"; profiles go to PROFILE_DIR (default
+# instance/profiles) and only the newest PROFILE_KEEP are kept
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN")
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+# Development query watch: X-Query-Count on every response, and warnings for
+# statements repeated QUERY_WATCH_REPEAT+ times in a request (N+1) or slower
+# than SLOW_QUERY_MS (with their EXPLAIN plan on Postgres)
+QUERY_WATCH_ENABLED = os.getenv("QUERY_WATCH_ENABLED", "0") == "1"
+QUERY_WATCH_REPEAT = int(os.getenv("QUERY_WATCH_REPEAT", "3"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+QUERY_WATCH_EXPLAIN = os.getenv("QUERY_WATCH_EXPLAIN", "1") == "1"
+
+# Server-rendered /transactions listing: rows per page
+TRANSACTIONS_PER_PAGE = int(os.getenv("TRANSACTIONS_PER_PAGE", "50"))
+
+# Permutation/bootstrap A/B tests: process-pool size and per-request cap
+RESAMPLING_WORKERS = int(os.getenv("RESAMPLING_WORKERS", "1"))
+RESAMPLING_MAX_RESAMPLES = int(os.getenv("RESAMPLING_MAX_RESAMPLES", "100000"))
+
+# Incremental analytics store: seconds before a forced rebuild (0 = never)
+ANALYTICS_STORE_TTL = float(os.getenv("ANALYTICS_STORE_TTL", "0"))
+
+# ASGI mode (asgi.py): process-pool size for stats/charts (0 = one per CPU)
+ASYNC_CPU_WORKERS = int(os.getenv("ASYNC_CPU_WORKERS", "0"))
+
+# Background analysis jobs: worker threads (0 = run inline), result lifetime
+# in seconds, the cap on queued + running jobs, and the seconds after which a
+# job still queued or running (its worker died) is marked failed
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", "600"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "32"))
+JOB_TIMEOUT = int(os.getenv("JOB_TIMEOUT", "900"))
+
+# Result cache for analysis/list endpoints: "sqlite" (file shared by all
+# workers on a host), "memory" (per process, single worker only) or "none";
+# TTL in seconds. Listings of more than CACHE_MAX_ROWS rows aren't cached.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_TTL = int(os.getenv("CACHE_TTL", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_ROWS = int(os.getenv("CACHE_MAX_ROWS", "5000"))
+CACHE_PATH = os.getenv("CACHE_PATH")  # sqlite backend; default instance/
+
+# JSON encoder: "orjson" (falls back to stdlib if not installed) or "default"
+JSON_PROVIDER = os.getenv("JSON_PROVIDER", "orjson")
+
+# Response compression: gzip/brotli for text-like bodies of at least
+# COMPRESS_MIN_SIZE bytes (streamed bodies are always compressed)
+COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "1") == "1"
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "4"))
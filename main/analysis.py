@@ -0,0 +1,255 @@
+# main/analysis.py
+"""
+Request-independent analysis pipelines (stats + chart rendering) shared by
+the Flask API and the ASGI entry point. Nothing here touches the database
+or the request, so these functions can also run in executor processes.
+Charts are drawn on standalone Figure objects rather than pyplot's global
+state so they are safe to render from worker threads.
+"""
+
+import base64
+import io
+from datetime import datetime
+
+import matplotlib.dates as mdates
+import numpy as np
+from matplotlib.figure import Figure
+
+from .metrics import span
+from .stats import abtest
+from .stats.grouping import GROUP_BY_OPTIONS, group_codes
+from .stats.regression import compute_regression, grouped_regression
+
+# Hours included by the regression "period" filter
+PERIOD_HOURS = {
+    "morning": range(0, 12),
+    "noon": (12,),
+    "afternoon": range(13, 18),
+}
+
+
+# Response layouts for GET /transactions: list of objects or object of lists
+TRANSACTION_SHAPES = ("rows", "columns")
+
+
+def transactions_payload(rows, shape="rows"):
+    """
+    JSON-ready listing from (id, date_time, amount, description) rows, either
+    one object per row or, for shape="columns", one array per field.
+    """
+    ids = [r[0] for r in rows]
+    dates = [r[1].isoformat() for r in rows]
+    amounts = [float(r[2]) for r in rows]
+    descriptions = [r[3] for r in rows]
+    if shape == "columns":
+        return {
+            "id": ids,
+            "dateTime": dates,
+            "amount": amounts,
+            "description": descriptions,
+        }
+    return [
+        {"id": i, "dateTime": d, "amount": a, "description": desc}
+        for i, d, a, desc in zip(ids, dates, amounts, descriptions)
+    ]
+
+
+def listing_rows(payload):
+    """Number of transactions in a listing payload, with or without aggregates."""
+    if isinstance(payload, dict) and "transactions" in payload:
+        payload = payload["transactions"]
+    if isinstance(payload, dict):  # shape=columns
+        return len(payload["id"])
+    return len(payload)
+
+
+def parse_regression_filters(args):
+    """
+    Parse period/start_date/end_date query params into (hours, start, end).
+    Raises ValueError on a malformed date.
+    """
+    hours = PERIOD_HOURS.get(args.get("period", "all").lower())
+    start_str = args.get("start_date")
+    end_str = args.get("end_date")
+    start_dt = datetime.fromisoformat(start_str) if start_str else None
+    end_dt = datetime.fromisoformat(end_str) if end_str else None
+    return hours, start_dt, end_dt
+
+
+def parse_regression_args(args):
+    """
+    (group_by, hours, start_dt, end_dt) from regression query args, hashable
+    so it can key caches; ValueError (-> 400) on a bad group_by or date.
+    """
+    group_by = args.get("group_by")
+    if group_by and group_by not in GROUP_BY_OPTIONS:
+        raise ValueError(f"group_by must be one of {GROUP_BY_OPTIONS}")
+    try:
+        hours, start_dt, end_dt = parse_regression_filters(args)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid date format")
+    return group_by, tuple(hours or ()), start_dt, end_dt
+
+
+def filter_pairs(rows, hours, start_dt, end_dt):
+    """
+    Keep (datetime, amount) rows inside the date range and hours, with
+    amounts converted to float.
+    """
+    pairs = []
+    for dt, amount in rows:
+        if (start_dt and dt < start_dt) or (end_dt and dt > end_dt):
+            continue
+        if hours and dt.hour not in hours:
+            continue
+        pairs.append((dt, float(amount)))
+    return pairs
+
+
+def regression_result(pairs):
+    """
+    Fit and chart for (datetime, amount) pairs, shaped like the
+    /analysis/regression response.
+    """
+    if not pairs:
+        return {
+            "slope": None,
+            "intercept": None,
+            "r_squared": None,
+            "chart_img": None,
+        }
+
+    with span("regression.stats"):
+        ts_amounts = [(d.timestamp(), a) for d, a in pairs]
+        stats = compute_regression(ts_amounts)
+        slope = float(stats["slope"])
+        intercept = float(stats["intercept"])
+        r_squared = float(stats["r_squared"])
+
+    with span("regression.chart"):
+        fig = Figure(figsize=(8, 4))
+        ax = fig.subplots()
+        dates = [d for d, _ in pairs]
+        amounts = [a for _, a in pairs]
+        ax.scatter(dates, amounts, alpha=0.6, label="Data")
+        xs = np.array([d.timestamp() for d in dates])
+        ax.plot(dates, intercept + slope * xs, linewidth=2, label="Trend")
+
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        fig.autofmt_xdate()
+        ax.set_title("Regression Analysis")
+        ax.set_ylabel("Amount")
+        ax.legend()
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight")
+    with span("regression.encode"):
+        chart_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+
+    return {
+        "slope": slope,
+        "intercept": intercept,
+        "r_squared": r_squared,
+        "chart_img": chart_b64,
+    }
+
+
+def grouped_regression_result(pairs, group_by):
+    """
+    One fit per group plus a single chart with each group's points and line.
+    """
+    with span("regression.stats"):
+        dates = [d for d, _ in pairs]
+        amounts = [a for _, a in pairs]
+        xs = np.array([d.timestamp() for d in dates])
+        codes, labels = group_codes(dates, group_by)
+        fits = grouped_regression(xs, amounts, codes, labels)
+    if not fits:
+        return {"group_by": group_by, "groups": [], "chart_img": None}
+
+    with span("regression.chart"):
+        fig = Figure(figsize=(8, 4))
+        ax = fig.subplots()
+        amounts = np.array(amounts)
+        dates = np.array(dates, dtype="datetime64[s]")
+        for fit in fits:
+            mask = codes == labels.index(fit["label"])
+            points = ax.scatter(dates[mask], amounts[mask], alpha=0.4, s=10)
+            if fit["slope"] is not None:
+                ax.plot(
+                    dates[mask],
+                    fit["intercept"] + fit["slope"] * xs[mask],
+                    linewidth=2,
+                    color=points.get_facecolor()[0],
+                    label=f"{group_by} {fit['label']}",
+                )
+
+        locator = mdates.AutoDateLocator()
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+        fig.autofmt_xdate()
+        ax.set_title(f"Regression by {group_by}")
+        ax.set_ylabel("Amount")
+        ax.legend(fontsize="small", ncol=2)
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png", bbox_inches="tight")
+    with span("regression.encode"):
+        chart_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+    return {"group_by": group_by, "groups": fits, "chart_img": chart_b64}
+
+
+def ab_test_records(rows):
+    """
+    Records in the shape run_ab_test expects, from
+    (date_time, description, amount) rows.
+    """
+    return [
+        {
+            "dateTime": dt.isoformat(),
+            "description": description,
+            "amount": float(amount),
+        }
+        for dt, description, amount in rows
+    ]
+
+
+def parse_ab_test_params(params, max_resamples):
+    """
+    (n_resamples, seed) from an A/B test POST body; ValueError (-> 400) if
+    the body isn't an object, resamples isn't an int in 0..max_resamples or
+    seed isn't a non-negative int.
+    """
+    if not isinstance(params, dict):
+        raise ValueError("Request body must be a JSON object")
+    try:
+        n_resamples = int(params.get("resamples") or 0)
+    except (TypeError, ValueError):
+        raise ValueError("resamples must be an integer") from None
+    if not 0 <= n_resamples <= max_resamples:
+        raise ValueError(f"resamples must be 0..{max_resamples}")
+    seed = params.get("seed")
+    if seed is not None and (
+        not isinstance(seed, int) or isinstance(seed, bool) or seed < 0
+    ):
+        raise ValueError("seed must be a non-negative integer")
+    return n_resamples, seed
+
+
+def ab_test_result(records, params=None, n_resamples=0, workers=1):
+    """
+    run_ab_test over records; params is the POST body (None for defaults).
+    """
+    if params is None:
+        return abtest.run_ab_test(records=records)
+    return abtest.run_ab_test(
+        group_by=params.get("group_by"),
+        param_a=params.get("param_a"),
+        param_b=params.get("param_b"),
+        n_resamples=n_resamples,
+        seed=params.get("seed"),
+        workers=workers,
+        records=records,
+    )
@@ -0,0 +1,93 @@
+# main/analytics_store.py
+"""
+In-process incremental analytics store.
+
+Holds per-user regression co-moments and per-group Welford accumulators,
+built from the database once and then kept current by applying the deltas
+from every committed Transaction insert/update/delete (see main/events.py),
+so summary reads cost O(users x groups) instead of a table scan.
+
+The store is per process. With several workers, each one only sees its own
+writes as deltas; set ANALYTICS_STORE_TTL to bound how long another
+worker's writes can go unseen before a rebuild.
+"""
+
+import threading
+import time
+
+from extensions import db
+from models import Transaction
+
+from .events import on_transaction_change
+from .stats.incremental import AnalyticsState
+
+
+class AnalyticsStore:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._states = None  # user_id -> AnalyticsState
+        self._loaded_at = 0.0  # monotonic stamp taken before the rebuild query
+
+    def reset(self):
+        """Drop all state; the next read rebuilds from the database."""
+        with self._lock:
+            self._states = None
+
+    def _rebuild(self):
+        started = time.monotonic()
+        rows = db.session.query(
+            Transaction.user_id, Transaction.date_time, Transaction.amount
+        ).all()
+        by_user = {}
+        for user_id, dt, amount in rows:
+            dts, amounts = by_user.setdefault(user_id, ([], []))
+            dts.append(dt)
+            amounts.append(float(amount))
+        self._states = {
+            user_id: AnalyticsState.from_rows(dts, amounts)
+            for user_id, (dts, amounts) in by_user.items()
+        }
+        self._loaded_at = started
+
+    def apply(self, changes, commit_started):
+        """Apply committed TxnChange deltas (registered as an events listener)."""
+        with self._lock:
+            if self._states is None:
+                return
+            # A rebuild that queried after this commit began may already include
+            # it; an unknown change can't be expressed as a delta. Resync both.
+            if self._loaded_at >= commit_started or any(c is None for c in changes):
+                self._states = None
+                return
+            for old, new in changes:
+                if old is not None:
+                    state = self._states.get(old.user_id)
+                    if state is None or not state.regression.n:
+                        # a row this store never saw (another worker's or a
+                        # raw SQL write): deltas can't be trusted, resync
+                        self._states = None
+                        return
+                    state.remove(old.date_time, old.amount)
+                if new is not None:
+                    state = self._states.setdefault(new.user_id, AnalyticsState())
+                    state.add(new.date_time, new.amount)
+
+    def snapshot(self, user_id=None, ttl=0):
+        """
+        Merged AnalyticsState for one user, or for every user when user_id is
+        None. Rebuilds first if empty or older than ttl seconds (0 = never).
+        """
+        with self._lock:
+            if self._states is None or (
+                ttl and time.monotonic() - self._loaded_at > ttl
+            ):
+                self._rebuild()
+            merged = AnalyticsState()
+            for uid, state in self._states.items():
+                if user_id is None or uid == user_id:
+                    merged.merge(state)
+            return merged
+
+
+analytics_store = AnalyticsStore()
+on_transaction_change(analytics_store.apply)
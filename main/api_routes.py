@@ -1,24 +1,49 @@
-import base64
-import io
+import json
+import math
 from datetime import datetime
 
-import matplotlib
-import matplotlib.dates as mdates
-import matplotlib.pyplot as plt
-import numpy as np
-from flask import Blueprint, current_app, jsonify, request, session
+from flask import Blueprint, current_app, g, jsonify, request, session, url_for
 from flask_cors import CORS
-from werkzeug.security import check_password_hash, generate_password_hash
 
-from auth.utils import login_required
+from auth.passwords import PasswordHashingBusy, passwords
+from auth.ratelimit import login_limiter
+from auth.sessions import SQLSessionInterface
+from auth.utils import (
+    authenticate,
+    current_user,
+    forget_user,
+    login_required,
+    retry_after_seconds,
+)
 from extensions import db
 from models import Transaction, User
 
-from .stats import abtest
-from .stats.regression import compute_regression
-
-# Configure matplotlib backend
-matplotlib.use("Agg")
+from . import arrow
+from .analysis import (
+    TRANSACTION_SHAPES,
+    ab_test_records,
+    ab_test_result,
+    filter_pairs,
+    grouped_regression_result,
+    listing_rows,
+    parse_ab_test_params,
+    parse_regression_args,
+    parse_regression_filters,
+    regression_result,
+    transactions_payload,
+)
+from .analytics_store import analytics_store
+from .arrow import negotiated
+from .cache import result_cache
+from .conditional import conditional_get
+from .jobs import JobQueueFull, job_payload, jobs
+from .metrics import span
+from .queries import aggregates, parse_transaction_filters, transactions_select
+from .search import SEARCH_MODES, search_transactions
+from .singleflight import analysis_flight
+from .stats.anova import CORRECTIONS, compare_groups
+from .stats.grouping import GROUP_BY_OPTIONS, group_codes
+from .stats.regression import rolling_regression
 
 api_bp = Blueprint("api", __name__, url_prefix="/api")
 CORS(
@@ -28,9 +53,29 @@ CORS(
     methods=["GET", "HEAD", "POST", "OPTIONS", "PUT", "PATCH", "DELETE"],
 )
 
+# Upper bound on windows returned by the rolling regression endpoint
+ROLLING_MAX_WINDOWS = 5000
+
+# Largest page size for description search
+SEARCH_MAX_LIMIT = 500
+
+
 # --- Auth endpoints ---
 
 
+def _too_many_attempts(wait):
+    response = jsonify({"error": "Too many attempts; try again later"})
+    response.headers["Retry-After"] = retry_after_seconds(wait)
+    return response, 429
+
+
+@api_bp.errorhandler(PasswordHashingBusy)
+def _hashing_busy(exc):
+    response = jsonify({"error": "Server busy; try again shortly"})
+    response.headers["Retry-After"] = "1"
+    return response, 503
+
+
 @api_bp.route("/register", methods=["POST"])
 def api_register():
     data = request.get_json(force=True) or {}
@@ -38,9 +83,12 @@ def api_register():
     pwd = data.get("password")
     if not email or not pwd:
         return jsonify({"error": "Missing email or password"}), 400
+    wait = login_limiter.check(request.remote_addr)
+    if wait:
+        return _too_many_attempts(wait)
     if User.query.filter_by(name=email).first():
         return jsonify({"error": "Email already registered"}), 400
-    new_user = User(name=email, password_hash=generate_password_hash(pwd))
+    new_user = User(name=email, password_hash=passwords.hash(pwd))
     db.session.add(new_user)
     db.session.commit()
     return jsonify({"message": "Registered successfully"}), 201
@@ -53,8 +101,12 @@ def api_login():
     pwd = data.get("password")
     if not email or not pwd:
         return jsonify({"error": "Missing email or password"}), 400
-    user = User.query.filter_by(name=email).first()
-    if not user or not check_password_hash(user.password_hash, pwd):
+    # before any hashing, so floods cost a dict lookup rather than scrypt
+    wait = login_limiter.check(request.remote_addr, email)
+    if wait:
+        return _too_many_attempts(wait)
+    user = authenticate(email, pwd)
+    if not user:
         return jsonify({"error": "Invalid credentials"}), 401
     session["user_id"] = user.id
     return jsonify({"message": "Logged in"}), 200
@@ -69,11 +121,23 @@ def api_logout():
 
 @api_bp.route("/me", methods=["GET"])
 def api_me():
-    user_id = session.get("user_id")
-    if not user_id:
+    user = current_user()
+    if user is None:
         return jsonify({"error": "Unauthorized"}), 401
-    # Optionally return minimal user info
-    return jsonify({"id": user_id}), 200
+    return jsonify({"id": user.id, "name": user.name}), 200
+
+
+@api_bp.route("/sessions/revoke", methods=["POST"])
+@login_required
+def api_revoke_sessions():
+    """Log the current user out of every session (SESSION_BACKEND=sql)."""
+    store = current_app.session_interface
+    if not isinstance(store, SQLSessionInterface):
+        return jsonify({"error": "Sessions are not stored server-side"}), 501
+    revoked = store.revoke_user(session["user_id"])
+    forget_user(session["user_id"])
+    session.clear()
+    return jsonify({"revoked": revoked}), 200
 
 
 # --- Transaction endpoints ---
@@ -96,6 +160,7 @@ def create_transaction():
         return jsonify({"error": "Invalid dateTime or amount format"}), 400
 
     txn = Transaction(
+        user_id=session["user_id"],
         date_time=dt_val,
         amount=amount_val,
     )
@@ -117,26 +182,91 @@ def create_transaction():
 
 @api_bp.route("/transactions", methods=["GET"])
 @login_required
+@conditional_get
+@negotiated
 def list_transactions():
-    txns = Transaction.query.all()
-    payload = []
-    for t in txns:
-        payload.append(
-            {
-                "id": t.id,
-                "dateTime": t.date_time.isoformat(),
-                "amount": float(t.amount),
-                "description": getattr(t, "description", None),
-            }
+    """
+    Transactions filtered by min_amount, max_amount, start, end and q
+    (description substring), ordered by sort (e.g. "-amount,dateTime").
+    include=total,count wraps the rows as {"transactions": [...], "total",
+    "count"}, with the aggregates computed in the same query.
+    ?shape=columns returns one array per field instead of one object per
+    row, which is smaller and faster to encode and decode.
+    """
+    shape = request.args.get("shape", "rows")
+    if shape not in TRANSACTION_SHAPES:
+        return jsonify({"error": f"shape must be one of {TRANSACTION_SHAPES}"}), 400
+    try:
+        filters = parse_transaction_filters(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if g.response_format == "arrow":
+        return arrow.transactions_response(
+            transactions_select({**filters, "include": ()})
         )
+    max_rows = current_app.config["CACHE_MAX_ROWS"]
+    payload = result_cache.get_or_compute(
+        "transactions",
+        session["user_id"],
+        (shape, tuple(sorted(filters.items()))),
+        lambda: _transactions_payload(filters, shape),
+        cacheable=lambda payload: listing_rows(payload) <= max_rows,
+    )
     return jsonify(payload), 200
 
 
+def _transactions_payload(filters, shape="rows"):
+    rows = db.session.execute(transactions_select(filters)).all()
+    listing = transactions_payload(rows, shape)
+    if not filters["include"]:
+        return listing
+    return {"transactions": listing, **aggregates(rows, filters["include"])}
+
+
+@api_bp.route("/transactions/search", methods=["GET"])
+@login_required
+def search_transaction_descriptions():
+    """
+    Full-text search over descriptions (mode=fts, default) or substring
+    match (mode=substring), best matches first, paged by limit/offset.
+    """
+    q = request.args.get("q", "").strip()
+    mode = request.args.get("mode", "fts")
+    if not q:
+        return jsonify({"error": "Missing q"}), 400
+    if mode not in SEARCH_MODES:
+        return jsonify({"error": f"mode must be one of {SEARCH_MODES}"}), 400
+    try:
+        limit = int(request.args.get("limit", 50))
+        offset = int(request.args.get("offset", 0))
+    except ValueError:
+        return jsonify({"error": "limit and offset must be integers"}), 400
+    if not 1 <= limit <= SEARCH_MAX_LIMIT or offset < 0:
+        return jsonify({"error": f"limit must be 1..{SEARCH_MAX_LIMIT}"}), 400
+
+    rows = search_transactions(q, mode=mode, limit=limit, offset=offset)
+    results = transactions_payload(rows)
+    for result, row in zip(results, rows):
+        result["rank"] = row.rank
+    return (
+        jsonify(
+            {
+                "q": q,
+                "mode": mode,
+                "limit": limit,
+                "offset": offset,
+                "results": results,
+            }
+        ),
+        200,
+    )
+
+
 @api_bp.route("/transactions/<int:txn_id>", methods=["PUT", "PATCH"])
 @login_required
 def update_transaction(txn_id):
     data = request.get_json(force=True) or {}
-    txn = Transaction.query.get(txn_id)
+    txn = db.session.get(Transaction, txn_id)
     if not txn:
         return jsonify({"error": "Not found"}), 404
     if "dateTime" in data:
@@ -163,7 +293,7 @@ def update_transaction(txn_id):
 @api_bp.route("/transactions/<int:txn_id>", methods=["DELETE"])
 @login_required
 def delete_transaction(txn_id):
-    txn = Transaction.query.get(txn_id)
+    txn = db.session.get(Transaction, txn_id)
     if not txn:
         return jsonify({"error": "Not found"}), 404
     db.session.delete(txn)
@@ -174,120 +304,335 @@ def delete_transaction(txn_id):
 # --- Analysis endpoints ---
 
 
+def _ab_test_params(params):
+    """Validated (n_resamples, seed) for an A/B test request (ValueError -> 400)."""
+    return parse_ab_test_params(params, current_app.config["RESAMPLING_MAX_RESAMPLES"])
+
+
+def _ab_test_payload(user_id, params=None):
+    """
+    A/B test over all transactions; params=None runs the defaults. Results
+    are cached until the next write, and concurrent identical requests share
+    one computation.
+    """
+    key = None if params is None else json.dumps(params, sort_keys=True)
+    return result_cache.get_or_compute(
+        "abtest",
+        user_id,
+        key,
+        lambda: _compute_ab_test(params),
+        flight=analysis_flight,
+    )
+
+
+def _compute_ab_test(params):
+    with span("abtest.fetch"):
+        rows = db.session.query(
+            Transaction.date_time, Transaction.description, Transaction.amount
+        ).all()
+    with span("abtest.records"):
+        records = ab_test_records(rows)
+    if params is None:
+        return ab_test_result(records)
+    return ab_test_result(
+        records,
+        params,
+        n_resamples=_ab_test_params(params)[0],
+        workers=current_app.config["RESAMPLING_WORKERS"],
+    )
+
+
 @api_bp.route("/analysis/abtest", methods=["GET", "POST"])
 @login_required
+@conditional_get
+@negotiated
 def api_ab_test():
     """
     A/B test endpoint over all transactions.
     """
     try:
-        txns = Transaction.query.all()
-        records = [
-            {
-                "dateTime": t.date_time.isoformat(),
-                "description": getattr(t, "description", None),
-                "amount": float(t.amount),
-            }
-            for t in txns
-        ]
-        abtest.transactions = records
         if request.method == "POST":
-            params = request.get_json(force=True) or {}
-            result = abtest.run_ab_test(
-                group_by=params.get("group_by"),
-                param_a=params.get("param_a"),
-                param_b=params.get("param_b"),
-            )
+            params = request.get_json(force=True, silent=True)
+            if params is None and request.get_data():
+                return jsonify({"error": "Invalid JSON body"}), 400
+            params = {} if params is None else params
+            try:
+                _ab_test_params(params)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            result = _ab_test_payload(session["user_id"], params)
         else:
-            result = abtest.run_ab_test()
+            result = _ab_test_payload(session["user_id"])
+        if g.response_format == "arrow":
+            # long format: one row per kept amount, tagged with its group
+            rows = [{"group": "A", "amount": x} for x in result["groupA"]]
+            rows += [{"group": "B", "amount": x} for x in result["groupB"]]
+            return arrow.payload_response(
+                {**result, "rows": rows},
+                table="rows",
+                drop=("groupA", "groupB", "boxplot_img"),
+            )
         return jsonify(result), 200
     except Exception as e:
         current_app.logger.exception("Error running A/B test")
         return jsonify({"error": str(e)}), 500
 
 
-@api_bp.route("/analysis/regression", methods=["GET"])
+@api_bp.route("/analysis/groups", methods=["GET"])
 @login_required
-def api_regression():
+@negotiated
+def api_group_comparison():
     """
-    Regression endpoint over all transactions.
+    Compare every group (weekday, month, time, hour, period) in one pass:
+    per-group stats, ANOVA, Kruskal-Wallis and pairwise Welch p-values.
     """
-    period = request.args.get("period", "all").lower()
-    if period == "morning":
-        hours = range(0, 12)
-    elif period == "noon":
-        hours = (12,)
-    elif period == "afternoon":
-        hours = range(13, 18)
-    else:
-        hours = None
+    group_by = request.args.get("group_by", "weekday").lower()
+    correction = request.args.get("correction", "holm").lower()
+    if group_by not in GROUP_BY_OPTIONS:
+        return jsonify({"error": f"group_by must be one of {GROUP_BY_OPTIONS}"}), 400
+    if correction not in CORRECTIONS:
+        return jsonify({"error": f"correction must be one of {CORRECTIONS}"}), 400
+
+    result = result_cache.get_or_compute(
+        "groups",
+        session["user_id"],
+        (group_by, correction),
+        lambda: _compare_groups(group_by, correction),
+    )
+    if g.response_format == "arrow":
+        return arrow.payload_response(result, table="groups")
+    return jsonify(result), 200
+
+
+def _compare_groups(group_by, correction):
+    rows = db.session.query(Transaction.date_time, Transaction.amount).all()
+    return compare_groups(
+        [r.date_time for r in rows],
+        [float(r.amount) for r in rows],
+        group_by=group_by,
+        correction=correction,
+    )
 
-    start_str = request.args.get("start_date")
-    end_str = request.args.get("end_date")
-    try:
-        start_dt = datetime.fromisoformat(start_str) if start_str else None
-        end_dt = datetime.fromisoformat(end_str) if end_str else None
-    except ValueError:
-        return jsonify({"error": "Invalid date format"}), 400
 
-    txns = Transaction.query.all()
-    pairs = []
-    for t in txns:
-        dt = t.date_time
-        if (start_dt and dt < start_dt) or (end_dt and dt > end_dt):
-            continue
-        if hours and dt.hour not in hours:
-            continue
-        pairs.append((dt, float(t.amount)))
-
-    if not pairs:
-        return (
-            jsonify(
-                {
-                    "slope": None,
-                    "intercept": None,
-                    "r_squared": None,
-                    "chart_img": None,
-                }
-            ),
-            200,
+def _load_pairs(hours, start_dt, end_dt):
+    """
+    (datetime, amount) pairs in date order, filtered by date range and hours.
+    """
+    with span("regression.fetch"):
+        rows = (
+            db.session.query(Transaction.date_time, Transaction.amount)
+            .order_by(Transaction.date_time)
+            .all()
         )
+    with span("regression.filter"):
+        return filter_pairs(rows, hours, start_dt, end_dt)
+
 
-    ts_amounts = [(d.timestamp(), a) for d, a in pairs]
-    stats = compute_regression(ts_amounts)
-    slope = float(stats["slope"])
-    intercept = float(stats["intercept"])
-    r_squared = float(stats["r_squared"])
-
-    fig, ax = plt.subplots(figsize=(8, 4))
-    dates = [d for d, _ in pairs]
-    amounts = [a for _, a in pairs]
-    ax.scatter(dates, amounts, alpha=0.6, label="Data")
-    xs = np.array([d.timestamp() for d in dates])
-    ax.plot(dates, intercept + slope * xs, linewidth=2, label="Trend")
-
-    locator = mdates.AutoDateLocator()
-    ax.xaxis.set_major_locator(locator)
-    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
-    fig.autofmt_xdate()
-    ax.set_title("Regression Analysis")
-    ax.set_ylabel("Amount")
-    ax.legend()
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png", bbox_inches="tight")
-    plt.close(fig)
-    buf.seek(0)
-    chart_b64 = base64.b64encode(buf.read()).decode("ascii")
+def _summary_user():
+    """The user whose rows alone a summary request reads, or None."""
+    return session["user_id"] if request.args.get("user") == "me" else None
 
+
+@api_bp.route("/analysis/summary", methods=["GET"])
+@login_required
+@conditional_get(scope_user=_summary_user)
+def api_analysis_summary():
+    """
+    Regression fit and per-group mean/std from the incremental analytics
+    store, kept current on every write instead of recomputed per request.
+    Pass user=me to restrict to the logged-in user's transactions.
+    """
+    group_by = request.args.get("group_by", "weekday").lower()
+    if group_by not in GROUP_BY_OPTIONS:
+        return jsonify({"error": f"group_by must be one of {GROUP_BY_OPTIONS}"}), 400
+    user_id = _summary_user()
+
+    state = analytics_store.snapshot(
+        user_id=user_id, ttl=current_app.config["ANALYTICS_STORE_TTL"]
+    )
+    _, labels = group_codes([], group_by)
+    groups = [
+        {"label": label, **acc.summary()}
+        for label, acc in zip(labels, state.groups[group_by])
+        if acc.n
+    ]
     return (
         jsonify(
             {
-                "slope": slope,
-                "intercept": intercept,
-                "r_squared": r_squared,
-                "chart_img": chart_b64,
+                "n": state.regression.n,
+                "regression": state.regression.regression(),
+                "group_by": group_by,
+                "groups": groups,
             }
         ),
         200,
     )
+
+
+def _regression_payload(user_id, args):
+    """
+    Regression (or per-group regression) result plus chart. Results are
+    cached until the next write, and concurrent requests with the same
+    effective filters share one computation.
+    """
+    key = parse_regression_args(args)
+    return result_cache.get_or_compute(
+        "regression",
+        user_id,
+        key,
+        lambda: _compute_regression(*key),
+        flight=analysis_flight,
+    )
+
+
+def _stored_regression():
+    """Unfiltered fit from the analytics store, shaped like regression_result."""
+    state = analytics_store.snapshot(ttl=current_app.config["ANALYTICS_STORE_TTL"])
+    return {**state.regression.regression(), "chart_img": None}
+
+
+def _compute_regression(group_by, hours, start_dt, end_dt):
+    pairs = _load_pairs(hours, start_dt, end_dt)
+    if group_by:
+        return grouped_regression_result(pairs, group_by)
+    return regression_result(pairs)
+
+
+@api_bp.route("/analysis/regression", methods=["GET"])
+@login_required
+@conditional_get
+@negotiated
+def api_regression():
+    """
+    Regression endpoint over all transactions. chart=0 with no filters or
+    group_by skips the chart and answers from the incremental analytics
+    store, so it costs no table scan even right after a write.
+    """
+    try:
+        key = parse_regression_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if request.args.get("chart") == "0" and not any(key):
+        result = _stored_regression()
+    else:
+        result = _regression_payload(session["user_id"], request.args)
+    if g.response_format == "arrow":
+        return arrow.payload_response(
+            result, table="groups" if "groups" in result else None
+        )
+    return jsonify(result), 200
+
+
+@api_bp.route("/analysis/regression/rolling", methods=["GET"])
+@login_required
+@negotiated
+def api_rolling_regression():
+    """
+    Rolling-window trend: one fit per window of window_days, advancing by
+    step_days, over the same filters as /analysis/regression.
+    """
+    try:
+        hours, start_dt, end_dt = parse_regression_filters(request.args)
+    except ValueError:
+        return jsonify({"error": "Invalid date format"}), 400
+    try:
+        window_days = float(request.args.get("window_days", 30))
+        step_days = float(request.args.get("step_days", 1))
+    except ValueError:
+        return jsonify({"error": "window_days and step_days must be numbers"}), 400
+    if not (math.isfinite(window_days) and math.isfinite(step_days)):
+        return jsonify({"error": "window_days and step_days must be finite"}), 400
+    if window_days <= 0 or step_days <= 0:
+        return jsonify({"error": "window_days and step_days must be positive"}), 400
+
+    args = (tuple(hours or ()), start_dt, end_dt, window_days, step_days)
+    payload = result_cache.get_or_compute(
+        "rolling",
+        session["user_id"],
+        args,
+        lambda: _rolling_payload(hours, start_dt, end_dt, window_days, step_days),
+    )
+    if payload is None:
+        return jsonify({"error": "Too many windows; increase step_days"}), 400
+    if g.response_format == "arrow":
+        fits = [
+            {
+                **fit,
+                "start": datetime.fromisoformat(fit["start"]),
+                "end": datetime.fromisoformat(fit["end"]),
+            }
+            for fit in payload["fits"]
+        ]
+        return arrow.payload_response({**payload, "fits": fits}, table="fits")
+    return jsonify(payload), 200
+
+
+def _rolling_payload(hours, start_dt, end_dt, window_days, step_days):
+    """Rolling fits, or None if the span needs more than ROLLING_MAX_WINDOWS."""
+    pairs = _load_pairs(hours, start_dt, end_dt)
+    if pairs:
+        span_days = (pairs[-1][0] - pairs[0][0]).total_seconds() / 86400
+        if (span_days - window_days) / step_days > ROLLING_MAX_WINDOWS:
+            return None
+
+    fits = rolling_regression(
+        [d.timestamp() for d, _ in pairs],
+        [a for _, a in pairs],
+        window=window_days * 86400,
+        step=step_days * 86400,
+    )
+    for fit in fits:
+        fit["start"] = datetime.fromtimestamp(fit["start"]).isoformat()
+        fit["end"] = datetime.fromtimestamp(fit["end"]).isoformat()
+    return {"window_days": window_days, "step_days": step_days, "fits": fits}
+
+
+# --- Background analysis jobs ---
+
+# kind -> (validate(params), run(params)); validate raises ValueError -> 400
+JOB_KINDS = {
+    "regression": (parse_regression_args, _regression_payload),
+    "abtest": (_ab_test_params, _ab_test_payload),
+}
+
+
+@api_bp.route("/analysis/jobs", methods=["POST"])
+@login_required
+def submit_analysis_job():
+    """
+    Queue a regression or A/B analysis; poll the returned Location for the
+    result. Identical in-flight jobs from the same user are shared.
+    """
+    data = request.get_json(force=True) or {}
+    kind = data.get("kind")
+    params = data.get("params") or {}
+    if kind not in JOB_KINDS:
+        return jsonify({"error": f"kind must be one of {tuple(JOB_KINDS)}"}), 400
+    if not isinstance(params, dict):
+        return jsonify({"error": "params must be an object"}), 400
+    validate, run = JOB_KINDS[kind]
+    try:
+        validate(params)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    user_id = session["user_id"]
+    try:
+        job, created = jobs.submit(user_id, kind, params, lambda p: run(user_id, p))
+    except JobQueueFull:
+        return jsonify({"error": "Too many pending jobs; retry later"}), 503
+    location = url_for("api.get_analysis_job", job_id=job.id)
+    return (
+        jsonify({"id": job.id, "status": job.status, "deduplicated": not created}),
+        202,
+        {"Location": location},
+    )
+
+
+@api_bp.route("/analysis/jobs/<job_id>", methods=["GET"])
+@login_required
+def get_analysis_job(job_id):
+    job = jobs.get(job_id, session["user_id"])
+    if job is None:
+        return jsonify({"error": "Not found"}), 404
+    return jsonify(job_payload(job)), 200
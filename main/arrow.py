@@ -0,0 +1,170 @@
+# main/arrow.py
+"""
+Arrow IPC stream responses.
+
+Clients sending `Accept: application/vnd.apache.arrow.stream` get the
+transaction listing as an Arrow stream built column-wise from database
+cursor batches (no per-row dicts, timestamps and decimals kept as native
+Arrow types), and analysis results as a table plus their scalar fields in
+the schema metadata. pyarrow is optional: without it only JSON is offered
+and an Arrow-only Accept header gets 406.
+"""
+
+import io
+from functools import wraps
+
+from flask import Response, current_app, g, make_response, request, stream_with_context
+from sqlalchemy import select
+
+from extensions import db
+from models import Transaction
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional dependency
+    pa = None
+
+JSON_MIMETYPE = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+# rows fetched from the DB cursor per record batch
+ARROW_BATCH_ROWS = 65536
+
+
+def response_format():
+    """
+    "json" or "arrow" from the Accept header; None if nothing acceptable.
+    JSON wins ties (including */* and a missing header).
+    """
+    offered = [JSON_MIMETYPE] + ([ARROW_STREAM] if pa is not None else [])
+    if not request.accept_mimetypes:
+        return "json"
+    best = request.accept_mimetypes.best_match(offered)
+    if best is None:
+        return None
+    return "arrow" if best == ARROW_STREAM else "json"
+
+
+def not_acceptable():
+    offered = JSON_MIMETYPE + (f", {ARROW_STREAM}" if pa is not None else "")
+    return Response(f"Not Acceptable; available: {offered}\n", 406)
+
+
+def negotiated(view):
+    """
+    Resolve the response format before the view runs (406 if none fits);
+    the view reads it from g.response_format.
+    """
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.response_format = response_format()
+        if g.response_format is None:
+            response = not_acceptable()
+        else:
+            response = make_response(view(*args, **kwargs))
+        response.vary.add("Accept")
+        return response
+
+    return wrapper
+
+
+class _Chunks(io.RawIOBase):
+    """File-like sink collecting what the IPC writer emits between reads."""
+
+    def __init__(self):
+        self._parts = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _ipc_stream(schema, batches):
+    sink = _Chunks()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            chunk = sink.take()
+            if chunk:
+                yield chunk
+    yield sink.take()
+
+
+def transactions_schema():
+    return pa.schema(
+        [
+            ("id", pa.int64()),
+            ("dateTime", pa.timestamp("us")),
+            ("amount", pa.decimal128(10, 2)),
+            ("description", pa.string()),
+        ]
+    )
+
+
+def _transaction_batches(schema, stmt, batch_rows):
+    result = db.session.execute(stmt.execution_options(yield_per=batch_rows))
+    empty = True
+    for rows in result.partitions():
+        empty = False
+        columns = zip(*rows)
+        yield pa.record_batch(
+            [pa.array(col, type=f.type) for col, f in zip(columns, schema)],
+            schema=schema,
+        )
+    if empty:
+        yield pa.record_batch([pa.array([], type=f.type) for f in schema], schema)
+
+
+def transactions_response(stmt=None, batch_rows=None):
+    """
+    Streamed Arrow IPC response of the (id, date_time, amount, description)
+    rows selected by stmt; every transaction by default.
+    """
+    if stmt is None:
+        stmt = select(
+            Transaction.id,
+            Transaction.date_time,
+            Transaction.amount,
+            Transaction.description,
+        )
+    schema = transactions_schema()
+    batches = _transaction_batches(schema, stmt, batch_rows or ARROW_BATCH_ROWS)
+    body = _ipc_stream(schema, batches)
+    return Response(stream_with_context(body), mimetype=ARROW_STREAM)
+
+
+def table_response(rows, metadata=None, schema=None):
+    """
+    Arrow IPC response of a list of dicts; metadata holds scalar fields and
+    is stored JSON-encoded in the schema metadata.
+    """
+    table = pa.Table.from_pylist(rows, schema=schema)
+    if metadata:
+        table = table.replace_schema_metadata(
+            {k: current_app.json.dumps(v) for k, v in metadata.items()}
+        )
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return Response(sink.getvalue().to_pybytes(), mimetype=ARROW_STREAM)
+
+
+def payload_response(payload, table=None, drop=("chart_img", "boxplot_img")):
+    """
+    Arrow response for an analysis payload: payload[table] (a list of dicts)
+    becomes the rows and the other fields, minus drop, the metadata. With
+    table=None the scalar fields form a one-row table instead.
+    """
+    fields = {k: v for k, v in payload.items() if k not in drop and k != table}
+    if table is None:
+        return table_response([fields])
+    return table_response(payload[table], fields)
@@ -0,0 +1,323 @@
+# main/cache.py
+"""
+Result cache for the analysis and listing endpoints.
+
+Entries are keyed by (endpoint, user, arguments, data generation). The
+generation is a counter bumped after every committed transaction write (see
+main/events.py), so a write makes older entries unreachable instead of
+having to find and delete them; they age out through LRU/TTL eviction.
+
+Two backends:
+  sqlite - a local SQLite file (WAL mode) holding both entries and
+           generation counters, shared by every worker on the host. The
+           default, since it stays correct with any number of workers.
+  memory - per-process LRU + TTL dict. Fastest, but each gunicorn worker has
+           its own cache and generation counter, so only use it with a
+           single worker process.
+
+Select with CACHE_BACKEND ("sqlite", "memory" or "none").
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from .events import on_transaction_change
+
+# Generation counter names: "all" moves on every write and versions results
+# computed over every user's data; "user:<id>" moves only on that user's
+# writes; "epoch" moves when a write can't be attributed (bulk statements,
+# table re-creation) and versions every user-scoped result.
+GLOBAL_GENERATION = "all"
+EPOCH_GENERATION = "epoch"
+
+
+class MemoryCache:
+    """Thread-safe in-process LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._counters = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def counter(self, name):
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def incr(self, names):
+        with self._lock:
+            for name in names:
+                self._counters[name] = self._counters.get(name, 0) + 1
+
+
+class SQLiteCache:
+    """
+    Cache stored in a SQLite file so several worker processes share entries
+    and generation counters. Values are pickled.
+    """
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_entries_used_at"
+                " ON cache_entries (used_at)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_counters ("
+                " name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def _connect(self):
+        # one connection per thread; sqlite3 connections aren't shareable
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        if row[1] < now:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache_entries SET used_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, used_at)"
+            " VALUES (?, ?, ?, ?)",
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl, now),
+        )
+        # evict expired rows, then least recently used beyond the cap
+        conn.execute("DELETE FROM cache_entries WHERE expires_at < ?", (now,))
+        conn.execute(
+            "DELETE FROM cache_entries WHERE key IN ("
+            " SELECT key FROM cache_entries ORDER BY used_at DESC"
+            " LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, key):
+        self._connect().execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache_entries")
+
+    def __len__(self):
+        return (
+            self._connect().execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+        )
+
+    def counter(self, name):
+        row = (
+            self._connect()
+            .execute("SELECT value FROM cache_counters WHERE name = ?", (name,))
+            .fetchone()
+        )
+        return row[0] if row else 0
+
+    def incr(self, names):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for name in names:
+                conn.execute(
+                    "INSERT INTO cache_counters (name, value) VALUES (?, 1)"
+                    " ON CONFLICT(name) DO UPDATE SET value = value + 1",
+                    (name,),
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+class ResultCache:
+    """
+    Flask extension wrapping a cache backend with generation-based keys.
+    With CACHE_BACKEND = "none" every lookup is a miss.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.ttl = 0
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("CACHE_BACKEND", "sqlite")
+        app.config.setdefault("CACHE_TTL", 300)
+        app.config.setdefault("CACHE_MAX_ENTRIES", 1024)
+        app.config.setdefault("CACHE_MAX_ROWS", 5000)
+        kind = app.config["CACHE_BACKEND"]
+        if kind == "memory":
+            self.backend = MemoryCache(app.config["CACHE_MAX_ENTRIES"])
+        elif kind == "sqlite":
+            path = app.config.get("CACHE_PATH") or os.path.join(
+                app.instance_path, "result_cache.sqlite3"
+            )
+            self.backend = SQLiteCache(path, app.config["CACHE_MAX_ENTRIES"])
+        elif kind == "none":
+            self.backend = None
+        else:
+            raise RuntimeError(f"Unknown CACHE_BACKEND {kind!r}")
+        self.ttl = app.config["CACHE_TTL"]
+        app.extensions["result_cache"] = self
+
+    def generation(self, user_id=None):
+        """Version of the data behind a result: all users, or one user."""
+        if self.backend is None:
+            return None
+        if user_id is None:
+            return self.backend.counter(GLOBAL_GENERATION)
+        return (
+            self.backend.counter(EPOCH_GENERATION),
+            self.backend.counter(f"user:{user_id}"),
+        )
+
+    def lookup(self, endpoint, user_id, args, scope_user=None):
+        """
+        (key, generation, cached value or None) of get_or_compute's entry,
+        for callers that compute the value themselves (asgi.py) and store()
+        it under key.
+        """
+        # read the generation before computing: a write landing mid-compute
+        # bumps it, so a result built from older rows is never served as newer
+        generation = self.generation(scope_user)
+        if self.backend is None:
+            return None, generation, None
+        key = repr((endpoint, user_id, args, scope_user, generation))
+        value = self.backend.get(key)
+        with self._stats_lock:
+            self._stats["hits" if value is not None else "misses"] += 1
+        return key, generation, value
+
+    def store(self, key, value):
+        if self.backend is not None and key is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def get_or_compute(
+        self,
+        endpoint,
+        user_id,
+        args,
+        compute,
+        scope_user=None,
+        flight=None,
+        cacheable=None,
+    ):
+        """
+        Cached compute() for this endpoint, requesting user and arguments.
+        scope_user=None means the result reads every user's transactions;
+        otherwise only scope_user's, and other users' writes don't evict it.
+        With a SingleFlight, concurrent misses for the same arguments and
+        data generation share one compute(). A result for which
+        cacheable(result) is false is returned but not stored.
+        """
+        key, generation, value = self.lookup(endpoint, user_id, args, scope_user)
+        if value is not None:
+            return value
+        if flight is not None:
+            # a request arriving after a write must not join a computation
+            # that may have read the rows before it
+            value = flight.do((endpoint, args, scope_user, generation), compute)
+        else:
+            value = compute()
+        if cacheable is None or cacheable(value):
+            self.store(key, value)
+        return value
+
+    def invalidate(self, user_ids=None):
+        """
+        Bump generations after a write by user_ids, or after an unattributed
+        write when user_ids is None.
+        """
+        if self.backend is None:
+            return
+        names = [GLOBAL_GENERATION]
+        if user_ids is None:
+            names.append(EPOCH_GENERATION)
+        else:
+            names.extend(f"user:{uid}" for uid in sorted(set(user_ids)))
+        self.backend.incr(names)
+
+    def clear(self):
+        """Drop every cached result."""
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def apply(self, changes, commit_started):
+        """events listener: move the generations touched by these changes."""
+        if any(c is None for c in changes):
+            self.invalidate()
+            return
+        user_ids = set()
+        for change in changes:
+            for row in change:
+                if row is not None:
+                    user_ids.add(row.user_id)
+        self.invalidate(user_ids)
+
+
+result_cache = ResultCache()
+on_transaction_change(result_cache.apply)
@@ -0,0 +1,226 @@
+# main/compression.py
+"""
+WSGI response compression.
+
+Negotiates brotli (when the brotli package is installed) or gzip from
+Accept-Encoding and compresses the body incrementally as the app yields it,
+so streamed responses (e.g. the Arrow listing) are never buffered whole.
+Only text-like content types are compressed; images, archives and bodies
+that already carry a Content-Encoding pass through untouched, as do bodies
+whose Content-Length is below the size threshold.
+
+A compressed response's strong ETag gets an encoding suffix ("<tag>-gzip")
+so it never collides with the identity representation; the suffix is
+stripped from If-None-Match before the app sees it, so conditional GETs
+keep working, and put back on the 304 when the client revalidated the
+compressed representation.
+"""
+
+import itertools
+import re
+import zlib
+
+from werkzeug.http import parse_accept_header, parse_etags, unquote_etag
+from werkzeug.wsgi import ClosingIterator
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/vnd.apache.arrow.stream",
+    "image/svg+xml",
+)
+# preference order; br only when the brotli package is installed
+ENCODINGS = (("br",) if brotli is not None else ()) + ("gzip",)
+_ETAG_SUFFIX = re.compile(r'-(?:gzip|br)"')
+
+
+def _compressible(content_type):
+    mimetype = content_type.split(";", 1)[0].strip().lower()
+    return (
+        mimetype.startswith("text/")
+        or mimetype.endswith("+json")
+        or mimetype in COMPRESSIBLE_TYPES
+    )
+
+
+class _Gzip:
+    def __init__(self, level):
+        self._z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._z.compress(data)
+
+    def flush(self):
+        return self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._z.flush(zlib.Z_FINISH)
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._c = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._c.process(data)
+
+    def flush(self):
+        return self._c.flush()
+
+    def finish(self):
+        return self._c.finish()
+
+
+def choose_encoding(accept_encoding):
+    """Best of br (if available) and gzip for an Accept-Encoding header."""
+    if not accept_encoding:
+        return None
+    qualities = {value.lower(): q for value, q in parse_accept_header(accept_encoding)}
+    for encoding in ENCODINGS:
+        if qualities.get(encoding, qualities.get("*", 0)) > 0:
+            return encoding
+    return None
+
+
+def compressor_for(encoding, level=6, brotli_quality=4):
+    return _Brotli(brotli_quality) if encoding == "br" else _Gzip(level)
+
+
+def encoded_etag(etag, encoding):
+    """Give a strong ETag an encoding suffix; weak tags are left alone."""
+    if etag.endswith('"') and not etag.startswith("W/"):
+        return f'{etag[:-1]}-{encoding}"'
+    return etag
+
+
+def strip_etag_suffix(if_none_match):
+    return _ETAG_SUFFIX.sub('"', if_none_match)
+
+
+def not_modified_etag(etag, encoding, if_none_match):
+    """
+    ETag for a 304: the encoded form of etag when that is the one the
+    client's If-None-Match (before strip_etag_suffix) holds, so the tag
+    matches the compressed response the client has cached.
+    """
+    if encoding and if_none_match:
+        tagged = encoded_etag(etag, encoding)
+        if tagged != etag and parse_etags(if_none_match).contains(
+            unquote_etag(tagged)[0]
+        ):
+            return tagged
+    return etag
+
+
+def _with_vary(headers, names):
+    vary = names.get("vary")
+    if vary and "accept-encoding" in vary.lower():
+        return headers
+    headers = [(n, v) for n, v in headers if n.lower() != "vary"]
+    headers.append(("Vary", f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"))
+    return headers
+
+
+class CompressionMiddleware:
+    def __init__(self, app, min_size=1024, level=6, brotli_quality=4):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, environ):
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            return None
+        return choose_encoding(environ.get("HTTP_ACCEPT_ENCODING"))
+
+    def _should_compress(self, code, names):
+        length = names.get("content-length")
+        return (
+            200 <= code
+            and code not in (204, 206, 304)
+            and "content-encoding" not in names
+            and _compressible(names.get("content-type", ""))
+            and (length is None or int(length) >= self.min_size)
+        )
+
+    def __call__(self, environ, start_response):
+        encoding = self._choose_encoding(environ)
+        if encoding is None:
+            return self.app(environ, start_response)
+
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        if if_none_match is not None:
+            environ["HTTP_IF_NONE_MATCH"] = strip_etag_suffix(if_none_match)
+
+        state = {"compress": False, "streamed": False}
+        written = []
+
+        def _start_response(status, headers, exc_info=None):
+            names = {name.lower(): value for name, value in headers}
+            code = int(status.split(" ", 1)[0])
+            state["compress"] = self._should_compress(code, names)
+            if code == 304 and "etag" in names:
+                headers = [(n, v) for n, v in headers if n.lower() != "etag"]
+                headers.append(
+                    (
+                        "ETag",
+                        not_modified_etag(names["etag"], encoding, if_none_match),
+                    )
+                )
+            if state["compress"]:
+                state["streamed"] = "content-length" not in names
+                headers = [
+                    (name, value)
+                    for name, value in headers
+                    if name.lower() not in ("content-length", "etag")
+                ]
+                headers.append(("Content-Encoding", encoding))
+                if "etag" in names:
+                    headers.append(("ETag", encoded_etag(names["etag"], encoding)))
+            # the body depends on Accept-Encoding either way
+            headers = _with_vary(headers, names)
+            write = start_response(status, headers, exc_info)
+            # legacy write() callers get their data routed through the encoder
+            return written.append if state["compress"] else write
+
+        app_iter = self.app(environ, _start_response)
+        if not state["compress"]:
+            return app_iter
+        # the server closes what we return, which must close app_iter even
+        # if the generator below never started
+        return ClosingIterator(
+            self._compressed(app_iter, encoding, written, state["streamed"]),
+            getattr(app_iter, "close", None),
+        )
+
+    def _compressed(self, app_iter, encoding, written, streamed):
+        compressor = compressor_for(encoding, self.level, self.brotli_quality)
+        for chunk in itertools.chain(written, app_iter):
+            out = compressor.compress(chunk)
+            if streamed:
+                # push each upstream chunk to the client as it arrives
+                out += compressor.flush()
+            if out:
+                yield out
+        yield compressor.finish()
+
+
+def init_compression(app):
+    """Wrap app.wsgi_app with CompressionMiddleware unless disabled."""
+    app.config.setdefault("COMPRESS_ENABLED", True)
+    app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    app.config.setdefault("COMPRESS_LEVEL", 6)
+    app.config.setdefault("COMPRESS_BR_QUALITY", 4)
+    if app.config["COMPRESS_ENABLED"]:
+        app.wsgi_app = CompressionMiddleware(
+            app.wsgi_app,
+            min_size=app.config["COMPRESS_MIN_SIZE"],
+            level=app.config["COMPRESS_LEVEL"],
+            brotli_quality=app.config["COMPRESS_BR_QUALITY"],
+        )
@@ -0,0 +1,87 @@
+# main/conditional.py
+"""
+Conditional GET support (ETag / If-None-Match).
+
+The ETag of a response is a hash of the URL path, its query arguments, the
+requesting user and the current data version of the rows it reads:
+(row count, max id, max updated_at) of the transactions table, or of just
+the requesting user's rows for views that read nothing else. That version
+query is answered from indexes, so a client polling an unchanged resource
+gets a 304 without the view's heavy query, stats or chart work.
+
+Views reading every user's transactions (the listing and the regression
+and A/B analyses) must use the table-wide version: another user's write
+changes their result.
+"""
+
+import hashlib
+from functools import partial, wraps
+
+from flask import make_response, request, session
+from sqlalchemy import func, select
+
+from extensions import db
+from models import Transaction
+
+from .arrow import response_format
+
+
+def data_version_query(user_id=None):
+    """
+    SELECT statement for the data version (sync or async) of every user's
+    transactions, or only user_id's.
+    """
+    stmt = select(
+        func.count(Transaction.id),
+        func.max(Transaction.id),
+        func.max(Transaction.updated_at),
+    )
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+    return stmt
+
+
+def data_version(user_id=None):
+    return tuple(db.session.execute(data_version_query(user_id)).one())
+
+
+def compute_etag(path, args, user_id, version, fmt="json"):
+    """Strong ETag value for one representation of a resource."""
+    parts = [path, sorted(args), user_id, version, fmt]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:32]
+
+
+def conditional_get(view=None, *, scope_user=None):
+    """
+    Answer GET requests whose If-None-Match matches the current ETag with
+    304 before running the view; tag successful responses. scope_user() is
+    the user whose rows alone this request reads, or None for every user's
+    (the default).
+    """
+    if view is None:
+        return partial(conditional_get, scope_user=scope_user)
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET":
+            return view(*args, **kwargs)
+        etag = compute_etag(
+            request.path,
+            request.args.items(multi=True),
+            session.get("user_id"),
+            data_version(scope_user() if scope_user else None),
+            response_format(),
+        )
+        if etag in request.if_none_match:
+            response = make_response("", 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        response.vary.add("Accept")
+        # let clients keep the body but revalidate it on every use
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+
+    return wrapper
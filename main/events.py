@@ -0,0 +1,125 @@
+# main/events.py
+"""
+Commit-time notifications for writes to the transactions table.
+
+Inserts, updates and deletes of Transaction rows made through the ORM unit
+of work are collected during flush and handed to registered listeners once
+the surrounding commit succeeds (and dropped on rollback). Each change
+carries the row's old and new (user_id, date_time, amount) values so
+listeners can apply deltas instead of re-reading the table.
+
+Bulk Query.update/delete statements and creating or dropping the table are
+reported as a change of None, meaning "unknown - resync". Core-level bulk
+inserts (bulk_insert_mappings, raw SQL) are not seen at all.
+"""
+
+import logging
+import time
+from collections import namedtuple
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from models import Transaction
+
+TxnRow = namedtuple("TxnRow", "user_id date_time amount")
+TxnChange = namedtuple("TxnChange", "old new")
+
+_CHANGES_KEY = "transaction_changes"
+_STARTED_KEY = "transaction_commit_started"
+_TRACKED = ("user_id", "date_time", "amount")
+
+_listeners = []
+log = logging.getLogger(__name__)
+
+
+def on_transaction_change(func):
+    """
+    Register func(changes, commit_started) to run after each commit that
+    touched transactions. commit_started is a time.monotonic() stamp taken
+    just before the commit was issued.
+    """
+    _listeners.append(func)
+    return func
+
+
+def _row(obj):
+    amount = obj.amount
+    return TxnRow(obj.user_id, obj.date_time, None if amount is None else float(amount))
+
+
+def _committed_row(obj):
+    """Values as last loaded from the database, or None if not loaded."""
+    state = inspect(obj)
+    values = []
+    for key in _TRACKED:
+        hist = state.attrs[key].history
+        if hist.deleted:
+            values.append(hist.deleted[0])
+        elif hist.unchanged:
+            values.append(hist.unchanged[0])
+        else:
+            return None
+    user_id, date_time, amount = values
+    return TxnRow(user_id, date_time, None if amount is None else float(amount))
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_changes(session, flush_context, instances):
+    changes = session.info.setdefault(_CHANGES_KEY, [])
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            changes.append(TxnChange(None, _row(obj)))
+    for obj in session.dirty:
+        if isinstance(obj, Transaction) and session.is_modified(obj):
+            old = _committed_row(obj)
+            # old values not loaded -> cannot express as a delta
+            changes.append(TxnChange(old, _row(obj)) if old else None)
+    for obj in session.deleted:
+        if isinstance(obj, Transaction):
+            changes.append(TxnChange(_row(obj), None))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _flag_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and mapper.class_ is Transaction:
+            orm_execute_state.session.info.setdefault(_CHANGES_KEY, []).append(None)
+
+
+@event.listens_for(Session, "before_commit")
+def _stamp_commit(session):
+    # pending objects are only flushed after this hook, so always stamp
+    session.info[_STARTED_KEY] = time.monotonic()
+
+
+def _notify(changes, started):
+    # the write is already committed: a failing listener must neither fail
+    # the request nor keep the others from running
+    for listener in _listeners:
+        try:
+            listener(changes, started)
+        except Exception:
+            log.exception("Transaction change listener %r failed", listener)
+
+
+@event.listens_for(Session, "after_commit")
+def _dispatch_changes(session):
+    changes = session.info.pop(_CHANGES_KEY, None)
+    started = session.info.pop(_STARTED_KEY, time.monotonic())
+    if not changes:
+        return
+    _notify(changes, started)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    session.info.pop(_CHANGES_KEY, None)
+    session.info.pop(_STARTED_KEY, None)
+
+
+@event.listens_for(Transaction.__table__, "after_create")
+@event.listens_for(Transaction.__table__, "after_drop")
+def _table_recreated(target, connection, **kw):
+    _notify([None], time.monotonic())
@@ -0,0 +1,185 @@
+# main/jobs.py
+"""
+Background analysis jobs.
+
+Long analyses are submitted as jobs instead of running inside the request:
+the job row lives in the analysis_jobs table (so any worker process can
+answer a status poll), and the work itself runs on a bounded thread pool in
+the submitting process. Identical in-flight jobs from the same user are
+deduplicated, and finished results are kept for JOB_RESULT_TTL seconds.
+A job still queued or running JOB_TIMEOUT seconds after it was queued or
+started (its process died, say) is marked failed, so it stops holding a
+JOB_MAX_PENDING slot and deduplicating new submissions.
+
+JOB_WORKERS = 0 runs each job inline at submit time (handy for tests and
+single-threaded debugging).
+"""
+
+import hashlib
+import json
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+
+from extensions import db
+from models import AnalysisJob
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+IN_FLIGHT = (JOB_QUEUED, JOB_RUNNING)
+
+
+class JobQueueFull(Exception):
+    """Raised when JOB_MAX_PENDING jobs are already queued or running."""
+
+
+def _utcnow():
+    # naive UTC: the columns are timezone-less so SQLite and Postgres agree
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def dedupe_key(user_id, kind, params):
+    canonical = json.dumps([user_id, kind, params], sort_keys=True, default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class JobRunner:
+    """Flask extension owning the job worker pool."""
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault("JOB_WORKERS", 2)
+        app.config.setdefault("JOB_RESULT_TTL", 600)
+        app.config.setdefault("JOB_MAX_PENDING", 32)
+        app.config.setdefault("JOB_TIMEOUT", 900)
+        app.extensions["analysis_jobs"] = self
+
+    def _get_executor(self, workers):
+        # created lazily so config changes made after create_app still apply
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="analysis-job"
+            )
+        return self._executor
+
+    def submit(self, user_id, kind, params, func):
+        """
+        Queue func(params) as a job, or return the identical in-flight job.
+        Returns (job, created).
+        """
+        key = dedupe_key(user_id, kind, params)
+        config = current_app.config
+        with self._lock:
+            self._sweep(config)
+            existing = AnalysisJob.query.filter(
+                AnalysisJob.dedupe_key == key, AnalysisJob.status.in_(IN_FLIGHT)
+            ).first()
+            if existing:
+                return existing, False
+            pending = AnalysisJob.query.filter(
+                AnalysisJob.status.in_(IN_FLIGHT)
+            ).count()
+            if pending >= config["JOB_MAX_PENDING"]:
+                raise JobQueueFull()
+            job = AnalysisJob(
+                id=uuid.uuid4().hex,
+                user_id=user_id,
+                kind=kind,
+                dedupe_key=key,
+                status=JOB_QUEUED,
+                created_at=_utcnow(),
+            )
+            db.session.add(job)
+            db.session.commit()
+
+        app = current_app._get_current_object()
+        if config["JOB_WORKERS"] > 0:
+            executor = self._get_executor(config["JOB_WORKERS"])
+            executor.submit(self._run, app, job.id, func, params)
+        else:
+            self._run(app, job.id, func, params)
+            db.session.refresh(job)
+        return job, True
+
+    def get(self, job_id, user_id):
+        """The caller's job, or None if unknown, expired or someone else's."""
+        job = db.session.get(AnalysisJob, job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        if job.expires_at and job.expires_at < _utcnow():
+            return None
+        return job
+
+    def _run(self, app, job_id, func, params):
+        with app.app_context():
+            job = db.session.get(AnalysisJob, job_id)
+            if job is None or job.status != JOB_QUEUED:
+                # timed out while waiting for a worker
+                return
+            job.status = JOB_RUNNING
+            job.started_at = _utcnow()
+            db.session.commit()
+            try:
+                job.result = app.json.dumps(func(params))
+                job.status = JOB_DONE
+            except Exception as e:
+                app.logger.exception("Analysis job %s failed", job_id)
+                db.session.rollback()
+                job = db.session.get(AnalysisJob, job_id)
+                job.status = JOB_FAILED
+                job.error = str(e)
+            job.finished_at = _utcnow()
+            job.expires_at = job.finished_at + timedelta(
+                seconds=app.config["JOB_RESULT_TTL"]
+            )
+            db.session.commit()
+
+    @staticmethod
+    def _sweep(config):
+        now = _utcnow()
+        AnalysisJob.query.filter(AnalysisJob.expires_at < now).delete()
+        cutoff = now - timedelta(seconds=config["JOB_TIMEOUT"])
+        AnalysisJob.query.filter(
+            AnalysisJob.status.in_(IN_FLIGHT),
+            db.func.coalesce(AnalysisJob.started_at, AnalysisJob.created_at) < cutoff,
+        ).update(
+            {
+                AnalysisJob.status: JOB_FAILED,
+                AnalysisJob.error: "timed out",
+                AnalysisJob.finished_at: now,
+                AnalysisJob.expires_at: now
+                + timedelta(seconds=config["JOB_RESULT_TTL"]),
+            },
+            synchronize_session=False,
+        )
+        db.session.commit()
+
+
+def job_payload(job):
+    """JSON-ready view of a job for the status endpoint."""
+    payload = {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "created_at": job.created_at.isoformat(),
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == JOB_DONE:
+        payload["result"] = json.loads(job.result)
+    elif job.status == JOB_FAILED:
+        payload["error"] = job.error
+    return payload
+
+
+jobs = JobRunner()
@@ -0,0 +1,52 @@
+# main/json_provider.py
+"""
+orjson-backed JSON provider.
+
+orjson encodes large lists of dicts several times faster than the stdlib
+json module and serialises numpy arrays/scalars natively. It is optional:
+without it (or with JSON_PROVIDER = "default") Flask's stdlib provider is
+kept. Output matches the default provider for the payloads this app builds
+(sorted keys, compact separators), except that NaN/inf become null rather
+than invalid JSON literals.
+"""
+
+import decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    option = 0
+    if orjson is not None:
+        option = (
+            orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+        )
+
+    @staticmethod
+    def _default(obj):
+        if isinstance(obj, decimal.Decimal):
+            return float(obj)
+        return DefaultJSONProvider.default(obj)
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._default, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = orjson.dumps(obj, default=self._default, option=self.option)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+
+def init_json(app):
+    """Install the orjson provider unless disabled or not installed."""
+    app.config.setdefault("JSON_PROVIDER", "orjson")
+    if app.config["JSON_PROVIDER"] == "orjson" and orjson is not None:
+        app.json = OrjsonProvider(app)
@@ -0,0 +1,287 @@
+# main/metrics.py
+"""
+Request timing and hot-path instrumentation, exposed at /metrics in the
+Prometheus text format.
+
+With METRICS_ENABLED, init_metrics installs:
+  - http_request_duration_seconds{endpoint,method,status} per request
+    (time to build the response; streamed bodies are not included)
+  - db_query_duration_seconds{statement} for every SQL statement, via
+    main.sqltiming (count is the _count series)
+  - db_pool_checkout_seconds: time spent waiting for a pooled connection
+  - span_duration_seconds{span} for named stages (span(): DB fetch,
+    filtering, stats, chart rendering, base64 encoding, ...)
+  - result cache and single-flight counters, read at scrape time
+
+Disabled (the default), no hooks are installed and span() returns at once,
+so instrumented code pays only a flag check. Metrics are per process; with
+several workers, scrape each one or use a single-process server.
+No client library is needed: the registry below is deliberately small.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+
+from flask import Response, request
+
+from extensions import db
+
+from . import sqltiming
+from .cache import result_cache
+from .singleflight import analysis_flight
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+
+_enabled = False
+
+
+def _format_labels(names, values):
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(
+            n, str(v).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+        )
+        for n, v in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # labels -> [bucket counts..., sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [0] * (len(self.buckets) + 2)
+            state[index] += 1
+            state[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        names = self.labelnames + ("le",)
+        for labels, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                yield (
+                    self.name + "_bucket",
+                    _format_labels(names, labels + (le,)),
+                    cumulative,
+                )
+            base = _format_labels(self.labelnames, labels)
+            yield self.name + "_count", base, cumulative
+            yield self.name + "_sum", base, state[-1]
+
+
+class CallbackGauge:
+    """Gauge (or counter) whose labelled values are read at scrape time."""
+
+    def __init__(self, name, documentation, labelnames, func, kind="gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.kind = kind
+        self._func = func
+
+    def samples(self):
+        for labels, value in self._func().items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def exposition(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+REQUEST_DURATION = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "Time to handle a request, by endpoint",
+        ("endpoint", "method", "status"),
+    )
+)
+QUERY_DURATION = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "SQL statement execution time",
+        ("statement",),
+    )
+)
+POOL_CHECKOUT = registry.register(
+    Histogram(
+        "db_pool_checkout_seconds",
+        "Time spent waiting for a pooled database connection",
+        buckets=(0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+    )
+)
+SPAN_DURATION = registry.register(
+    Histogram("span_duration_seconds", "Time spent in a named stage", ("span",))
+)
+registry.register(
+    CallbackGauge(
+        "result_cache_requests_total",
+        "Result cache lookups by outcome",
+        ("result",),
+        lambda: {(k,): v for k, v in result_cache.stats().items()},
+        kind="counter",
+    )
+)
+registry.register(
+    CallbackGauge(
+        "singleflight_calls",
+        "Single-flight calls, executions, coalesced calls and calls in flight",
+        ("kind",),
+        lambda: {(k,): v for k, v in analysis_flight.stats().items()},
+    )
+)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        SPAN_DURATION.observe(time.perf_counter() - self.start, self.name)
+
+
+_NO_SPAN = nullcontext()
+
+
+def span(name):
+    """Time the enclosed block as span_duration_seconds{span=name}."""
+    return _Span(name) if _enabled else _NO_SPAN
+
+
+def _statement_kind(statement):
+    word = statement.lstrip()[:6].upper()
+    return word if word in SQL_STATEMENTS else "OTHER"
+
+
+def _observe_query(conn, statement, parameters, many, seconds):
+    QUERY_DURATION.observe(seconds, _statement_kind(statement))
+
+
+def _time_pool_checkout(pool):
+    """Wrap pool.connect so checkout waits are observed."""
+    connect = pool.connect
+    if getattr(connect, "_metrics_timed", False):
+        return
+
+    def timed_connect():
+        start = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            if _enabled:
+                POOL_CHECKOUT.observe(time.perf_counter() - start)
+
+    timed_connect._metrics_timed = True
+    pool.connect = timed_connect
+
+
+def _start_timer():
+    request.environ["metrics.start"] = time.perf_counter()
+
+
+def observe_request(seconds, endpoint, method, status):
+    """Record one request's duration (also used by the ASGI app)."""
+    if _enabled:
+        REQUEST_DURATION.observe(seconds, endpoint, method, str(status))
+
+
+def _observe_request(response):
+    start = request.environ.get("metrics.start")
+    if start is not None:
+        observe_request(
+            time.perf_counter() - start,
+            request.endpoint or "unmatched",
+            request.method,
+            response.status_code,
+        )
+    return response
+
+
+def metrics_view():
+    return Response(registry.exposition(), mimetype=CONTENT_TYPE)
+
+
+def init_metrics(app):
+    """Install the hooks and /metrics when METRICS_ENABLED."""
+    global _enabled
+    app.config.setdefault("METRICS_ENABLED", False)
+    app.config.setdefault("METRICS_TOKEN", None)
+    if not app.config["METRICS_ENABLED"]:
+        return
+    _enabled = True
+    sqltiming.subscribe(_observe_query)
+    with app.app_context():
+        for engine in db.engines.values():
+            _time_pool_checkout(engine.pool)
+    app.before_request(_start_timer)
+    app.after_request(_observe_request)
+
+    token = app.config["METRICS_TOKEN"]
+
+    def view():
+        if token and request.headers.get("Authorization") != f"Bearer {token}":
+            return Response("Unauthorized\n", 401)
+        return metrics_view()
+
+    app.add_url_rule("/metrics", "metrics", view)
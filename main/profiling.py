@@ -0,0 +1,175 @@
+# main/profiling.py
+"""
+On-demand profiling of single requests.
+
+With PROFILING_ENABLED and a PROFILING_TOKEN configured, a request to an
+api/main view that carries `X-Profile: <token>` (or `?_profile=<token>`)
+runs under cProfile, with every SQL statement it issues recorded (text and
+duration; parameters are not kept). The result is written to PROFILE_DIR
+as <id>.pstats (load with pstats / snakeviz, or convert for speedscope)
+plus <id>.json (request, timings, SQL, top functions), and the response
+carries X-Profile-Id. Fetch them with the same token from
+GET /api/profiles/<id> (summary) or /api/profiles/<id>?format=pstats.
+
+Only the newest PROFILE_KEEP profiles are kept. Untagged requests pay one
+dict lookup; without PROFILING_ENABLED nothing is installed at all.
+"""
+
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import time
+import uuid
+from contextvars import ContextVar
+
+from flask import abort, current_app, jsonify, request, send_file
+
+from . import sqltiming
+
+PROFILED_BLUEPRINTS = ("api", "main")
+TOP_FUNCTIONS = 30
+
+_sql_log = ContextVar("profiling_sql_log", default=None)
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def _record_query(conn, statement, parameters, many, seconds):
+    log = _sql_log.get()
+    if log is not None:
+        log.append({"statement": statement, "duration_ms": round(seconds * 1000, 3)})
+
+
+def _authorised(supplied):
+    token = current_app.config["PROFILING_TOKEN"]
+    return bool(token and supplied) and hmac.compare_digest(
+        supplied.encode(), token.encode()
+    )
+
+
+def _requested():
+    return _authorised(request.headers.get("X-Profile") or request.args.get("_profile"))
+
+
+def _profile_dir(app):
+    return app.config["PROFILE_DIR"] or os.path.join(app.instance_path, "profiles")
+
+
+def _top_functions(profiler):
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, name), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append(
+            {
+                "function": f"{filename}:{line}({name})",
+                "calls": nc,
+                "tottime_ms": round(tt * 1000, 3),
+                "cumtime_ms": round(ct * 1000, 3),
+            }
+        )
+    rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+    return rows[:TOP_FUNCTIONS]
+
+
+def _prune(directory, keep):
+    profiles = sorted(
+        (e for e in os.scandir(directory) if e.name.endswith(".json")),
+        key=lambda e: e.stat().st_mtime,
+    )
+    for entry in profiles[: max(len(profiles) - keep, 0)]:
+        for suffix in (".json", ".pstats"):
+            try:
+                os.remove(entry.path[: -len(".json")] + suffix)
+            except FileNotFoundError:
+                pass
+
+
+def _start():
+    if request.blueprint not in PROFILED_BLUEPRINTS or not _requested():
+        return
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # another request is already being profiled (one profiler per process
+        # on newer Pythons); serve this one normally
+        return
+    request.environ["profiling.state"] = (
+        profiler,
+        _sql_log.set([]),
+        time.perf_counter(),
+    )
+
+
+def _finish(response):
+    state = request.environ.pop("profiling.state", None)
+    if state is None:
+        return response
+    profiler, sql_token, started = state
+    profiler.disable()
+    elapsed = time.perf_counter() - started
+    sql = _sql_log.get() or []
+    _sql_log.reset(sql_token)
+
+    app = current_app._get_current_object()
+    directory = _profile_dir(app)
+    os.makedirs(directory, exist_ok=True)
+    profile_id = uuid.uuid4().hex
+    profiler.dump_stats(os.path.join(directory, f"{profile_id}.pstats"))
+    summary = {
+        "id": profile_id,
+        "method": request.method,
+        "path": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint,
+        "status": response.status_code,
+        "duration_ms": round(elapsed * 1000, 3),
+        "sql_count": len(sql),
+        "sql_ms": round(sum(q["duration_ms"] for q in sql), 3),
+        "sql": sql,
+        "top_functions": _top_functions(profiler),
+    }
+    with open(os.path.join(directory, f"{profile_id}.json"), "w") as fh:
+        json.dump(summary, fh, indent=1)
+    _prune(directory, app.config["PROFILE_KEEP"])
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def profile_view(profile_id):
+    if not _authorised(request.headers.get("X-Profile")):
+        abort(403)
+    if not _PROFILE_ID.match(profile_id):
+        abort(404)
+    directory = _profile_dir(current_app)
+    if request.args.get("format") == "pstats":
+        path = os.path.join(directory, f"{profile_id}.pstats")
+        if not os.path.exists(path):
+            abort(404)
+        return send_file(
+            path,
+            mimetype="application/octet-stream",
+            as_attachment=True,
+            download_name=f"{profile_id}.pstats",
+        )
+    try:
+        with open(os.path.join(directory, f"{profile_id}.json")) as fh:
+            return jsonify(json.load(fh))
+    except FileNotFoundError:
+        abort(404)
+
+
+def init_profiling(app):
+    """Install the profiling hooks and download route when enabled."""
+    app.config.setdefault("PROFILING_ENABLED", False)
+    app.config.setdefault("PROFILING_TOKEN", None)
+    app.config.setdefault("PROFILE_DIR", None)
+    app.config.setdefault("PROFILE_KEEP", 50)
+    if not app.config["PROFILING_ENABLED"]:
+        return
+    sqltiming.subscribe(_record_query)
+    app.before_request(_start)
+    app.after_request(_finish)
+    app.add_url_rule("/api/profiles/<profile_id>", "profile", profile_view)
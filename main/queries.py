@@ -0,0 +1,126 @@
+# main/queries.py
+"""
+Filter / sort / aggregate parameters for transaction listings, turned into
+one SQL statement so the database does the work (using the date_time and
+amount indexes) instead of the client or a Python loop.
+"""
+
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func, select
+
+from models import Transaction
+
+# ?sort= accepts these names, optionally prefixed with "-" for descending
+SORT_FIELDS = {
+    "id": Transaction.id,
+    "dateTime": Transaction.date_time,
+    "amount": Transaction.amount,
+}
+INCLUDE_OPTIONS = ("total", "count")
+FILTER_PARAMS = ("min_amount", "max_amount", "start", "end", "q", "sort", "include")
+
+
+def _decimal(args, name):
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        number = Decimal(value)
+    except InvalidOperation:
+        number = None
+    if number is None or not number.is_finite():
+        raise ValueError(f"{name} must be a number")
+    return number
+
+
+def _datetime(args, name):
+    value = args.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or datetime")
+
+
+def parse_transaction_filters(args):
+    """
+    Validated filters from query args; raises ValueError with a message
+    suitable for a 400 response.
+    """
+    sort = []
+    for token in filter(None, args.get("sort", "").split(",")):
+        name = token.lstrip("-")
+        if name not in SORT_FIELDS:
+            raise ValueError(f"sort fields must be among {tuple(SORT_FIELDS)}")
+        sort.append((name, token.startswith("-")))
+    include = tuple(filter(None, args.get("include", "").split(",")))
+    if any(item not in INCLUDE_OPTIONS for item in include):
+        raise ValueError(f"include must be among {INCLUDE_OPTIONS}")
+    return {
+        "min_amount": _decimal(args, "min_amount"),
+        "max_amount": _decimal(args, "max_amount"),
+        "start": _datetime(args, "start"),
+        "end": _datetime(args, "end"),
+        "q": args.get("q") or None,
+        "sort": tuple(sort),
+        "include": include,
+    }
+
+
+def transactions_select(filters):
+    """
+    SELECT id, date_time, amount, description for the filters, plus
+    total/count window columns when requested so the aggregates arrive in
+    the same round trip as the rows.
+    """
+    columns = [
+        Transaction.id,
+        Transaction.date_time,
+        Transaction.amount,
+        Transaction.description,
+    ]
+    if "total" in filters["include"]:
+        columns.append(func.sum(Transaction.amount).over().label("agg_total"))
+    if "count" in filters["include"]:
+        columns.append(func.count().over().label("agg_count"))
+    stmt = select(*columns)
+
+    if filters["min_amount"] is not None:
+        stmt = stmt.where(Transaction.amount >= filters["min_amount"])
+    if filters["max_amount"] is not None:
+        stmt = stmt.where(Transaction.amount <= filters["max_amount"])
+    if filters["start"] is not None:
+        stmt = stmt.where(Transaction.date_time >= filters["start"])
+    if filters["end"] is not None:
+        stmt = stmt.where(Transaction.date_time <= filters["end"])
+    if filters["q"]:
+        pattern = re.sub(r"([\\%_])", r"\\\1", filters["q"])
+        stmt = stmt.where(Transaction.description.ilike(f"%{pattern}%", escape="\\"))
+
+    for name, descending in filters["sort"]:
+        column = SORT_FIELDS[name]
+        stmt = stmt.order_by(column.desc() if descending else column.asc())
+    if filters["sort"]:
+        # stable paging order between equal sort keys
+        stmt = stmt.order_by(Transaction.id)
+    return stmt
+
+
+def totals_select(filters):
+    """SELECT (sum of amount, row count) over the filtered transactions."""
+    rows = transactions_select(dict(filters, sort=(), include=())).subquery()
+    return select(func.coalesce(func.sum(rows.c.amount), 0), func.count())
+
+
+def aggregates(rows, include):
+    """The requested total/count from the window columns of the result."""
+    result = {}
+    if "total" in include:
+        result["total"] = float(rows[0].agg_total) if rows else 0.0
+    if "count" in include:
+        result["count"] = rows[0].agg_count if rows else 0
+    return result
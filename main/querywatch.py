@@ -0,0 +1,164 @@
+# main/querywatch.py
+"""
+Query counting, N+1 and slow-statement detection for development and tests.
+
+watch_queries() records every SQL statement issued inside the block, in this
+context, with its duration. A statement whose text repeats within one block
+is usually a lazy relationship or per-row lookup in a loop (N+1); a slow one
+on Postgres gets its EXPLAIN plan attached.
+
+With QUERY_WATCH_ENABLED, every request is watched: the response carries
+X-Query-Count, and the app logger warns about statements run
+QUERY_WATCH_REPEAT or more times and those slower than SLOW_QUERY_MS. The
+tests use the same recorder through the query_budget fixture
+(tests/conftest.py) to cap the statements an endpoint may issue.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import current_app, request
+
+from . import sqltiming
+
+EXPLAINED_STATEMENTS = ("SELECT", "WITH")
+# transaction control from nested transactions (begin_nested, the tests'
+# rolled-back sessions) is not a query and is not recorded
+SKIPPED_STATEMENTS = ("SAVEPOINT", "RELEASE", "ROLLBACK")
+
+_active = ContextVar("querywatch_logs", default=())
+
+
+class QueryLog:
+    """Statements recorded by one watch_queries() block."""
+
+    def __init__(self, slow_ms=None, explain=False):
+        self.slow_ms = slow_ms
+        self.explain = explain
+        self.statements = []  # [statement, duration_ms, plan]
+
+    def __len__(self):
+        return len(self.statements)
+
+    @property
+    def total_ms(self):
+        return sum(duration for _, duration, _ in self.statements)
+
+    def repeated(self, threshold=2):
+        """{statement: count} for statements issued threshold or more times."""
+        counts = Counter(statement for statement, _, _ in self.statements)
+        return {s: n for s, n in counts.items() if n >= threshold}
+
+    def slow(self):
+        if self.slow_ms is None:
+            return []
+        return [entry for entry in self.statements if entry[1] >= self.slow_ms]
+
+    def report(self, repeat_threshold=2):
+        lines = [f"{len(self)} statements in {self.total_ms:.1f} ms"]
+        for statement, count in self.repeated(repeat_threshold).items():
+            lines.append(f"repeated {count}x (possible N+1): {statement}")
+        for statement, duration, plan in self.slow():
+            lines.append(f"slow ({duration:.1f} ms): {statement}")
+            if plan:
+                lines.append("  " + plan.replace("\n", "\n  "))
+        return "\n".join(lines)
+
+
+def _explain(conn, statement, parameters):
+    # a separate DB-API cursor, so the statement's own results are untouched;
+    # the savepoint keeps a failed EXPLAIN from aborting the transaction
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("SAVEPOINT querywatch_explain")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception as exc:
+            cursor.execute("ROLLBACK TO SAVEPOINT querywatch_explain")
+            plan = f"EXPLAIN failed: {exc}"
+        cursor.execute("RELEASE SAVEPOINT querywatch_explain")
+        return plan
+    except Exception as exc:
+        return f"EXPLAIN failed: {exc}"
+    finally:
+        cursor.close()
+
+
+def _skipped(statement):
+    return statement.lstrip()[:9].upper().startswith(SKIPPED_STATEMENTS)
+
+
+def _record(conn, statement, parameters, many, seconds):
+    logs = _active.get()
+    if not logs or _skipped(statement):
+        return
+    duration = seconds * 1000
+    plan = None
+    if (
+        not many
+        and conn.dialect.name == "postgresql"
+        and statement.lstrip()[:6].upper().startswith(EXPLAINED_STATEMENTS)
+        and any(
+            log.explain and log.slow_ms is not None and duration >= log.slow_ms
+            for log in logs
+        )
+    ):
+        plan = _explain(conn, statement, parameters)
+    for log in logs:
+        log.statements.append([statement, duration, plan])
+
+
+@contextmanager
+def watch_queries(slow_ms=None, explain=False):
+    """Record the SQL issued in this block; yields the QueryLog."""
+    sqltiming.subscribe(_record)
+    log = QueryLog(slow_ms, explain)
+    token = _active.set(_active.get() + (log,))
+    try:
+        yield log
+    finally:
+        _active.reset(token)
+
+
+def _start_watch():
+    config = current_app.config
+    watch = watch_queries(config["SLOW_QUERY_MS"], config["QUERY_WATCH_EXPLAIN"])
+    request.environ["querywatch.state"] = (watch, watch.__enter__())
+
+
+def _report(response):
+    state = request.environ.get("querywatch.state")
+    if state is None:
+        return response
+    log = state[1]
+    response.headers["X-Query-Count"] = str(len(log))
+    warn_if_suspicious(current_app, log, request.method, request.path)
+    return response
+
+
+def warn_if_suspicious(app, log, method, path):
+    """Log a request's repeated and slow statements as a warning, if any."""
+    threshold = app.config["QUERY_WATCH_REPEAT"]
+    if log.repeated(threshold) or log.slow():
+        app.logger.warning("%s %s: %s", method, path, log.report(threshold))
+
+
+def _end_watch(exc):
+    state = request.environ.pop("querywatch.state", None)
+    if state is not None:
+        state[0].__exit__(None, None, None)
+
+
+def init_query_watch(app):
+    """Watch every request's SQL when QUERY_WATCH_ENABLED."""
+    app.config.setdefault("QUERY_WATCH_ENABLED", False)
+    app.config.setdefault("QUERY_WATCH_REPEAT", 3)
+    app.config.setdefault("SLOW_QUERY_MS", 100)
+    app.config.setdefault("QUERY_WATCH_EXPLAIN", True)
+    if not app.config["QUERY_WATCH_ENABLED"]:
+        return
+    app.before_request(_start_watch)
+    app.after_request(_report)
+    app.teardown_request(_end_watch)
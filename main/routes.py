@@ -5,25 +5,104 @@ from io import BytesIO
 import matplotlib
 import matplotlib.dates as mdates
 import matplotlib.pyplot as plt
-from flask import Blueprint, redirect, render_template, request, url_for
+from flask import (
+    Blueprint,
+    Response,
+    abort,
+    current_app,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_template,
+    url_for,
+)
 
 from auth.utils import login_required
+from extensions import db
+from models import Transaction
 
 from .data import transactions
+from .queries import parse_transaction_filters, totals_select, transactions_select
 from .stats.abtest import remove_outliers, t_test
-from .stats.regression import compute_regression
+from .stats.grouping import GROUP_BY_OPTIONS, group_codes
+from .stats.regression import compute_regression, grouped_regression
 
 main_bp = Blueprint("main", __name__, template_folder="../templates")
 matplotlib.use("Agg")
 
 
+# rows fetched per DB round trip and characters per response chunk when
+# streaming the transactions page
+STREAM_ROWS = 1000
+STREAM_CHUNK_SIZE = 16384
+
+
+def _page_args():
+    """(page, per_page) from the query; per_page=0 renders every row."""
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    try:
+        per_page = max(int(request.args["per_page"]), 0)
+    except (KeyError, ValueError):
+        per_page = current_app.config.get("TRANSACTIONS_PER_PAGE", 50)
+    return page, per_page
+
+
+def _chunked(parts, size=STREAM_CHUNK_SIZE):
+    """Join streamed template output into chunks of about size characters."""
+    buffer, length = [], 0
+    for part in parts:
+        buffer.append(part)
+        length += len(part)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
 @main_bp.route("/transactions")
 @login_required
 def get_transactions():
-    total = sum(t["amount"] for t in transactions)
-    return render_template(
-        "transactions.html", transactions=transactions, total_amount=total
+    """
+    Transactions filtered by the same query args as the API listing, oldest
+    first by default, one page at a time. The page is streamed: rows are
+    rendered as they arrive from the DB cursor, and the total and row count
+    come from a separate SQL aggregate, so neither the rows nor the page are
+    ever held in memory whole.
+    """
+    try:
+        filters = parse_transaction_filters(request.args)
+    except ValueError as exc:
+        return str(exc), 400
+    filters["sort"] = filters["sort"] or (("dateTime", False),)
+    filters["include"] = ()
+
+    page, per_page = _page_args()
+    total, count = db.session.execute(totals_select(filters)).one()
+    pages = max(-(-count // per_page), 1) if per_page else 1
+    if page > pages:
+        abort(404)
+
+    stmt = transactions_select(filters)
+    if per_page:
+        stmt = stmt.limit(per_page).offset((page - 1) * per_page)
+    rows = db.session.execute(stmt.execution_options(yield_per=STREAM_ROWS))
+
+    query_args = request.args.to_dict()
+    query_args.pop("page", None)
+    body = stream_template(
+        "transactions.html",
+        transactions=rows,
+        total_amount=total,
+        page=page,
+        pages=pages,
+        query_args=query_args,
     )
+    return Response(_chunked(body), mimetype="text/html")
 
 
 @main_bp.route("/add", methods=["GET", "POST"])
@@ -32,38 +111,35 @@ def add_transaction():
     if request.method == "POST":
         try:
             # Read the full date+time from the form (e.g. "2025-06-13T09:00")
-            dt_str = request.form["dateTime"]
-            dt = datetime.fromisoformat(dt_str)
-
+            dt = datetime.fromisoformat(request.form["dateTime"])
             amt = float(request.form["amount"])
-
-            transactions.append(
-                {
-                    "id": len(transactions) + 1,
-                    # Match your other entries' format: "YYYY-MM-DD HH:MM:SS"
-                    "date": dt.strftime("%Y-%m-%d %H:%M:%S"),
-                    "amount": amt,
-                }
-            )
-
-            return redirect(url_for("main.get_transactions"))
-
         except (ValueError, KeyError):
             return "Invalid input", 400
 
+        db.session.add(
+            Transaction(user_id=session["user_id"], date_time=dt, amount=amt)
+        )
+        db.session.commit()
+        return redirect(url_for("main.get_transactions"))
+
     return render_template("form.html")
 
 
 @main_bp.route("/edit/<int:transaction_id>", methods=["GET", "POST"])
 @login_required
 def edit_transaction(transaction_id):
-    txn = next((t for t in transactions if t["id"] == transaction_id), None)
+    txn = db.session.get(Transaction, transaction_id)
     if not txn:
         return {"message": "Not found"}, 404
 
     if request.method == "POST":
-        txn["date"] = request.form["date"]
-        txn["amount"] = float(request.form["amount"])
+        try:
+            txn.date_time = datetime.fromisoformat(request.form["date"])
+            txn.amount = float(request.form["amount"])
+        except (ValueError, KeyError):
+            db.session.rollback()
+            return "Invalid input", 400
+        db.session.commit()
         return redirect(url_for("main.get_transactions"))
 
     return render_template("edit.html", transaction=txn)
@@ -72,8 +148,10 @@ def edit_transaction(transaction_id):
 @main_bp.route("/delete/<int:transaction_id>")
 @login_required
 def delete_transaction(transaction_id):
-    global transactions
-    transactions[:] = [t for t in transactions if t["id"] != transaction_id]
+    txn = db.session.get(Transaction, transaction_id)
+    if txn:
+        db.session.delete(txn)
+        db.session.commit()
     return redirect(url_for("main.get_transactions"))
 
 
@@ -84,13 +162,10 @@ def search_transactions():
         try:
             lo = float(request.form["min_amount"])
             hi = float(request.form["max_amount"])
-            results = [t for t in transactions if lo <= t["amount"] <= hi]
-            total = sum(t["amount"] for t in results)
-            return render_template(
-                "transactions.html", transactions=results, total_amount=total
-            )
-        except ValueError:
+        except (ValueError, KeyError):
             return "Invalid input", 400
+        # results are the filtered, paged listing so page links keep the range
+        return redirect(url_for("main.get_transactions", min_amount=lo, max_amount=hi))
     return render_template("search.html")
 
 
@@ -107,6 +182,7 @@ def regression():
     start = request.values.get("start_date", "2024-01-01")
     end = request.values.get("end_date", "2024-12-31")
     period = request.values.get("period", "all")
+    group_by = request.values.get("group_by", "")
 
     # 2) Parse dates
     start_dt = datetime.fromisoformat(start)
@@ -141,6 +217,12 @@ def regression():
     else:
         result = {}
 
+    # 5) Optional per-group fits (hour/period/weekday/month) in one pass
+    groups = []
+    if group_by in GROUP_BY_OPTIONS and dates:
+        codes, labels = group_codes(dates, group_by)
+        groups = grouped_regression(timestamps, amounts, codes, labels)
+
     chart_img = None
     if dates and amounts and "slope" in result and "intercept" in result:
         fig, ax = plt.subplots()
@@ -175,6 +257,9 @@ def regression():
         start=start,
         end=end,
         period=period,
+        group_by=group_by,
+        group_by_options=GROUP_BY_OPTIONS,
+        groups=groups,
         result=result,
         chart_img=chart_img,
     )
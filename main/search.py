@@ -0,0 +1,133 @@
+# main/search.py
+"""
+Full-text search over transaction descriptions.
+
+Postgres: a generated `description_tsv` tsvector column with a GIN index,
+plus a pg_trgm GIN index on `description` for substring (ILIKE) search.
+SQLite: an external-content FTS5 table kept in sync by triggers. Both are
+created alongside the transactions table (so databases built with
+db.create_all have them too) and, for migrated Postgres databases, by the
+migration adding them. Both use unstemmed tokenisation ('simple' /
+unicode61) so results agree across backends. Other databases fall back to
+ILIKE.
+
+Neither index is mapped on the Transaction model, so the ORM and
+db.create_all stay portable; queries here are written per dialect.
+"""
+
+import re
+
+from sqlalchemy import DDL, DateTime, Float, Integer, Numeric, Text, event, text
+
+from extensions import db
+from models import Transaction
+
+SEARCH_MODES = ("fts", "substring")
+TS_CONFIG = "simple"
+
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS transactions_fts USING fts5("
+    " description, content='transactions', content_rowid='id')",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_ai AFTER INSERT ON transactions"
+    " BEGIN INSERT INTO transactions_fts(rowid, description)"
+    " VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_ad AFTER DELETE ON transactions"
+    " BEGIN INSERT INTO transactions_fts(transactions_fts, rowid, description)"
+    " VALUES ('delete', old.id, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS transactions_fts_au AFTER UPDATE ON transactions"
+    " BEGIN INSERT INTO transactions_fts(transactions_fts, rowid, description)"
+    " VALUES ('delete', old.id, old.description);"
+    " INSERT INTO transactions_fts(rowid, description)"
+    " VALUES (new.id, new.description); END",
+    # index rows that existed before the FTS table
+    "INSERT INTO transactions_fts(transactions_fts) VALUES ('rebuild')",
+)
+
+
+# same as migration c94f1a7e2b68
+_POSTGRES_DDL = (
+    "ALTER TABLE transactions ADD COLUMN description_tsv tsvector"
+    " GENERATED ALWAYS AS"
+    f" (to_tsvector('{TS_CONFIG}', coalesce(description, ''))) STORED",
+    "CREATE INDEX ix_transactions_description_tsv"
+    " ON transactions USING gin (description_tsv)",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX ix_transactions_description_trgm"
+    " ON transactions USING gin (description gin_trgm_ops)",
+)
+
+for _statement in _POSTGRES_DDL:
+    event.listen(
+        Transaction.__table__,
+        "after_create",
+        DDL(_statement).execute_if(dialect="postgresql"),
+    )
+
+
+@event.listens_for(Transaction.__table__, "after_create")
+def _create_sqlite_fts(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        for statement in _SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+
+
+@event.listens_for(Transaction.__table__, "after_drop")
+def _drop_sqlite_fts(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("DROP TABLE IF EXISTS transactions_fts")
+
+
+def _fts5_query(q):
+    """Every word must match; words are quoted so FTS5 syntax is inert."""
+    words = re.findall(r"\w+", q)
+    return " ".join('"{}"'.format(w.replace('"', '""')) for w in words)
+
+
+def _escape_like(q):
+    return re.sub(r"([\\%_])", r"\\\1", q)
+
+
+def search_transactions(q, mode="fts", limit=50, offset=0):
+    """
+    (id, date_time, amount, description, rank) rows matching q, best first.
+    rank is backend-specific (ts_rank or -bm25); substring mode ranks by id.
+    """
+    dialect = db.engine.dialect.name
+    params = {"q": q, "limit": limit, "offset": offset}
+    columns = "t.id, t.date_time, t.amount, t.description"
+
+    if mode == "fts" and dialect == "postgresql":
+        sql = (
+            f"SELECT {columns}, ts_rank(t.description_tsv, query) AS rank"
+            f" FROM transactions t, websearch_to_tsquery('{TS_CONFIG}', :q) query"
+            " WHERE t.description_tsv @@ query"
+            " ORDER BY rank DESC, t.id LIMIT :limit OFFSET :offset"
+        )
+    elif mode == "fts" and dialect == "sqlite":
+        params["q"] = _fts5_query(q)
+        if not params["q"]:
+            return []
+        sql = (
+            f"SELECT {columns}, -bm25(transactions_fts) AS rank"
+            " FROM transactions_fts JOIN transactions t"
+            " ON t.id = transactions_fts.rowid"
+            " WHERE transactions_fts MATCH :q"
+            " ORDER BY rank DESC, t.id LIMIT :limit OFFSET :offset"
+        )
+    else:
+        # substring search; served by the trigram index on Postgres
+        params["q"] = f"%{_escape_like(q)}%"
+        op = "ILIKE" if dialect == "postgresql" else "LIKE"
+        sql = (
+            f"SELECT {columns}, 0.0 AS rank FROM transactions t"
+            f" WHERE t.description {op} :q ESCAPE '\\'"
+            " ORDER BY t.id LIMIT :limit OFFSET :offset"
+        )
+    stmt = text(sql).columns(
+        id=Integer,
+        date_time=DateTime,
+        amount=Numeric(10, 2),
+        description=Text,
+        rank=Float,
+    )
+    return db.session.execute(stmt, params).all()
@@ -0,0 +1,66 @@
+# main/sqltiming.py
+"""
+Shared SQL statement timing.
+
+One set of SQLAlchemy cursor-execute hooks times every statement and hands
+the result to the subscribed listeners (metrics, profiling, querywatch)
+instead of each of them installing its own. The hooks go on the Engine
+class, so engines created later (the ASGI app's async engine) are covered
+too; they are installed by the first subscribe() and cost one check per
+statement while nothing is subscribed.
+
+A listener is called after each statement completes as
+    listener(conn, statement, parameters, many, seconds)
+on the thread (and context) that ran it. Failed statements are not
+reported.
+"""
+
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_lock = threading.Lock()
+_listeners = ()  # replaced, never mutated, so the hooks read it without locking
+_hooks_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    if _listeners:
+        conn.info.setdefault("sqltiming_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    starts = conn.info.get("sqltiming_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    for listener in _listeners:
+        listener(conn, statement, parameters, many, elapsed)
+
+
+def _on_error(context):
+    # a failed statement never reaches after_cursor_execute
+    starts = context.connection and context.connection.info.get("sqltiming_start")
+    if starts:
+        starts.pop()
+
+
+def subscribe(listener):
+    """Call listener after every SQL statement; subscribing twice is a no-op."""
+    global _listeners, _hooks_installed
+    with _lock:
+        if not _hooks_installed:
+            event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+            event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+            event.listen(Engine, "handle_error", _on_error)
+            _hooks_installed = True
+        if listener not in _listeners:
+            _listeners = _listeners + (listener,)
+
+
+def unsubscribe(listener):
+    global _listeners
+    with _lock:
+        _listeners = tuple(x for x in _listeners if x != listener)
@@ -2,11 +2,13 @@ import base64
 import io
 from datetime import datetime
 
-import matplotlib.pyplot as plt
 import numpy as np
 import scipy.stats as stats
+from matplotlib.figure import Figure
 
 from ..data import transactions
+from ..metrics import span
+from .resampling import bootstrap_ci, permutation_test
 
 
 def remove_outliers(data):
@@ -34,9 +36,18 @@ def t_test(groupA, groupB):
     return float(t_stat), float(pvalue)
 
 
-def run_ab_test(group_by="half", param_a="1", param_b="2"):
+def run_ab_test(
+    group_by="half",
+    param_a="1",
+    param_b="2",
+    n_resamples=None,
+    seed=None,
+    workers=1,
+    records=None,
+):
     """
     Run A/B test on transactions based on selected grouping.
+    `records` defaults to the module-level transactions list.
 
     Returns a dict with:
     - groupA: list of cleaned values
@@ -44,6 +55,7 @@ def run_ab_test(group_by="half", param_a="1", param_b="2"):
     - t_score: float
     - p_value: float
     - boxplot_img: base64 PNG
+    - permutation / bootstrap: resampling results (only when n_resamples is set)
     """
 
     def parse_txn_datetime(t):
@@ -62,19 +74,20 @@ def run_ab_test(group_by="half", param_a="1", param_b="2"):
         except ValueError:
             return None
 
+    if records is None:
+        records = transactions
+
     groupA = []
     groupB = []
+    mid = len(records) // 2
 
-    for t in transactions:
+    for idx, t in enumerate(records):
         dt = parse_txn_datetime(t)
         if not dt:
             continue
 
-        # Determine grouping key
         # Determine grouping key
         if group_by == "half":
-            idx = transactions.index(t)
-            mid = len(transactions) // 2
             txn_group = "1" if idx < mid else "2"
         elif group_by == "weekday":
             txn_group = str(dt.weekday())
@@ -99,28 +112,39 @@ def run_ab_test(group_by="half", param_a="1", param_b="2"):
         elif txn_group == param_b:
             groupB.append(amt)
 
-    groupA_clean = remove_outliers(groupA)
-    groupB_clean = remove_outliers(groupB)
+    with span("abtest.stats"):
+        groupA_clean = remove_outliers(groupA)
+        groupB_clean = remove_outliers(groupB)
 
-    # Compute t-statistic AND p-value
-    t_stat, p_val = t_test(groupA_clean, groupB_clean)
+        # Compute t-statistic AND p-value
+        t_stat, p_val = t_test(groupA_clean, groupB_clean)
 
     # Create boxplot
-    plt.figure(figsize=(6, 4))
-    plt.boxplot([groupA_clean, groupB_clean], labels=["Group A", "Group B"])
-    plt.title(f"A/B Test — {group_by}: {param_a} vs {param_b}")
-    plt.tight_layout()
-
-    buf = io.BytesIO()
-    plt.savefig(buf, format="png")
-    plt.close()
-    buf.seek(0)
-    boxplot_b64 = base64.b64encode(buf.read()).decode("ascii")
-
-    return {
+    # (standalone Figure rather than pyplot so it is safe in worker threads)
+    with span("abtest.chart"):
+        fig = Figure(figsize=(6, 4), layout="tight")
+        ax = fig.subplots()
+        ax.boxplot([groupA_clean, groupB_clean], labels=["Group A", "Group B"])
+        ax.set_title(f"A/B Test — {group_by}: {param_a} vs {param_b}")
+
+        buf = io.BytesIO()
+        fig.savefig(buf, format="png")
+    with span("abtest.encode"):
+        boxplot_b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+
+    result = {
         "groupA": groupA_clean,
         "groupB": groupB_clean,
         "t_score": t_stat,
         "p_value": p_val,
         "boxplot_img": boxplot_b64,
     }
+    if n_resamples:
+        with span("abtest.resampling"):
+            result["permutation"] = permutation_test(
+                groupA_clean, groupB_clean, n_resamples, seed=seed, workers=workers
+            )
+            result["bootstrap"] = bootstrap_ci(
+                groupA_clean, groupB_clean, n_resamples, seed=seed, workers=workers
+            )
+    return result
@@ -0,0 +1,182 @@
+# main/stats/anova.py
+
+import numpy as np
+import scipy.stats as stats
+from statsmodels.stats.multitest import multipletests
+
+from .grouping import group_codes
+
+CORRECTIONS = ("holm", "bonferroni", "fdr_bh", "none")
+
+
+def _finite_or_none(x):
+    x = float(x)
+    return x if np.isfinite(x) else None
+
+
+def _iqr_mask(values, codes, n_groups):
+    """
+    Per-group 1.5*IQR mask, equivalent to calling remove_outliers on each
+    group separately.
+    """
+    keep = np.ones(len(values), dtype=bool)
+    for g in range(n_groups):
+        in_group = codes == g
+        if not in_group.any():
+            continue
+        q1, q3 = np.percentile(values[in_group], [25, 75])
+        iqr = q3 - q1
+        keep[in_group] = (values[in_group] >= q1 - 1.5 * iqr) & (
+            values[in_group] <= q3 + 1.5 * iqr
+        )
+    return keep
+
+
+def group_accumulators(values, codes, n_groups):
+    """
+    Per-group count, mean and sum of squared deviations (M2) via bincount.
+    """
+    n = np.bincount(codes, minlength=n_groups).astype(float)
+    sums = np.bincount(codes, weights=values, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / n
+    m2 = np.bincount(codes, weights=(values - mean[codes]) ** 2, minlength=n_groups)
+    return n, mean, m2
+
+
+def one_way_anova(n, mean, m2):
+    """One-way ANOVA F-test from group accumulators."""
+    k = len(n)
+    total = n.sum()
+    if k < 2 or total <= k:
+        return None, None
+    grand = (n * mean).sum() / total
+    ssb = (n * (mean - grand) ** 2).sum()
+    ssw = m2.sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        f_stat = (ssb / (k - 1)) / (ssw / (total - k))
+    p_val = stats.f.sf(f_stat, k - 1, total - k)
+    return _finite_or_none(f_stat), _finite_or_none(p_val)
+
+
+def kruskal_wallis(values, codes, n_groups, n):
+    """
+    Kruskal-Wallis H-test computed from one global ranking and per-group
+    rank sums, with the standard tie correction.
+    """
+    total = len(values)
+    k = int((n > 0).sum())
+    if k < 2 or total < 2:
+        return None, None
+    ranks = stats.rankdata(values)
+    rank_sums = np.bincount(codes, weights=ranks, minlength=n_groups)
+    present = n > 0
+    h = 12.0 / (total * (total + 1)) * (
+        rank_sums[present] ** 2 / n[present]
+    ).sum() - 3 * (total + 1)
+    _, ties = np.unique(values, return_counts=True)
+    correction = 1 - (ties**3 - ties).sum() / (total**3 - total)
+    if correction == 0:
+        return None, None
+    h /= correction
+    return _finite_or_none(h), _finite_or_none(stats.chi2.sf(h, k - 1))
+
+
+def pairwise_welch(n, mean, var):
+    """
+    Welch t-test p-values for every pair of groups, as a k x k matrix
+    (NaN on the diagonal and wherever a group has fewer than two values).
+    """
+    with np.errstate(invalid="ignore", divide="ignore"):
+        se2 = var / n
+        pooled = se2[:, None] + se2[None, :]
+        t_stat = (mean[:, None] - mean[None, :]) / np.sqrt(pooled)
+        dof = pooled**2 / (
+            (se2**2 / (n - 1))[:, None] + (se2**2 / (n - 1))[None, :]
+        )
+        p = 2 * stats.t.sf(np.abs(t_stat), dof)
+    np.fill_diagonal(p, np.nan)
+    return p
+
+
+def adjust_pvalues(matrix, correction="holm"):
+    """
+    Apply a multiple-comparison correction over the distinct pairs of a
+    symmetric p-value matrix.
+    """
+    adjusted = np.full_like(matrix, np.nan)
+    iu = np.triu_indices_from(matrix, k=1)
+    upper = matrix[iu]
+    finite = np.isfinite(upper)
+    if correction == "none":
+        adjusted[iu] = upper
+    elif finite.any():
+        corrected = np.full_like(upper, np.nan)
+        corrected[finite] = multipletests(upper[finite], method=correction)[1]
+        adjusted[iu] = corrected
+    adjusted.T[iu] = adjusted[iu]
+    return adjusted
+
+
+def compare_groups(dts, amounts, group_by="weekday", correction="holm", clean=True):
+    """
+    Bucket transactions once by group_by and compare every group.
+
+    Returns a dict with:
+    - groups: per-group n, mean and std
+    - anova: one-way ANOVA F statistic and p-value
+    - kruskal: Kruskal-Wallis H statistic and p-value
+    - pairwise: labels plus raw and corrected Welch p-value matrices
+    """
+    if correction not in CORRECTIONS:
+        raise ValueError(f"Unsupported correction: {correction!r}")
+
+    codes, labels = group_codes(dts, group_by)
+    values = np.asarray(amounts, dtype=float)
+    in_group = codes >= 0
+    codes, values = codes[in_group], values[in_group]
+    n_groups = len(labels)
+
+    if clean and len(values):
+        keep = _iqr_mask(values, codes, n_groups)
+        codes, values = codes[keep], values[keep]
+
+    n, mean, m2 = group_accumulators(values, codes, n_groups)
+    present = np.flatnonzero(n > 0)
+    n, mean, m2 = n[present], mean[present], m2[present]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = np.where(n > 1, m2 / (n - 1), np.nan)
+
+    # re-index codes onto the non-empty groups for the rank test
+    remap = np.full(n_groups, -1)
+    remap[present] = np.arange(len(present))
+    f_stat, anova_p = one_way_anova(n, mean, m2)
+    h_stat, kruskal_p = kruskal_wallis(values, remap[codes], len(present), n)
+
+    raw = pairwise_welch(n, mean, var)
+    adjusted = adjust_pvalues(raw, correction)
+
+    def as_rows(matrix):
+        return [[_finite_or_none(x) for x in row] for row in matrix]
+
+    present_labels = [labels[g] for g in present]
+    return {
+        "group_by": group_by,
+        "groups": [
+            {
+                "label": label,
+                "n": int(count),
+                "mean": _finite_or_none(mu),
+                "std": _finite_or_none(np.sqrt(v)),
+            }
+            for label, count, mu, v in zip(present_labels, n, mean, var)
+        ],
+        "anova": {"f_stat": f_stat, "p_value": anova_p},
+        "kruskal": {"h_stat": h_stat, "p_value": kruskal_p},
+        "pairwise": {
+            "labels": present_labels,
+            "correction": correction,
+            "p_values": as_rows(raw),
+            "adjusted_p_values": as_rows(adjusted),
+        },
+    }
@@ -0,0 +1,53 @@
+# main/stats/grouping.py
+
+import numpy as np
+
+# Labels match the group keys run_ab_test uses, so a label returned here can
+# be passed straight back to the A/B endpoint as param_a / param_b.
+WEEKDAY_LABELS = tuple(str(d) for d in range(7))
+MONTH_LABELS = tuple(str(m) for m in range(1, 13))
+HOUR_LABELS = tuple(str(h) for h in range(24))
+TIME_LABELS = ("morning", "afternoon", "evening", "night")
+PERIOD_LABELS = ("morning", "noon", "afternoon")
+
+# hour -> code lookup tables (-1 = hour not part of any group)
+_TIME_BY_HOUR = np.array([3] * 6 + [0] * 6 + [1] * 6 + [2] * 6)
+_PERIOD_BY_HOUR = np.array([0] * 12 + [1] + [2] * 5 + [-1] * 6)
+
+GROUP_BY_OPTIONS = ("weekday", "month", "time", "hour", "period")
+
+
+def to_datetime64(dts):
+    """Convert a sequence of naive datetimes to a datetime64[s] array."""
+    return np.asarray(dts, dtype="datetime64[s]")
+
+
+def hours_of(ts):
+    """Hour of day (0-23) for each element of a datetime64 array."""
+    return ((ts - ts.astype("datetime64[D]")) // np.timedelta64(1, "h")).astype(
+        np.int64
+    )
+
+
+def group_codes(dts, group_by):
+    """
+    Bucket datetimes into groups in one vectorised pass.
+
+    Returns (codes, labels): codes is an int array aligned with dts where each
+    entry indexes into labels, or is -1 when the row belongs to no group
+    (e.g. evening rows for group_by="period").
+    """
+    ts = to_datetime64(dts)
+    if group_by == "weekday":
+        # 1970-01-01 was a Thursday (weekday 3)
+        days = ts.astype("datetime64[D]").astype(np.int64)
+        return (days + 3) % 7, WEEKDAY_LABELS
+    if group_by == "month":
+        return ts.astype("datetime64[M]").astype(np.int64) % 12, MONTH_LABELS
+    if group_by == "hour":
+        return hours_of(ts), HOUR_LABELS
+    if group_by == "time":
+        return _TIME_BY_HOUR[hours_of(ts)], TIME_LABELS
+    if group_by == "period":
+        return _PERIOD_BY_HOUR[hours_of(ts)], PERIOD_LABELS
+    raise ValueError(f"Unsupported group_by: {group_by!r}")
@@ -0,0 +1,182 @@
+# main/stats/incremental.py
+
+import numpy as np
+
+from .grouping import GROUP_BY_OPTIONS, group_codes
+
+
+class Welford:
+    """
+    Running count / mean / M2 for one group, supporting add, remove and merge
+    so updates and deletes can be reversed without a rescan.
+    """
+
+    __slots__ = ("n", "mean", "m2")
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    def remove(self, x):
+        if self.n <= 1:
+            self.n, self.mean, self.m2 = 0, 0.0, 0.0
+            return
+        old_mean = (self.n * self.mean - x) / (self.n - 1)
+        self.m2 = max(self.m2 - (x - old_mean) * (x - self.mean), 0.0)
+        self.mean = old_mean
+        self.n -= 1
+
+    def merge(self, other):
+        if not other.n:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+
+    def summary(self):
+        std = float(np.sqrt(self.m2 / (self.n - 1))) if self.n > 1 else None
+        return {"n": self.n, "mean": self.mean if self.n else None, "std": std}
+
+
+class CoMoments:
+    """
+    Running means and co-moments of (x, y) for an OLS fit, reversible in the
+    same way as Welford.
+    """
+
+    __slots__ = ("n", "mean_x", "mean_y", "cxx", "cxy", "cyy")
+
+    def __init__(self):
+        self.n = 0
+        self.mean_x = self.mean_y = 0.0
+        self.cxx = self.cxy = self.cyy = 0.0
+
+    def add(self, x, y):
+        self.n += 1
+        dx = x - self.mean_x
+        dy = y - self.mean_y
+        self.mean_x += dx / self.n
+        self.mean_y += dy / self.n
+        self.cxx += dx * (x - self.mean_x)
+        self.cxy += dx * (y - self.mean_y)
+        self.cyy += dy * (y - self.mean_y)
+
+    def remove(self, x, y):
+        if self.n <= 1:
+            self.__init__()
+            return
+        old_x = (self.n * self.mean_x - x) / (self.n - 1)
+        old_y = (self.n * self.mean_y - y) / (self.n - 1)
+        self.cxx = max(self.cxx - (x - old_x) * (x - self.mean_x), 0.0)
+        self.cxy -= (x - old_x) * (y - self.mean_y)
+        self.cyy = max(self.cyy - (y - old_y) * (y - self.mean_y), 0.0)
+        self.mean_x, self.mean_y = old_x, old_y
+        self.n -= 1
+
+    def merge(self, other):
+        if not other.n:
+            return
+        n = self.n + other.n
+        dx = other.mean_x - self.mean_x
+        dy = other.mean_y - self.mean_y
+        weight = self.n * other.n / n
+        self.cxx += other.cxx + dx * dx * weight
+        self.cxy += other.cxy + dx * dy * weight
+        self.cyy += other.cyy + dy * dy * weight
+        self.mean_x += dx * other.n / n
+        self.mean_y += dy * other.n / n
+        self.n = n
+
+    @classmethod
+    def from_arrays(cls, xs, ys):
+        m = cls()
+        m.n = len(xs)
+        if m.n:
+            m.mean_x, m.mean_y = float(xs.mean()), float(ys.mean())
+            dx, dy = xs - m.mean_x, ys - m.mean_y
+            m.cxx = float(dx @ dx)
+            m.cxy = float(dx @ dy)
+            m.cyy = float(dy @ dy)
+        return m
+
+    def regression(self):
+        """Same keys as compute_regression: intercept, slope, r_squared."""
+        if self.n < 2 or self.cxx <= 0:
+            return {"intercept": None, "slope": None, "r_squared": None}
+        slope = self.cxy / self.cxx
+        r_squared = self.cxy**2 / (self.cxx * self.cyy) if self.cyy > 0 else None
+        return {
+            "intercept": self.mean_y - slope * self.mean_x,
+            "slope": slope,
+            "r_squared": r_squared,
+        }
+
+
+class AnalyticsState:
+    """
+    Regression co-moments plus per-group Welford accumulators for every
+    group_by option, for one slice of transactions (e.g. one user).
+    """
+
+    def __init__(self):
+        self.regression = CoMoments()
+        self.groups = {}
+        for group_by in GROUP_BY_OPTIONS:
+            _, labels = group_codes([], group_by)
+            self.groups[group_by] = [Welford() for _ in labels]
+
+    def _apply(self, dt, amount, sign):
+        x = dt.timestamp()
+        if sign > 0:
+            self.regression.add(x, amount)
+        else:
+            self.regression.remove(x, amount)
+        for group_by, accs in self.groups.items():
+            code = int(group_codes([dt], group_by)[0][0])
+            if code < 0:
+                continue
+            if sign > 0:
+                accs[code].add(amount)
+            else:
+                accs[code].remove(amount)
+
+    def add(self, dt, amount):
+        self._apply(dt, amount, +1)
+
+    def remove(self, dt, amount):
+        self._apply(dt, amount, -1)
+
+    def merge(self, other):
+        self.regression.merge(other.regression)
+        for group_by, accs in self.groups.items():
+            for acc, other_acc in zip(accs, other.groups[group_by]):
+                acc.merge(other_acc)
+
+    @classmethod
+    def from_rows(cls, dts, amounts):
+        """Build state for many rows at once with vectorised group sums."""
+        state = cls()
+        values = np.asarray(amounts, dtype=float)
+        xs = np.array([d.timestamp() for d in dts], dtype=float)
+        state.regression = CoMoments.from_arrays(xs, values)
+        for group_by, accs in state.groups.items():
+            codes, labels = group_codes(dts, group_by)
+            keep = codes >= 0
+            c, v = codes[keep], values[keep]
+            n = np.bincount(c, minlength=len(labels))
+            sums = np.bincount(c, weights=v, minlength=len(labels))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = np.where(n > 0, sums / n, 0.0)
+            m2 = np.bincount(c, weights=(v - mean[c]) ** 2, minlength=len(labels))
+            for g, acc in enumerate(accs):
+                acc.n, acc.mean, acc.m2 = int(n[g]), float(mean[g]), float(m2[g])
+        return state
@@ -109,3 +109,108 @@ def make_chart(pairs, stats):
     plt.close()
     buf.seek(0)
     return base64.b64encode(buf.read()).decode("ascii")
+
+
+def rolling_regression(xs, ys, window, step):
+    """
+    Fit y = intercept + slope * x over sliding windows [s, s + window),
+    s = xs[0], xs[0] + step, ..., until the last x is covered.
+
+    xs must be sorted ascending. Prefix sums of x, y, xy, x² and y² are
+    built once (O(n)); each window's fit is then O(1) from differences of
+    those sums. Returns a list of dicts with keys 'start', 'end', 'n',
+    'intercept', 'slope' and 'r_squared' (None where a fit is undefined).
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    if not len(xs):
+        return []
+
+    # shift x so the squared sums stay well conditioned for epoch seconds
+    x0 = xs[0]
+    dx = xs - x0
+
+    def prefix(values):
+        return np.concatenate(([0.0], np.cumsum(values)))
+
+    cx, cy = prefix(dx), prefix(ys)
+    cxy, cxx, cyy = prefix(dx * ys), prefix(dx * dx), prefix(ys * ys)
+
+    n_windows = max(0, int(np.floor((dx[-1] - window) / step)) + 1) + 1
+    starts = np.arange(n_windows) * step
+    lo = np.searchsorted(dx, starts, side="left")
+    hi = np.searchsorted(dx, starts + window, side="left")
+
+    n = (hi - lo).astype(float)
+    sx, sy = cx[hi] - cx[lo], cy[hi] - cy[lo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sxx = cxx[hi] - cxx[lo] - sx * sx / n
+        sxy = cxy[hi] - cxy[lo] - sx * sy / n
+        syy = cyy[hi] - cyy[lo] - sy * sy / n
+        slope = sxy / sxx
+        intercept = (sy - slope * sx) / n - slope * x0
+        r_squared = sxy * sxy / (sxx * syy)
+    defined = (n >= 2) & (sxx > 0)
+
+    def value(arr, i):
+        return float(arr[i]) if defined[i] and np.isfinite(arr[i]) else None
+
+    return [
+        {
+            "start": float(x0 + starts[i]),
+            "end": float(x0 + starts[i] + window),
+            "n": int(n[i]),
+            "intercept": value(intercept, i),
+            "slope": value(slope, i),
+            "r_squared": value(r_squared, i),
+        }
+        for i in range(n_windows)
+    ]
+
+
+def grouped_regression(xs, ys, codes, labels):
+    """
+    Fit y = intercept + slope * x separately for every group in one
+    vectorised pass.
+
+    codes is an int array aligned with xs/ys indexing into labels (-1 rows
+    are ignored). Per-group sums come from np.bincount, centred on each
+    group's mean for numerical stability. Returns a list of dicts with keys
+    'label', 'n', 'intercept', 'slope' and 'r_squared' for non-empty groups.
+    """
+    xs = np.asarray(xs, dtype=float)
+    ys = np.asarray(ys, dtype=float)
+    codes = np.asarray(codes, dtype=np.int64)
+    keep = codes >= 0
+    xs, ys, codes = xs[keep], ys[keep], codes[keep]
+    k = len(labels)
+
+    n = np.bincount(codes, minlength=k).astype(float)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = np.bincount(codes, weights=xs, minlength=k) / n
+        mean_y = np.bincount(codes, weights=ys, minlength=k) / n
+    dx = xs - mean_x[codes]
+    dy = ys - mean_y[codes]
+    sxx = np.bincount(codes, weights=dx * dx, minlength=k)
+    sxy = np.bincount(codes, weights=dx * dy, minlength=k)
+    syy = np.bincount(codes, weights=dy * dy, minlength=k)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = sxy / sxx
+        intercept = mean_y - slope * mean_x
+        r_squared = sxy * sxy / (sxx * syy)
+
+    def value(arr, g):
+        ok = n[g] >= 2 and sxx[g] > 0 and np.isfinite(arr[g])
+        return float(arr[g]) if ok else None
+
+    return [
+        {
+            "label": labels[g],
+            "n": int(n[g]),
+            "intercept": value(intercept, g),
+            "slope": value(slope, g),
+            "r_squared": value(r_squared, g),
+        }
+        for g in range(k)
+        if n[g] > 0
+    ]
@@ -0,0 +1,169 @@
+# main/stats/resampling.py
+
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+# Upper bound on index-matrix cells generated per NumPy batch
+BATCH_ELEMENTS = 4_000_000
+# Resamples per independently seeded chunk. Chunking is fixed so that a given
+# seed yields identical results whether chunks run in-process or in a pool.
+CHUNK_RESAMPLES = 500
+
+# Shared per-process pool, created on first use and kept across requests so
+# each one doesn't pay for spawning processes and importing numpy
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def _chunk_plan(n_resamples, seed):
+    """Split n_resamples into fixed-size chunks, each with its own seed."""
+    sizes = [CHUNK_RESAMPLES] * (n_resamples // CHUNK_RESAMPLES)
+    if n_resamples % CHUNK_RESAMPLES:
+        sizes.append(n_resamples % CHUNK_RESAMPLES)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    return list(zip(sizes, seeds))
+
+
+def _batches(size, row_len):
+    batch = max(1, BATCH_ELEMENTS // max(row_len, 1))
+    for start in range(0, size, batch):
+        yield start, min(batch, size - start)
+
+
+def _permutation_chunk(pooled, n_a, size, seed_seq):
+    """Mean differences for `size` random relabellings of the pooled data."""
+    rng = np.random.default_rng(seed_seq)
+    n = len(pooled)
+    n_b = n - n_a
+    total = pooled.sum()
+    # only the smaller side needs drawing; the other is its complement
+    k = min(n_a, n_b)
+    out = np.empty(size)
+    for start, b in _batches(size, n):
+        # a random k-subset per row: indices of the k smallest random keys
+        keys = rng.random((b, n), dtype=np.float32)
+        idx = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        sum_k = pooled[idx].sum(axis=1)
+        sum_a = sum_k if k == n_a else total - sum_k
+        out[start : start + b] = sum_a / n_a - (total - sum_a) / n_b
+    return out
+
+
+def _bootstrap_chunk(group_a, group_b, size, seed_seq):
+    """Mean differences for `size` bootstrap resamples of each group."""
+    rng = np.random.default_rng(seed_seq)
+    out = np.empty(size)
+    for start, b in _batches(size, max(len(group_a), len(group_b))):
+        idx_a = rng.integers(0, len(group_a), size=(b, len(group_a)), dtype=np.int32)
+        idx_b = rng.integers(0, len(group_b), size=(b, len(group_b)), dtype=np.int32)
+        means_a = group_a[idx_a].mean(axis=1)
+        means_b = group_b[idx_b].mean(axis=1)
+        out[start : start + b] = means_a - means_b
+    return out
+
+
+def _get_pool(workers):
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_workers = workers
+        return _pool
+
+
+def _discard_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+def shutdown_pool():
+    """Stop the shared pool (it is recreated on next use)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def _run_chunks(func, args, n_resamples, seed, workers):
+    plan = _chunk_plan(n_resamples, seed)
+    if workers and workers > 1 and len(plan) > 1:
+        pool = _get_pool(workers)
+        try:
+            futures = [pool.submit(func, *args, size, ss) for size, ss in plan]
+            parts = [f.result() for f in futures]
+        except BrokenProcessPool:
+            # a worker died; the next request starts a fresh pool
+            _discard_pool(pool)
+            raise
+    else:
+        parts = [func(*args, size, ss) for size, ss in plan]
+    return np.concatenate(parts)
+
+
+def permutation_test(groupA, groupB, n_resamples=10000, seed=None, workers=1):
+    """
+    Two-sided permutation test for a difference in means.
+
+    Resamples are generated as NumPy index matrices in batches, and can be
+    spread over a process pool with `workers` > 1.
+    Returns a dict with 'statistic', 'p_value' and 'n_resamples'.
+    """
+    if not groupA or not groupB or n_resamples < 1:
+        return {"statistic": None, "p_value": None, "n_resamples": 0}
+    a = np.asarray(groupA, dtype=float)
+    b = np.asarray(groupB, dtype=float)
+    observed = a.mean() - b.mean()
+    diffs = _run_chunks(
+        _permutation_chunk,
+        (np.concatenate([a, b]), len(a)),
+        n_resamples,
+        seed,
+        workers,
+    )
+    # small tolerance so floating-point noise doesn't drop the observed split
+    extreme = np.count_nonzero(np.abs(diffs) >= abs(observed) * (1 - 1e-12))
+    return {
+        "statistic": float(observed),
+        "p_value": float((extreme + 1) / (n_resamples + 1)),
+        "n_resamples": n_resamples,
+    }
+
+
+def bootstrap_ci(
+    groupA, groupB, n_resamples=10000, confidence=0.95, seed=None, workers=1
+):
+    """
+    Percentile bootstrap confidence interval for mean(A) - mean(B).
+
+    Returns a dict with 'statistic', 'ci_low', 'ci_high', 'confidence'
+    and 'n_resamples'.
+    """
+    if not groupA or not groupB or n_resamples < 1:
+        return {
+            "statistic": None,
+            "ci_low": None,
+            "ci_high": None,
+            "confidence": confidence,
+            "n_resamples": 0,
+        }
+    a = np.asarray(groupA, dtype=float)
+    b = np.asarray(groupB, dtype=float)
+    diffs = _run_chunks(_bootstrap_chunk, (a, b), n_resamples, seed, workers)
+    alpha = (1 - confidence) / 2
+    low, high = np.percentile(diffs, [100 * alpha, 100 * (1 - alpha)])
+    return {
+        "statistic": float(a.mean() - b.mean()),
+        "ci_low": float(low),
+        "ci_high": float(high),
+        "confidence": confidence,
+        "n_resamples": n_resamples,
+    }
@@ -0,0 +1,25 @@
+"""Add analysis_jobs.started_at for timing out stuck jobs
+
+Revision ID: 4b7d2e9f1a63
+Revises: e3a95b1c7d42
+Create Date: 2026-10-19 18:40:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4b7d2e9f1a63"
+down_revision = "e3a95b1c7d42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("analysis_jobs", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("started_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("analysis_jobs", schema=None) as batch_op:
+        batch_op.drop_column("started_at")
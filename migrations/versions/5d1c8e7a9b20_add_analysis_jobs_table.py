@@ -0,0 +1,48 @@
+"""Add analysis_jobs table for background analysis jobs
+
+Revision ID: 5d1c8e7a9b20
+Revises: 23b0b2682736
+Create Date: 2026-10-19 10:05:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5d1c8e7a9b20"
+down_revision = "23b0b2682736"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "analysis_jobs",
+        sa.Column("id", sa.String(length=32), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=32), nullable=False),
+        sa.Column("dedupe_key", sa.String(length=64), nullable=False),
+        sa.Column("status", sa.String(length=16), nullable=False),
+        sa.Column("result", sa.Text(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_analysis_jobs_dedupe_key", "analysis_jobs", ["dedupe_key"], unique=False
+    )
+    op.create_index(
+        "ix_analysis_jobs_expires_at", "analysis_jobs", ["expires_at"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_analysis_jobs_expires_at", table_name="analysis_jobs")
+    op.drop_index("ix_analysis_jobs_dedupe_key", table_name="analysis_jobs")
+    op.drop_table("analysis_jobs")
@@ -0,0 +1,36 @@
+"""Add transactions.updated_at for conditional GET versioning
+
+Revision ID: 8f3a2c6d1e47
+Revises: 5d1c8e7a9b20
+Create Date: 2026-10-19 11:20:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8f3a2c6d1e47"
+down_revision = "5d1c8e7a9b20"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("transactions", schema=None) as batch_op:
+        batch_op.add_column(
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("now()"),
+                nullable=False,
+            )
+        )
+        batch_op.create_index(
+            batch_op.f("ix_transactions_updated_at"), ["updated_at"], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("transactions", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_transactions_updated_at"))
+        batch_op.drop_column("updated_at")
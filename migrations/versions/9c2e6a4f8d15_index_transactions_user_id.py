@@ -0,0 +1,26 @@
+"""Index transactions.user_id for the per-user data version
+
+Revision ID: 9c2e6a4f8d15
+Revises: 4b7d2e9f1a63
+Create Date: 2026-10-19 20:10:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9c2e6a4f8d15"
+down_revision = "4b7d2e9f1a63"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("transactions", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_transactions_user_id"), ["user_id"], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("transactions", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_transactions_user_id"))
@@ -0,0 +1,30 @@
+"""Index transactions.date_time and transactions.amount for listing filters
+
+Revision ID: b71e4d09c3a5
+Revises: 8f3a2c6d1e47
+Create Date: 2026-10-19 12:40:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "b71e4d09c3a5"
+down_revision = "8f3a2c6d1e47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("transactions", schema=None) as batch_op:
+        batch_op.create_index(
+            batch_op.f("ix_transactions_date_time"), ["date_time"], unique=False
+        )
+        batch_op.create_index(
+            batch_op.f("ix_transactions_amount"), ["amount"], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("transactions", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_transactions_amount"))
+        batch_op.drop_index(batch_op.f("ix_transactions_date_time"))
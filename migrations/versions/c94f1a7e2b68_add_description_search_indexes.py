@@ -0,0 +1,45 @@
+"""Add full-text and trigram search indexes on transactions.description
+
+Revision ID: c94f1a7e2b68
+Revises: b71e4d09c3a5
+Create Date: 2026-10-19 13:30:00.000000
+
+Postgres only: a generated tsvector column with a GIN index for full-text
+search, and a pg_trgm GIN index for substring (ILIKE) search. main/search.py
+creates the same objects for databases built with db.create_all (so this
+skips any that exist), and an FTS5 table on SQLite.
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c94f1a7e2b68"
+down_revision = "b71e4d09c3a5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute(
+        "ALTER TABLE transactions ADD COLUMN IF NOT EXISTS description_tsv tsvector "
+        "GENERATED ALWAYS AS "
+        "(to_tsvector('simple', coalesce(description, ''))) STORED"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_description_tsv "
+        "ON transactions USING gin (description_tsv)"
+    )
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_transactions_description_trgm "
+        "ON transactions USING gin (description gin_trgm_ops)"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("DROP INDEX IF EXISTS ix_transactions_description_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_transactions_description_tsv")
+    op.execute("ALTER TABLE transactions DROP COLUMN IF EXISTS description_tsv")
@@ -0,0 +1,43 @@
+"""Add user_sessions table for server-side sessions
+
+Revision ID: e3a95b1c7d42
+Revises: c94f1a7e2b68
+Create Date: 2026-10-19 15:10:00.000000
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "e3a95b1c7d42"
+down_revision = "c94f1a7e2b68"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "user_sessions",
+        sa.Column("id", sa.String(length=64), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column("data", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["user_id"],
+            ["users.id"],
+        ),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_user_sessions_user_id", "user_sessions", ["user_id"], unique=False
+    )
+    op.create_index(
+        "ix_user_sessions_expires_at", "user_sessions", ["expires_at"], unique=False
+    )
+
+
+def downgrade():
+    op.drop_index("ix_user_sessions_expires_at", table_name="user_sessions")
+    op.drop_index("ix_user_sessions_user_id", table_name="user_sessions")
+    op.drop_table("user_sessions")
@@ -1,6 +1,12 @@
+from datetime import datetime, timezone
+
 from extensions import db
 
 
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
 class User(db.Model):
     __tablename__ = "users"
 
@@ -19,10 +25,53 @@ class Transaction(db.Model):
     __tablename__ = "transactions"
 
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    date_time = db.Column(db.DateTime, nullable=False)
-    amount = db.Column(db.Numeric(10, 2), nullable=False)
+    # indexed for the per-user data version (main/conditional.py)
+    user_id = db.Column(
+        db.Integer, db.ForeignKey("users.id"), nullable=False, index=True
+    )
+    date_time = db.Column(db.DateTime, nullable=False, index=True)
+    amount = db.Column(db.Numeric(10, 2), nullable=False, index=True)
     description = db.Column(db.Text)
     created_at = db.Column(
         db.DateTime(timezone=True), server_default=db.func.now(), nullable=False
     )
+    # set client-side for microsecond resolution on every backend; part of
+    # the data version behind ETags (main/conditional.py)
+    updated_at = db.Column(
+        db.DateTime(timezone=True),
+        default=_utcnow,
+        onupdate=_utcnow,
+        server_default=db.func.now(),
+        nullable=False,
+        index=True,
+    )
+
+
+class AnalysisJob(db.Model):
+    __tablename__ = "analysis_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    kind = db.Column(db.String(32), nullable=False)
+    # hash of (user, kind, params) used to deduplicate in-flight jobs
+    dedupe_key = db.Column(db.String(64), nullable=False, index=True)
+    status = db.Column(db.String(16), nullable=False)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    # queued at created_at; in-flight jobs are failed after JOB_TIMEOUT
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    expires_at = db.Column(db.DateTime, index=True)
+
+
+class UserSession(db.Model):
+    """Server-side session row (SESSION_BACKEND = "sql", auth/sessions.py)."""
+
+    __tablename__ = "user_sessions"
+
+    id = db.Column(db.String(64), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), index=True)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
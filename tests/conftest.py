@@ -2,49 +2,312 @@
 # flake8: noqa: E402  # Allow imports before code for environment setup
 import os
 import sys
+import tempfile
 
 # Skip Postgres safety guard during tests
 os.environ["FLASK_SKIP_GUARD"] = "1"
+# Cheap password hashes: tests log in all the time
+os.environ.setdefault("PASSWORD_HASH_METHOD", "pbkdf2:sha256:1000")
+# The default sqlite result cache, in a file of this test process's own
+os.environ.setdefault(
+    "CACHE_PATH",
+    os.path.join(tempfile.mkdtemp(prefix="test-cache-"), "result_cache.sqlite3"),
+)
 
 # Add project root to import path so extensions and models can be imported
 project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
+import hashlib
+from contextlib import contextmanager
+
 import pytest
+import sqlalchemy
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session, scoped_session
+from sqlalchemy.schema import CreateTable
 from werkzeug.security import generate_password_hash
 
 from app import create_app
+from auth.utils import _user_cache
+from config import PASSWORD_HASH_METHOD
 from extensions import db
-from models import User
+from main.analytics_store import analytics_store
+from main.cache import result_cache
+from main.querywatch import watch_queries
+from models import Transaction, User
 
-# Testing configuration: in-memory SQLite for fast, isolated tests
+# Testing configuration. The database is in-memory SQLite, or with
+# TEST_DATABASE_URL=postgresql://.../name a per-worker clone of a template
+# database (see test_database); create_app picks it up in either case.
 test_config = {
     "TESTING": True,
-    "SQLALCHEMY_DATABASE_URI": "sqlite:///:memory:",
     "SQLALCHEMY_TRACK_MODIFICATIONS": False,
     "SECRET_KEY": "test-secret",
+    # tests log in far more often than the limiter allows
+    "LOGIN_RATE_LIMIT_ENABLED": False,
 }
 
+DEMO_PASSWORD = "password123"
+POSTGRES_BASE_URL = os.getenv("TEST_DATABASE_URL")
+SQLALCHEMY_1 = sqlalchemy.__version__.startswith("1.")
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+def build_schema(bind):
+    """Fresh tables plus the demo user every test module expects."""
+    db.metadata.drop_all(bind)
+    db.metadata.create_all(bind)
+    with bind.begin() as conn:
+        conn.execute(
+            insert(User.__table__).values(
+                name="demo_user", password_hash=hash_password(DEMO_PASSWORD)
+            )
+        )
+
+
+def _template_name(base):
+    # the template is rebuilt whenever the schema changes
+    ddl = "".join(
+        str(CreateTable(table).compile(dialect=postgresql.dialect()))
+        for table in db.metadata.sorted_tables
+    )
+    return f"{base.database}_tmpl_{hashlib.sha1(ddl.encode()).hexdigest()[:10]}"
+
+
+def _worker_name(base):
+    return f"{base.database}_{os.getenv('PYTEST_XDIST_WORKER', 'main')}"
+
+
+def clone_worker_database(base_url):
+    """
+    Create (once, under an advisory lock) a template database holding the
+    schema and seed rows, then clone it for this pytest-xdist worker.
+    Returns the clone's URL.
+    """
+    base = make_url(base_url)
+    template = _template_name(base)
+    worker = _worker_name(base)
+    admin = create_engine(base.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(hashtext(:t))"), {"t": template})
+        try:
+            exists = conn.scalar(
+                text("SELECT 1 FROM pg_database WHERE datname = :t"), {"t": template}
+            )
+            if not exists:
+                conn.execute(text(f'CREATE DATABASE "{template}"'))
+                engine = create_engine(base.set(database=template))
+                try:
+                    build_schema(engine)
+                finally:
+                    engine.dispose()
+            conn.execute(text(f'DROP DATABASE IF EXISTS "{worker}" WITH (FORCE)'))
+            conn.execute(text(f'CREATE DATABASE "{worker}" TEMPLATE "{template}"'))
+        finally:
+            conn.execute(
+                text("SELECT pg_advisory_unlock(hashtext(:t))"), {"t": template}
+            )
+    admin.dispose()
+    return base.set(database=worker).render_as_string(hide_password=False)
+
+
+def drop_worker_database(url):
+    url = make_url(url)
+    admin = create_engine(url.set(database="postgres"), isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{url.database}" WITH (FORCE)'))
+    admin.dispose()
+
+
+def reset_process_state():
+    """Forget in-process state derived from rows a test may have rolled back."""
+    result_cache.clear()
+    analytics_store.reset()
+    _user_cache.clear()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def test_database():
+    """
+    This worker's Postgres database URL, or None for in-memory SQLite. Each
+    pytest-xdist worker (-n auto) gets its own clone, dropped afterwards.
+    """
+    if not POSTGRES_BASE_URL:
+        yield None
+        return
+    url = clone_worker_database(POSTGRES_BASE_URL)
+    os.environ["TEST_DATABASE_URL"] = url
+    try:
+        yield url
+    finally:
+        os.environ["TEST_DATABASE_URL"] = POSTGRES_BASE_URL
+        drop_worker_database(url)
+
 
 @pytest.fixture(scope="session")
-def app():
+def app(test_database):
     """
     Create and configure a new Flask app instance for testing.
     """
     app = create_app()
     app.config.update(test_config)
-    with app.app_context():
-        db.drop_all()
-        db.create_all()
-        demo_user = User(
-            name="demo_user", password_hash=generate_password_hash("password123")
-        )
-        db.session.add(demo_user)
-        db.session.commit()
+    if test_database is None:
+        # a Postgres clone already has the schema and seed rows
+        with app.app_context():
+            build_schema(db.engine)
     yield app
     with app.app_context():
         db.drop_all()
+        db.engine.dispose()
+
+
+def savepoint_session(connection):
+    """A Session on connection whose commits and rollbacks end a SAVEPOINT."""
+    if not SQLALCHEMY_1:
+        return Session(bind=connection, join_transaction_mode="create_savepoint")
+    # SQLAlchemy 1.4 has no join_transaction_mode: work in a SAVEPOINT and
+    # begin a new one whenever a commit or rollback ends it
+    session = Session(bind=connection)
+
+    @event.listens_for(session, "after_transaction_end")
+    def restart_savepoint(session, transaction):
+        if transaction.nested and not transaction.parent.nested:
+            session.expire_all()
+            session.begin_nested()
+
+    session.begin_nested()
+    return session
+
+
+class RolledBackSession(scoped_session):
+    """
+    db.session during a rolled-back test: one Session for every app context
+    and thread, so objects stay attached across requests and inline jobs.
+    The app's per-request remove() only rolls back to the SAVEPOINT.
+    """
+
+    def remove(self):
+        if self.registry.has():
+            self.registry().rollback()
+
+
+@contextmanager
+def rolled_back(app):
+    """
+    Run the block inside one database transaction that is rolled back
+    afterwards. The app's db.session is bound to that transaction for the
+    duration and its commits and rollbacks only end a SAVEPOINT. Code that
+    commits on its own engine connections (server-side sessions) is not
+    covered, and in-memory SQLite shares one connection: tests of those take
+    fresh_schema instead.
+    """
+    with app.app_context():
+        connection = db.engine.connect()
+        sqlite = connection.dialect.name == "sqlite"
+        if sqlite:
+            # pysqlite only begins transactions lazily and would let a
+            # RELEASE commit them: begin explicitly instead
+            dbapi_connection = connection.connection.dbapi_connection
+            isolation_level = dbapi_connection.isolation_level
+            dbapi_connection.isolation_level = None
+        outer = connection.begin()
+        if sqlite:
+            connection.exec_driver_sql("BEGIN")
+        # a plain Session: Flask-SQLAlchemy's would pick the engine, not
+        # this connection, for every mapped table
+        test_session = savepoint_session(connection)
+        session = RolledBackSession(lambda: test_session, scopefunc=lambda: None)
+        original, db.session = db.session, session
+        try:
+            yield session
+        finally:
+            test_session.close()
+            db.session = original
+            outer.rollback()
+            if sqlite:
+                dbapi_connection.isolation_level = isolation_level
+            connection.close()
+            reset_process_state()
+
+
+@pytest.fixture
+def db_session(app):
+    """
+    The test runs in a transaction rolled back at the end (rolled_back), so
+    it can write freely on the shared schema instead of rebuilding it.
+    """
+    with rolled_back(app) as session:
+        yield session
+
+
+@pytest.fixture
+def fresh_schema(app):
+    """
+    For tests whose code commits on its own connections, which rolled_back
+    can't undo: they seed and commit as usual, and the schema and demo user
+    are rebuilt afterwards for the next test.
+    """
+    yield
+    with app.app_context():
+        db.session.remove()
+        build_schema(db.engine)
+    reset_process_state()
+
+
+@pytest.fixture
+def demo_user_id(db_session):
+    """Id of the demo_user build_schema seeds (password DEMO_PASSWORD)."""
+    return db_session.execute(
+        db.select(User.id).filter_by(name="demo_user")
+    ).scalar_one()
+
+
+@pytest.fixture
+def add_user(db_session):
+    """add_user(name, password=DEMO_PASSWORD) commits a user; returns its id."""
+
+    def add(name, password=DEMO_PASSWORD):
+        user = User(name=name, password_hash=hash_password(password))
+        db_session.add(user)
+        db_session.commit()
+        return user.id
+
+    return add
+
+
+@pytest.fixture
+def add_transactions(db_session, demo_user_id):
+    """
+    add_transactions(rows, user_id=demo user) commits one Transaction per
+    dict of column values in rows and returns their ids in order.
+    """
+
+    def add(rows, user_id=None):
+        txns = [Transaction(user_id=user_id or demo_user_id, **row) for row in rows]
+        db_session.add_all(txns)
+        db_session.commit()
+        return [txn.id for txn in txns]
+
+    return add
+
+
+@pytest.fixture
+def login():
+    """login(client, name="demo_user", password=DEMO_PASSWORD) via /api/login."""
+
+    def log_in(client, name="demo_user", password=DEMO_PASSWORD):
+        resp = client.post("/api/login", json={"email": name, "password": password})
+        assert resp.status_code == 200, resp.get_json()
+        return resp
+
+    return log_in
 
 
 @pytest.fixture(scope="function")
@@ -61,3 +324,26 @@ def runner(app):
     Provides a Click runner for Flask CLI commands.
     """
     return app.test_cli_runner()
+
+
+@pytest.fixture
+def query_budget():
+    """
+    Cap the SQL a block may issue:
+
+        with query_budget(3):
+            client.get("/api/transactions")
+
+    fails if the block runs more than max_queries statements, or any one
+    statement max_repeats or more times (an N+1 pattern).
+    """
+
+    @contextmanager
+    def budget(max_queries, max_repeats=3):
+        with watch_queries() as log:
+            yield log
+        report = log.report(max_repeats)
+        assert len(log) <= max_queries, f"over budget of {max_queries}: {report}"
+        assert not log.repeated(max_repeats), report
+
+    return budget
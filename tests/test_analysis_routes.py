@@ -3,46 +3,30 @@
 from datetime import datetime, timedelta
 
 import pytest
-from werkzeug.security import generate_password_hash
 
 from extensions import db
 from models import Transaction, User
 
 
-def seed_user_and_transactions(app):
+def transaction_rows():
     """
-    Seed a demo user and a set of transactions for analysis tests.
+    A set of transactions across two groups for A/B and analysis tests.
     """
-    with app.app_context():
-        db.drop_all()
-        db.create_all()
-        # create demo user
-        demo = User(name="demo_user", password_hash=generate_password_hash("pass123"))
-        db.session.add(demo)
-        db.session.commit()
-        # seed transactions across two groups for A/B test
-        for i in range(5):
-            t = Transaction(
-                user_id=demo.id,
-                date_time=datetime(2025, 6, 1) + timedelta(days=i),
-                amount=100 + i,
-                description=f"txn {i}",
-            )
-            db.session.add(t)
-        db.session.commit()
+    return [
+        {
+            "date_time": datetime(2025, 6, 1) + timedelta(days=i),
+            "amount": 100 + i,
+            "description": f"txn {i}",
+        }
+        for i in range(5)
+    ]
 
 
-def login(client):
-    resp = client.post("/api/login", json={"email": "demo_user", "password": "pass123"})
-    assert resp.status_code == 200
-    return resp
-
-
-def test_api_get_abtest_defaults(client, app):
+def test_api_get_abtest_defaults(client, add_transactions, login):
     """
     GET /api/analysis/abtest returns default A/B results with p_value, groupA, groupB
     """
-    seed_user_and_transactions(app)
+    add_transactions(transaction_rows())
     login(client)
     resp = client.get("/api/analysis/abtest")
     assert resp.status_code == 200
@@ -55,11 +39,11 @@ def test_api_get_abtest_defaults(client, app):
     assert "groupB" in data and isinstance(data["groupB"], list)
 
 
-def test_api_post_abtest_with_params(client, app):
+def test_api_post_abtest_with_params(client, add_transactions, login):
     """
     POST /api/analysis/abtest with custom params returns valid result
     """
-    seed_user_and_transactions(app)
+    add_transactions(transaction_rows())
     login(client)
     payload = {"group_by": "date_time", "param_a": "amount", "param_b": "amount"}
     resp = client.post("/api/analysis/abtest", json=payload)
@@ -70,11 +54,11 @@ def test_api_post_abtest_with_params(client, app):
     assert "groupB" in data and isinstance(data["groupB"], list)
 
 
-def test_api_get_regression_default(client, app):
+def test_api_get_regression_default(client, add_transactions, login):
     """
     GET /api/analysis/regression returns slope, intercept, r_squared, chart_img
     """
-    seed_user_and_transactions(app)
+    add_transactions(transaction_rows())
     login(client)
     resp = client.get("/api/analysis/regression")
     assert resp.status_code == 200
@@ -91,3 +75,411 @@ def test_api_get_regression_default(client, app):
     assert "chart_img" in data and (
         data["chart_img"] is None or isinstance(data["chart_img"], str)
     )
+
+
+def weekly_rows(weeks=4):
+    """
+    One transaction per day at 09:00 and 16:00, with amounts that differ by
+    weekday.
+    """
+    start = datetime(2025, 6, 2)  # a Monday
+    rows = []
+    for day in range(weeks * 7):
+        for hour, jitter in ((9, 0.0), (16, 1.5)):
+            dt = start + timedelta(days=day, hours=hour)
+            rows.append(
+                {
+                    "date_time": dt,
+                    "amount": 100 + 10 * dt.weekday() + jitter + (day % 3),
+                }
+            )
+    return rows
+
+
+def test_api_group_comparison_weekday(client, app, add_transactions, login):
+    """
+    GET /api/analysis/groups compares all weekdays in one response and
+    matches scipy's ANOVA, Kruskal-Wallis and Welch tests.
+    """
+    from scipy import stats
+
+    add_transactions(weekly_rows())
+    login(client)
+    resp = client.get("/api/analysis/groups?group_by=weekday&correction=none")
+    assert resp.status_code == 200
+    data = resp.get_json()
+
+    labels = [g["label"] for g in data["groups"]]
+    assert labels == ["0", "1", "2", "3", "4", "5", "6"]
+    assert all(g["n"] == 8 for g in data["groups"])
+
+    with app.app_context():
+        by_day = {label: [] for label in labels}
+        for t in Transaction.query.all():
+            by_day[str(t.date_time.weekday())].append(float(t.amount))
+    samples = [by_day[label] for label in labels]
+
+    assert data["anova"]["p_value"] == pytest.approx(
+        stats.f_oneway(*samples).pvalue, rel=1e-6, abs=1e-12
+    )
+    assert data["kruskal"]["h_stat"] == pytest.approx(
+        stats.kruskal(*samples).statistic, rel=1e-9
+    )
+    welch = stats.ttest_ind(samples[0], samples[1], equal_var=False).pvalue
+    matrix = data["pairwise"]["p_values"]
+    assert matrix[0][1] == pytest.approx(welch, rel=1e-6, abs=1e-12)
+    assert matrix[1][0] == matrix[0][1]
+    assert matrix[0][0] is None
+
+
+def test_api_group_comparison_rejects_unknown_group_by(client, add_transactions, login):
+    """
+    An unsupported group_by returns 400 instead of an empty comparison.
+    """
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.get("/api/analysis/groups?group_by=decade")
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+def test_api_post_abtest_with_resampling(client, add_transactions, login):
+    """
+    POST /api/analysis/abtest with resamples adds permutation and bootstrap
+    results, reproducible for a fixed seed.
+    """
+    add_transactions(weekly_rows())
+    login(client)
+    payload = {
+        "group_by": "weekday",
+        "param_a": "0",
+        "param_b": "4",
+        "resamples": 2000,
+        "seed": 7,
+    }
+    first = client.post("/api/analysis/abtest", json=payload).get_json()
+    second = client.post("/api/analysis/abtest", json=payload).get_json()
+
+    perm = first["permutation"]
+    boot = first["bootstrap"]
+    assert perm["n_resamples"] == 2000
+    assert 0 < perm["p_value"] <= 1
+    assert boot["ci_low"] <= boot["statistic"] <= boot["ci_high"]
+    assert first["permutation"] == second["permutation"]
+    assert first["bootstrap"] == second["bootstrap"]
+
+
+def test_resampling_is_independent_of_worker_count():
+    """
+    The same seed gives identical results in-process and in a process pool.
+    """
+    from main.stats.resampling import bootstrap_ci, permutation_test
+
+    a = [float(x) for x in range(40)]
+    b = [float(x) + 5 for x in range(35)]
+    assert permutation_test(a, b, 1200, seed=3) == permutation_test(
+        a, b, 1200, seed=3, workers=2
+    )
+    assert bootstrap_ci(a, b, 1200, seed=3) == bootstrap_ci(
+        a, b, 1200, seed=3, workers=2
+    )
+
+
+def test_api_rolling_regression_matches_windowed_fit(
+    client, app, add_transactions, login
+):
+    """
+    GET /api/analysis/regression/rolling returns one fit per window, each
+    equal to a full OLS fit over that window's rows.
+    """
+    from main.stats.regression import compute_regression
+
+    add_transactions(weekly_rows(weeks=2))
+    login(client)
+    resp = client.get("/api/analysis/regression/rolling?window_days=7&step_days=2")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    fits = data["fits"]
+    # 14 days of data: windows start on days 0, 2, 4, 6 and 8
+    assert [f["n"] for f in fits] == [14, 14, 14, 14, 12]
+
+    first = fits[0]
+    with app.app_context():
+        rows = Transaction.query.order_by(Transaction.date_time).all()
+        window = [
+            (t.date_time.timestamp(), float(t.amount))
+            for t in rows
+            if first["start"] <= t.date_time.isoformat() < first["end"]
+        ]
+    expected = compute_regression(window)
+    assert first["slope"] == pytest.approx(expected["slope"], rel=1e-6)
+    assert first["intercept"] == pytest.approx(expected["intercept"], rel=1e-6)
+    assert first["r_squared"] == pytest.approx(expected["r_squared"], rel=1e-6)
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "window_days=0",
+        "step_days=-1",
+        "window_days=nan",
+        "window_days=inf",
+        "step_days=inf",
+        "step_days=-inf",
+        "window_days=abc",
+    ],
+)
+def test_api_rolling_regression_rejects_bad_window(
+    client, add_transactions, login, query
+):
+    """
+    Non-positive, non-finite or non-numeric window or step sizes return 400.
+    """
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.get(f"/api/analysis/regression/rolling?{query}")
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+def test_api_regression_group_by_weekday(client, app, add_transactions, login):
+    """
+    GET /api/analysis/regression?group_by=weekday returns one fit per weekday,
+    each matching a separate OLS fit over that weekday's rows.
+    """
+    from main.stats.regression import compute_regression
+
+    add_transactions(weekly_rows(weeks=3))
+    login(client)
+    resp = client.get("/api/analysis/regression?group_by=weekday")
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["group_by"] == "weekday"
+    assert isinstance(data["chart_img"], str)
+    groups = {g["label"]: g for g in data["groups"]}
+    assert sorted(groups) == ["0", "1", "2", "3", "4", "5", "6"]
+
+    with app.app_context():
+        mondays = [
+            (t.date_time.timestamp(), float(t.amount))
+            for t in Transaction.query.all()
+            if t.date_time.weekday() == 0
+        ]
+    expected = compute_regression(mondays)
+    assert groups["0"]["n"] == len(mondays)
+    assert groups["0"]["slope"] == pytest.approx(expected["slope"], rel=1e-6)
+    assert groups["0"]["r_squared"] == pytest.approx(expected["r_squared"], rel=1e-6)
+
+
+def test_html_regression_group_by_period(client, add_transactions, login):
+    """
+    The HTML regression view renders a per-period table of the demo data's
+    three trend lines.
+    """
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.get("/analysis/regression?group_by=period")
+    assert resp.status_code == 200
+    html = resp.get_data(as_text=True)
+    assert "By period" in html
+    for label in ("morning", "noon", "afternoon"):
+        assert f"<td>{label}</td>" in html
+
+
+def expected_summary(app, group_by="weekday"):
+    """Recompute /analysis/summary from scratch for comparison."""
+    from main.stats.regression import compute_regression
+
+    with app.app_context():
+        rows = [(t.date_time, float(t.amount)) for t in Transaction.query.all()]
+    by_day = {}
+    for dt, amount in rows:
+        by_day.setdefault(str(dt.weekday()), []).append(amount)
+    fit = compute_regression([(dt.timestamp(), amount) for dt, amount in rows])
+    return fit, {label: values for label, values in by_day.items()}
+
+
+def assert_summary_matches(client, app):
+    import numpy as np
+
+    data = client.get("/api/analysis/summary?group_by=weekday").get_json()
+    fit, by_day = expected_summary(app)
+    for key in ("slope", "intercept", "r_squared"):
+        assert data["regression"][key] == pytest.approx(fit[key], rel=1e-6)
+    groups = {g["label"]: g for g in data["groups"]}
+    assert sorted(groups) == sorted(by_day)
+    for label, values in by_day.items():
+        assert groups[label]["n"] == len(values)
+        assert groups[label]["mean"] == pytest.approx(np.mean(values), rel=1e-9)
+        if len(values) > 1:
+            assert groups[label]["std"] == pytest.approx(
+                np.std(values, ddof=1), rel=1e-6
+            )
+
+
+def test_api_analysis_summary_tracks_writes(client, app, add_transactions, login):
+    """
+    /api/analysis/summary stays equal to a full recompute across create,
+    update and delete, applying deltas rather than rebuilding.
+    """
+    from main.analytics_store import analytics_store
+
+    add_transactions(weekly_rows(weeks=2))
+    login(client)
+    assert_summary_matches(client, app)
+
+    resp = client.post(
+        "/api/transactions", json={"dateTime": "2025-06-20T10:00:00", "amount": 250}
+    )
+    assert resp.status_code == 201
+    new_id = resp.get_json()["id"]
+    assert analytics_store._states is not None
+    assert_summary_matches(client, app)
+
+    # move the new row to another weekday and change its amount
+    resp = client.put(
+        f"/api/transactions/{new_id}",
+        json={"dateTime": "2025-06-22T10:00:00", "amount": 90},
+    )
+    assert resp.status_code == 200
+    assert analytics_store._states is not None
+    assert_summary_matches(client, app)
+
+    assert client.delete(f"/api/transactions/{new_id}").status_code == 200
+    assert analytics_store._states is not None
+    assert_summary_matches(client, app)
+
+
+def test_api_regression_without_chart_reads_the_analytics_store(
+    client, app, add_transactions, login, monkeypatch
+):
+    """
+    An unfiltered chart=0 regression matches a full fit, and after a write
+    it is answered from the analytics store without a recompute.
+    """
+    import main.api_routes as api_routes
+
+    add_transactions(weekly_rows(weeks=2))
+    login(client)
+    monkeypatch.setattr(
+        api_routes,
+        "_compute_regression",
+        lambda *a: pytest.fail("chart=0 recomputed the regression"),
+    )
+    for _ in range(2):
+        resp = client.get("/api/analysis/regression?chart=0")
+        assert resp.status_code == 200
+        data = resp.get_json()
+        assert data["chart_img"] is None
+        fit, _ = expected_summary(app)
+        for key in ("slope", "intercept", "r_squared"):
+            assert data[key] == pytest.approx(fit[key], rel=1e-6)
+        resp = client.post(
+            "/api/transactions",
+            json={"dateTime": "2025-06-20T10:00:00", "amount": 250},
+        )
+        assert resp.status_code == 201
+
+
+def test_api_delete_of_row_unknown_to_analytics_store(
+    client, app, add_transactions, login
+):
+    """
+    Deleting a row the in-process store never saw (written by another
+    worker) resyncs the store instead of failing the committed request.
+    """
+    from main.analytics_store import analytics_store
+
+    add_transactions(transaction_rows())
+    login(client)
+    assert client.get("/api/analysis/summary").status_code == 200
+    with app.app_context():
+        other = User(name="other_user", password_hash="x")
+        db.session.add(other)
+        db.session.flush()
+        # a Core insert: the store is told nothing about this row
+        txn_id = db.session.execute(
+            db.insert(Transaction).values(
+                user_id=other.id, date_time=datetime(2025, 6, 1), amount=5
+            )
+        ).inserted_primary_key[0]
+        db.session.commit()
+        db.session.delete(db.session.get(Transaction, txn_id))
+        db.session.commit()
+    assert analytics_store._states is None
+    assert_summary_matches(client, app)
+
+
+def test_failing_change_listener_does_not_stop_the_others(
+    client, caplog, add_transactions, login
+):
+    """
+    A listener that raises is logged; later listeners still run and the
+    committing request succeeds.
+    """
+    from main import events
+
+    seen = []
+
+    def broken(changes, started):
+        raise RuntimeError("listener bug")
+
+    events._listeners.insert(0, broken)
+    events._listeners.append(lambda changes, started: seen.append(changes))
+    try:
+        add_transactions(transaction_rows())
+        login(client)
+        resp = client.post(
+            "/api/transactions", json={"dateTime": "2025-06-20T10:00:00", "amount": 1}
+        )
+    finally:
+        del events._listeners[0]
+        events._listeners.pop()
+    assert resp.status_code == 201
+    assert seen
+    assert "listener bug" in caplog.text
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"resamples": 100, "seed": "x"},
+        {"resamples": 100, "seed": -1},
+        {"resamples": 100, "seed": 1.5},
+        {"resamples": "many"},
+        {"resamples": [1]},
+        ["not", "an", "object"],
+    ],
+)
+def test_api_post_abtest_rejects_bad_params(client, payload, add_transactions, login):
+    """
+    Invalid seeds, resample counts and non-object bodies return 400.
+    """
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.post("/api/analysis/abtest", json=payload)
+    assert resp.status_code == 400
+    assert "error" in resp.get_json()
+
+
+def test_api_post_abtest_rejects_malformed_json(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.post(
+        "/api/analysis/abtest", data="{not json", content_type="application/json"
+    )
+    assert resp.status_code == 400
+
+
+def test_resampling_pool_is_reused():
+    from main.stats import resampling
+
+    a = [float(x) for x in range(40)]
+    b = [float(x) + 5 for x in range(35)]
+    try:
+        resampling.permutation_test(a, b, 1200, seed=1, workers=2)
+        pool = resampling._pool
+        resampling.bootstrap_ci(a, b, 1200, seed=1, workers=2)
+        assert pool is not None and resampling._pool is pool
+    finally:
+        resampling.shutdown_pool()
@@ -0,0 +1,104 @@
+# tests/test_arrow.py
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+from main import arrow
+
+pa = pytest.importorskip("pyarrow")
+
+ARROW = {"Accept": arrow.ARROW_STREAM}
+
+
+def transaction_rows(n=7):
+    return [
+        {
+            "date_time": datetime(2025, 6, 1, 9) + timedelta(days=i, hours=i),
+            "amount": Decimal("100.25") + i,
+            "description": f"txn {i}" if i % 2 else None,
+        }
+        for i in range(n)
+    ]
+
+
+def read_table(resp):
+    assert resp.status_code == 200
+    assert resp.mimetype == arrow.ARROW_STREAM
+    return pa.ipc.open_stream(resp.data).read_all()
+
+
+def test_transactions_arrow_stream_preserves_types(
+    client, monkeypatch, add_transactions, login
+):
+    add_transactions(transaction_rows())
+    login(client)
+    # force several record batches
+    monkeypatch.setattr(arrow, "ARROW_BATCH_ROWS", 3)
+    resp = client.get("/api/transactions", headers=ARROW)
+    assert "Accept" in resp.headers["Vary"]
+    table = read_table(resp)
+
+    assert table.schema.field("dateTime").type == pa.timestamp("us")
+    assert table.schema.field("amount").type == pa.decimal128(10, 2)
+    assert table.num_rows == 7
+    assert len(table.to_batches()) == 3
+    assert table.column("amount")[1].as_py() == Decimal("101.25")
+    assert table.column("dateTime")[1].as_py() == datetime(2025, 6, 2, 10)
+
+    listing = client.get("/api/transactions").get_json()
+    assert table.column("id").to_pylist() == [t["id"] for t in listing]
+    assert table.column("description").to_pylist() == [
+        t["description"] for t in listing
+    ]
+
+
+def test_empty_transactions_arrow_stream(client, add_transactions, login):
+    add_transactions(transaction_rows(n=0))
+    login(client)
+    table = read_table(client.get("/api/transactions", headers=ARROW))
+    assert table.num_rows == 0
+    assert table.schema.names == ["id", "dateTime", "amount", "description"]
+
+
+def test_analysis_endpoints_negotiate_arrow(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+
+    fit = read_table(client.get("/api/analysis/regression", headers=ARROW))
+    expected = client.get("/api/analysis/regression").get_json()
+    assert fit.column("slope")[0].as_py() == pytest.approx(expected["slope"])
+    assert "chart_img" not in fit.schema.names
+
+    grouped = read_table(
+        client.get("/api/analysis/regression?group_by=weekday", headers=ARROW)
+    )
+    assert grouped.schema.metadata[b"group_by"] == b'"weekday"'
+
+    ab = read_table(client.get("/api/analysis/abtest", headers=ARROW))
+    assert set(ab.column("group").to_pylist()) <= {"A", "B"}
+    assert b"p_value" in ab.schema.metadata
+
+
+def test_json_stays_default_and_406_for_unsupported(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.get(
+        "/api/transactions",
+        headers={"Accept": f"application/json, {arrow.ARROW_STREAM};q=0.5"},
+    )
+    assert resp.mimetype == "application/json"
+    assert client.get("/api/transactions", headers={"Accept": "*/*"}).is_json
+    resp = client.get("/api/transactions", headers={"Accept": "text/csv"})
+    assert resp.status_code == 406
+
+
+def test_etag_differs_per_representation(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    json_tag = client.get("/api/transactions").headers["ETag"]
+    arrow_resp = client.get(
+        "/api/transactions", headers={**ARROW, "If-None-Match": json_tag}
+    )
+    assert arrow_resp.status_code == 200
+    assert arrow_resp.headers["ETag"] != json_tag
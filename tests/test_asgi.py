@@ -0,0 +1,282 @@
+# tests/test_asgi.py
+
+import asyncio
+import gzip
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from extensions import db
+from main.cache import result_cache
+from models import Transaction, User
+
+pytest.importorskip("aiosqlite")
+pytest.importorskip("asgiref")
+
+from asgi import AsyncAPI  # noqa: E402
+
+
+def seed_sqlite_file(path):
+    """Create the schema in a SQLite file and add one user with 10 rows."""
+    engine = create_engine(f"sqlite:///{path}")
+    db.metadata.create_all(engine)
+    with Session(engine) as s:
+        user = User(name="demo_user", password_hash="x")
+        s.add(user)
+        s.flush()
+        for i in range(10):
+            s.add(
+                Transaction(
+                    user_id=user.id,
+                    date_time=datetime(2025, 6, 1, 9) + timedelta(days=i),
+                    amount=100 + 2 * i,
+                    description=f"txn {i}",
+                )
+            )
+        s.commit()
+        user_id = user.id
+    engine.dispose()
+    return user_id
+
+
+def call(asgi_app, method, path, query="", cookie=None, body=b"", headers=None):
+    """Drive one HTTP request through an ASGI app; return (status, headers, body)."""
+    extra_headers = headers or {}
+    headers = [(b"host", b"localhost")]
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+    for name, value in extra_headers.items():
+        headers.append((name.lower().encode(), value.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": headers,
+        "server": ("localhost", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        await asgi_app(scope, receive, send)
+        await asgi_app.engine.dispose()
+
+    asyncio.run(run())
+    start = sent[0]
+    payload = b"".join(m.get("body", b"") for m in sent[1:])
+    return start["status"], dict(start["headers"]), payload
+
+
+@pytest.fixture
+def asgi_app(app, tmp_path):
+    path = tmp_path / "asgi.db"
+    user_id = seed_sqlite_file(path)
+    asgi_app = AsyncAPI(
+        app, database_url=f"sqlite:///{path}", executor=ThreadPoolExecutor(1)
+    )
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookie_name = app.config["SESSION_COOKIE_NAME"]
+    asgi_app.test_cookie = f"{cookie_name}={serializer.dumps({'user_id': user_id})}"
+    # the async routes share the Flask views' result cache
+    result_cache.clear()
+    yield asgi_app
+    asgi_app.executor.shutdown()
+    result_cache.clear()
+
+
+def test_asgi_lists_transactions_async(asgi_app):
+    """
+    GET /api/transactions is served from the async engine with the same shape
+    as the Flask endpoint.
+    """
+    status, headers, body = call(
+        asgi_app, "GET", "/api/transactions", cookie=asgi_app.test_cookie
+    )
+    assert status == 200
+    data = json.loads(body)
+    assert len(data) == 10
+    assert data[0]["dateTime"] == "2025-06-01T09:00:00"
+    assert data[0]["amount"] == 100.0
+
+
+def test_asgi_regression_runs_in_executor(asgi_app):
+    """
+    GET /api/analysis/regression returns the same fit as compute_regression.
+    """
+    from main.stats.regression import compute_regression
+
+    status, _, body = call(
+        asgi_app, "GET", "/api/analysis/regression", cookie=asgi_app.test_cookie
+    )
+    assert status == 200
+    data = json.loads(body)
+    expected = compute_regression(
+        [
+            ((datetime(2025, 6, 1, 9) + timedelta(days=i)).timestamp(), 100 + 2 * i)
+            for i in range(10)
+        ]
+    )
+    assert data["slope"] == pytest.approx(expected["slope"])
+    assert data["r_squared"] == pytest.approx(1.0)
+    assert isinstance(data["chart_img"], str)
+
+
+def test_asgi_requires_login_and_delegates_other_paths(asgi_app):
+    """
+    Async routes redirect without a session; other paths go to Flask.
+    """
+    status, headers, _ = call(asgi_app, "GET", "/api/analysis/regression")
+    assert status == 302
+    assert headers[b"location"] == b"/login"
+
+    status, _, body = call(asgi_app, "GET", "/api/me")
+    assert status == 401
+    assert "error" in json.loads(body)
+
+
+def test_asgi_conditional_get_returns_304(asgi_app):
+    """
+    Async GETs carry an ETag; repeating with If-None-Match skips the work.
+    """
+    status, headers, _ = call(
+        asgi_app, "GET", "/api/analysis/regression", cookie=asgi_app.test_cookie
+    )
+    assert status == 200
+    etag = headers[b"etag"].decode()
+
+    status, headers, body = call(
+        asgi_app,
+        "GET",
+        "/api/analysis/regression",
+        cookie=asgi_app.test_cookie,
+        headers={"If-None-Match": etag},
+    )
+    assert status == 304
+    assert body == b""
+    assert headers[b"etag"].decode() == etag
+
+
+def test_asgi_compresses_large_json(asgi_app):
+    """
+    Async JSON responses honour Accept-Encoding like the WSGI middleware.
+    """
+    status, headers, body = call(
+        asgi_app,
+        "GET",
+        "/api/analysis/regression",
+        cookie=asgi_app.test_cookie,
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert status == 200
+    assert headers[b"content-encoding"] == b"gzip"
+    assert headers[b"etag"].endswith(b'-gzip"')
+    assert "slope" in json.loads(gzip.decompress(body))
+
+    etag = headers[b"etag"].decode()
+    status, headers, _ = call(
+        asgi_app,
+        "GET",
+        "/api/analysis/regression",
+        cookie=asgi_app.test_cookie,
+        headers={"Accept-Encoding": "gzip", "If-None-Match": etag},
+    )
+    assert status == 304
+    assert headers[b"etag"].decode() == etag
+
+
+@pytest.mark.parametrize(
+    "body",
+    [b"{not json", b"[1, 2]", b'{"resamples": "many"}', b'{"seed": -3}'],
+)
+def test_asgi_abtest_rejects_bad_body(asgi_app, body):
+    """
+    Malformed or invalid A/B test bodies return 400, as under Flask.
+    """
+    status, _, payload = call(
+        asgi_app,
+        "POST",
+        "/api/analysis/abtest",
+        cookie=asgi_app.test_cookie,
+        body=body,
+        headers={"Content-Type": "application/json"},
+    )
+    assert status == 400
+    assert "error" in json.loads(payload)
+
+
+def test_asgi_results_are_cached_and_queries_watched(asgi_app, monkeypatch):
+    """
+    A repeated request is answered from the result cache without fetching
+    rows again, and QUERY_WATCH_ENABLED counts the statements.
+    """
+    monkeypatch.setitem(asgi_app.flask_app.config, "QUERY_WATCH_ENABLED", True)
+    before = result_cache.stats()
+    status, headers, first = call(
+        asgi_app, "GET", "/api/analysis/regression", cookie=asgi_app.test_cookie
+    )
+    assert status == 200
+    # the data version and the rows
+    assert headers[b"x-query-count"] == b"2"
+
+    status, headers, second = call(
+        asgi_app, "GET", "/api/analysis/regression", cookie=asgi_app.test_cookie
+    )
+    assert status == 200 and second == first
+    assert headers[b"x-query-count"] == b"1"
+    assert result_cache.stats()["hits"] == before["hits"] + 1
+
+
+def test_asgi_session_lookup_runs_off_the_event_loop(asgi_app, monkeypatch):
+    loop_threads = []
+    lookup = asgi_app._session_user_id
+
+    def record(cookie):
+        try:
+            asyncio.get_running_loop()
+            loop_threads.append(True)
+        except RuntimeError:
+            loop_threads.append(False)
+        return lookup(cookie)
+
+    monkeypatch.setattr(asgi_app, "_session_user_id", record)
+    status, _, _ = call(
+        asgi_app, "GET", "/api/transactions", cookie=asgi_app.test_cookie
+    )
+    assert status == 200
+    assert loop_threads == [False]
+
+
+def test_asgi_hands_profiled_requests_to_flask(asgi_app, monkeypatch):
+    monkeypatch.setitem(asgi_app.flask_app.config, "PROFILING_ENABLED", True)
+    handled = []
+
+    async def wsgi(scope, receive, send):
+        handled.append(scope["path"])
+        await asgi_app._send(send, 204, b"", [])
+
+    monkeypatch.setattr(asgi_app, "wsgi", wsgi)
+    status, _, _ = call(
+        asgi_app,
+        "GET",
+        "/api/analysis/regression",
+        cookie=asgi_app.test_cookie,
+        headers={"X-Profile": "token"},
+    )
+    assert status == 204 and handled == ["/api/analysis/regression"]
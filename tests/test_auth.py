@@ -1,31 +1,18 @@
 # tests/test_auth.py
 
+import pytest
 from werkzeug.security import generate_password_hash
 
+from auth.passwords import passwords
 from extensions import db
 from models import User
 
 
-def seed_demo_user(app):
-    """
-    Helper to setup a fresh DB with a single demo_user.
-    """
-    with app.app_context():
-        db.drop_all()
-        db.create_all()
-        demo_user = User(
-            name="demo_user", password_hash=generate_password_hash("password123")
-        )
-        db.session.add(demo_user)
-        db.session.commit()
-
-
-def test_api_login_demo_user(client, app):
+def test_api_login_demo_user(client, db_session):
     """
     Test the JSON API login endpoint ('/api/login').
     Should return 200 for valid credentials.
     """
-    seed_demo_user(app)
     resp = client.post(
         "/api/login", json={"email": "demo_user", "password": "password123"}
     )
@@ -33,39 +20,210 @@ def test_api_login_demo_user(client, app):
     assert resp.get_json() == {"message": "Logged in"}
 
 
-def test_api_login_invalid_password(client, app):
+def test_api_login_invalid_password(client, db_session):
     """
     Invalid password should return 401 Unauthorized.
     """
-    seed_demo_user(app)
     resp = client.post(
         "/api/login", json={"email": "demo_user", "password": "wrongpass"}
     )
     assert resp.status_code == 401
 
 
-def test_api_register_new_user(client, app):
+def test_api_register_new_user(client, db_session):
     """
     Test the JSON API register endpoint ('/api/register').
     Should return 201 Created for a new email.
     """
-    # Clean slate
-    with app.app_context():
-        db.drop_all()
-        db.create_all()
-
     resp = client.post("/api/register", json={"email": "alice", "password": "s3cret"})
     assert resp.status_code == 201
     assert resp.get_json() == {"message": "Registered successfully"}
 
 
-def test_api_register_duplicate_user(client, app):
+def test_api_register_duplicate_user(client, db_session):
     """
     Registering an existing email should return 400 Bad Request.
     """
-    seed_demo_user(app)
     resp = client.post(
         "/api/register", json={"email": "demo_user", "password": "password123"}
     )
     assert resp.status_code == 400
     assert "error" in resp.get_json()
+
+
+def test_token_bucket_refills_over_time():
+    from auth.ratelimit import TokenBucket
+
+    now = [0.0]
+    bucket = TokenBucket(burst=2, rate=0.5, max_keys=2, clock=lambda: now[0])
+    assert bucket.take("a") == 0 and bucket.take("a") == 0
+    assert bucket.take("a") == 2.0
+    now[0] = 2.0
+    assert bucket.take("a") == 0
+    # least recently used keys are forgotten beyond max_keys
+    bucket.take("b")
+    bucket.take("c")
+    assert "a" not in bucket._buckets
+
+
+def test_login_is_rate_limited_per_ip_and_account(client, app, monkeypatch, db_session):
+    from auth.ratelimit import login_limiter
+
+    monkeypatch.setitem(app.config, "LOGIN_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(app.config, "LOGIN_IP_BURST", 4)
+    monkeypatch.setitem(app.config, "LOGIN_ACCOUNT_BURST", 2)
+    login_limiter.configure(app.config)
+    try:
+        bad = {"email": "demo_user", "password": "wrongpass"}
+        assert client.post("/api/login", json=bad).status_code == 401
+        assert client.post("/api/login", json=bad).status_code == 401
+        # the account is exhausted even for the right password
+        resp = client.post(
+            "/api/login", json={"email": "demo_user", "password": "password123"}
+        )
+        assert resp.status_code == 429
+        assert int(resp.headers["Retry-After"]) >= 1
+        # other accounts still get through until the IP bucket is empty
+        other = {"email": "nobody", "password": "x"}
+        assert client.post("/api/login", json=other).status_code == 401
+        assert client.post("/api/login", json=other).status_code == 429
+        elsewhere = app.test_client()
+        resp = elsewhere.post(
+            "/api/login",
+            json={"email": "nobody", "password": "x"},
+            environ_base={"REMOTE_ADDR": "10.0.0.9"},
+        )
+        assert resp.status_code == 401
+    finally:
+        login_limiter.configure(app.config)
+
+
+def test_failed_attempts_elsewhere_do_not_lock_the_owner_out(
+    client, app, monkeypatch, db_session
+):
+    from auth.ratelimit import login_limiter
+
+    monkeypatch.setitem(app.config, "LOGIN_RATE_LIMIT_ENABLED", True)
+    monkeypatch.setitem(app.config, "LOGIN_ACCOUNT_BURST", 2)
+    login_limiter.configure(app.config)
+    try:
+        attacker = {"REMOTE_ADDR": "10.0.0.66"}
+        bad = {"email": "demo_user", "password": "wrongpass"}
+        for status in (401, 401, 429):
+            resp = client.post("/api/login", json=bad, environ_base=attacker)
+            assert resp.status_code == status
+        owner = app.test_client()
+        resp = owner.post(
+            "/api/login",
+            json={"email": "demo_user", "password": "password123"},
+            environ_base={"REMOTE_ADDR": "10.0.0.7"},
+        )
+        assert resp.status_code == 200
+    finally:
+        login_limiter.configure(app.config)
+
+
+def test_login_upgrades_outdated_hash(client, demo_user_id):
+    old_hash = generate_password_hash("password123", method="pbkdf2:sha256:500")
+    db.session.get(User, demo_user_id).password_hash = old_hash
+    db.session.commit()
+
+    resp = client.post(
+        "/api/login", json={"email": "demo_user", "password": "password123"}
+    )
+    assert resp.status_code == 200
+    new_hash = db.session.get(User, demo_user_id).password_hash
+    assert new_hash != old_hash
+    assert not passwords.needs_rehash(new_hash)
+    assert (
+        client.post(
+            "/api/login", json={"email": "demo_user", "password": "password123"}
+        ).status_code
+        == 200
+    )
+
+
+@pytest.mark.parametrize(
+    "stored, method, expected",
+    [
+        ("pbkdf2:sha256:500", "pbkdf2:sha256:1000", True),
+        ("pbkdf2:sha256:2000", "pbkdf2:sha256:1000", False),
+        ("pbkdf2:sha1:5000", "pbkdf2:sha256:1000", True),
+        ("pbkdf2:sha256:600000", "scrypt:32768:8:1", True),
+        ("scrypt:32768:8:1", "pbkdf2:sha256:600000", False),
+        ("scrypt:16384:8:1", "scrypt:32768:8:1", True),
+        ("sha256", "pbkdf2:sha256:1000", True),
+    ],
+)
+def test_only_weaker_hashes_need_rehash(monkeypatch, stored, method, expected):
+    monkeypatch.setattr(passwords, "method", method)
+    monkeypatch.setattr("auth.passwords._method_prefix", lambda method=None: method)
+    assert passwords.needs_rehash(f"{stored}$salt$digest") is expected
+
+
+def test_login_keeps_a_stronger_scrypt_hash(client, demo_user_id):
+    try:
+        scrypt_hash = generate_password_hash("password123", method="scrypt")
+    except ValueError:
+        pytest.skip("this werkzeug has no scrypt")
+    db.session.get(User, demo_user_id).password_hash = scrypt_hash
+    db.session.commit()
+
+    resp = client.post(
+        "/api/login", json={"email": "demo_user", "password": "password123"}
+    )
+    assert resp.status_code == 200
+    assert db.session.get(User, demo_user_id).password_hash == scrypt_hash
+
+
+def test_login_sheds_load_when_hashing_pool_is_full(client, monkeypatch, db_session):
+    from auth.passwords import PasswordHashingBusy, passwords
+
+    def busy(*args):
+        raise PasswordHashingBusy()
+
+    monkeypatch.setattr(passwords, "_run", busy)
+    resp = client.post(
+        "/api/login", json={"email": "demo_user", "password": "password123"}
+    )
+    assert resp.status_code == 503
+    assert resp.headers["Retry-After"] == "1"
+
+
+def test_html_login_and_register_use_the_database(client, db_session):
+    resp = client.post("/register", data={"email": "bob", "password": "pw"})
+    assert resp.status_code == 302
+    resp = client.post("/login", data={"email": "bob", "password": "pw"})
+    assert resp.status_code == 302
+    assert resp.headers["Location"].endswith("/transactions")
+    resp = client.post("/login", data={"email": "bob", "password": "nope"})
+    assert resp.status_code == 200
+
+
+def test_password_hasher_bounds_pending_work():
+    import threading
+
+    import pytest
+
+    from auth.passwords import PasswordHasher, PasswordHashingBusy
+
+    hasher = PasswordHasher()
+    hasher._workers, hasher._max_pending = 1, 1
+    release = threading.Event()
+    started = threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "done"
+
+    results = []
+    worker = threading.Thread(target=lambda: results.append(hasher._run(slow)))
+    worker.start()
+    started.wait(5)
+    with pytest.raises(PasswordHashingBusy):
+        hasher.hash("pw")
+    release.set()
+    worker.join(5)
+    assert results == ["done"]
+    assert hasher.check(hasher.hash("pw"), "pw")
@@ -0,0 +1,147 @@
+# tests/test_cache.py
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from main.cache import MemoryCache, ResultCache, SQLiteCache, result_cache
+from main.singleflight import SingleFlight
+
+
+@pytest.fixture
+def two_users(add_user, add_transactions):
+    """alice with six transactions and bob with none; returns their ids."""
+    alice_id, bob_id = add_user("alice", "pw"), add_user("bob", "pw")
+    add_transactions(
+        (
+            {
+                "date_time": datetime(2025, 6, 1) + timedelta(days=i),
+                "amount": 10 + i,
+                "description": f"txn {i}",
+            }
+            for i in range(6)
+        ),
+        user_id=alice_id,
+    )
+    return alice_id, bob_id
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1  # a is now most recently used
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a = SQLiteCache(path, max_entries=2)
+    worker_b = SQLiteCache(path, max_entries=2)
+
+    worker_a.set("k", {"slope": 1.5}, ttl=60)
+    assert worker_b.get("k") == {"slope": 1.5}
+
+    worker_a.incr(["all", "user:1"])
+    assert worker_b.counter("all") == 1
+    assert worker_b.counter("user:1") == 1
+    assert worker_b.counter("user:2") == 0
+
+    worker_b.set("x", 1, ttl=60)
+    worker_b.set("y", 2, ttl=60)
+    assert len(worker_a) == 2
+
+
+def test_generations_follow_writes(two_users):
+    alice_id, bob_id = two_users
+    cache = ResultCache()
+    cache.backend = MemoryCache()
+    cache.ttl = 60
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+
+    assert cache.get_or_compute("e", alice_id, (), compute) == 1
+    assert cache.get_or_compute("e", alice_id, (), compute) == 1
+    assert cache.get_or_compute("e", alice_id, (), compute, scope_user=alice_id) == 2
+
+    cache.invalidate([bob_id])
+    # global results move on any write; alice's own results don't
+    assert cache.get_or_compute("e", alice_id, (), compute) == 3
+    assert cache.get_or_compute("e", alice_id, (), compute, scope_user=alice_id) == 2
+
+    cache.invalidate()  # unattributed write moves everything
+    assert cache.get_or_compute("e", alice_id, (), compute, scope_user=alice_id) == 4
+
+
+def test_endpoints_serve_cached_results_until_a_write(client, two_users, login):
+    login(client, "alice", "pw")
+
+    before = result_cache.stats()
+    first = client.get("/api/transactions").get_json()
+    second = client.get("/api/transactions").get_json()
+    assert first == second and len(first) == 6
+    after = result_cache.stats()
+    assert after["hits"] == before["hits"] + 1
+
+    reg_before = client.get("/api/analysis/regression").get_json()
+    resp = client.post(
+        "/api/transactions", json={"dateTime": "2025-06-20T10:00:00", "amount": 500}
+    )
+    assert resp.status_code == 201
+
+    assert len(client.get("/api/transactions").get_json()) == 7
+    reg_after = client.get("/api/analysis/regression").get_json()
+    assert reg_after["slope"] != reg_before["slope"]
+
+
+def test_requests_after_a_write_do_not_join_an_older_computation():
+    cache = ResultCache()
+    cache.backend = MemoryCache()
+    cache.ttl = 60
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "before"
+
+    results = []
+    leader = threading.Thread(
+        target=lambda: results.append(
+            cache.get_or_compute("e", 1, (), slow, flight=flight)
+        )
+    )
+    leader.start()
+    started.wait(5)
+    cache.invalidate([1])
+    assert cache.get_or_compute("e", 1, (), lambda: "after", flight=flight) == "after"
+    release.set()
+    leader.join(5)
+    assert results == ["before"]
+    assert flight.stats()["coalesced"] == 0
+
+
+def test_large_listings_are_not_cached(app, client, two_users, login, monkeypatch):
+    login(client, "alice", "pw")
+    monkeypatch.setitem(app.config, "CACHE_MAX_ROWS", 5)
+
+    before = result_cache.stats()
+    assert len(client.get("/api/transactions").get_json()) == 6
+    assert len(client.get("/api/transactions").get_json()) == 6
+    assert result_cache.stats()["hits"] == before["hits"]
+
+    query = "/api/transactions?min_amount=12"
+    assert len(client.get(query).get_json()) == 4
+    client.get(query)
+    assert result_cache.stats()["hits"] == before["hits"] + 1
@@ -0,0 +1,127 @@
+# tests/test_compression.py
+import gzip
+import json
+import zlib
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.test import Client
+from werkzeug.wrappers import Response
+
+from main.compression import CompressionMiddleware, brotli
+
+
+def transaction_rows(n=200):
+    return [
+        {
+            "date_time": datetime(2025, 6, 1) + timedelta(hours=5 * i),
+            "amount": 100 + i % 17,
+            "description": f"txn {i}",
+        }
+        for i in range(n)
+    ]
+
+
+def test_listing_is_gzipped_and_stays_conditional(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    plain = client.get("/api/transactions")
+    resp = client.get("/api/transactions", headers={"Accept-Encoding": "gzip"})
+
+    assert resp.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["Vary"]
+    assert json.loads(gzip.decompress(resp.data)) == plain.get_json()
+    assert len(resp.data) < len(plain.data) / 3
+    assert resp.headers["ETag"] == plain.headers["ETag"][:-1] + '-gzip"'
+
+    again = client.get(
+        "/api/transactions",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": resp.headers["ETag"]},
+    )
+    assert again.status_code == 304
+    # the 304 names the representation the client has cached
+    assert again.headers["ETag"] == resp.headers["ETag"]
+
+    identity = client.get(
+        "/api/transactions",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": plain.headers["ETag"]},
+    )
+    assert identity.status_code == 304
+    assert identity.headers["ETag"] == plain.headers["ETag"]
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli not installed")
+def test_brotli_preferred_when_accepted(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.get(
+        "/api/transactions", headers={"Accept-Encoding": "gzip, deflate, br"}
+    )
+    assert resp.headers["Content-Encoding"] == "br"
+    assert json.loads(brotli.decompress(resp.data))
+
+
+def test_small_and_refused_bodies_are_not_compressed(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    small = client.get("/api/me", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in small.headers
+    refused = client.get(
+        "/api/transactions", headers={"Accept-Encoding": "gzip;q=0, identity"}
+    )
+    assert "Content-Encoding" not in refused.headers
+
+
+def wsgi_app(body, mimetype, chunks=None):
+    def app(environ, start_response):
+        response = Response(chunks if chunks is not None else body, mimetype=mimetype)
+        return response(environ, start_response)
+
+    return app
+
+
+def test_png_is_passed_through():
+    png = b"\x89PNG" + b"\x00" * 4096
+    client = Client(CompressionMiddleware(wsgi_app(png, "image/png")))
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in resp.headers
+    assert resp.data == png
+
+
+def test_streamed_body_is_compressed_incrementally():
+    consumed = []
+
+    def chunks():
+        for i in range(3):
+            consumed.append(i)
+            yield (f'{{"chunk": {i}}}\n' * 200).encode()
+
+    app = CompressionMiddleware(wsgi_app(None, "text/csv", chunks()), min_size=10**9)
+    client = Client(app)
+    resp = client.get("/", headers={"Accept-Encoding": "gzip"}, buffered=False)
+    assert resp.headers["Content-Encoding"] == "gzip"
+    body = iter(resp.response)
+    first = next(body)
+    # the first compressed piece went out before later chunks were produced
+    assert consumed == [0]
+    decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    assert decoder.decompress(first).startswith(b'{"chunk": 0}')
+    rest = b"".join(body)
+    assert (decoder.decompress(rest) + decoder.flush()).endswith(b'{"chunk": 2}\n')
+
+
+def test_app_iter_is_closed_when_the_body_is_never_read():
+    closed = []
+
+    class Body:
+        def __iter__(self):
+            yield b"x" * 4096
+
+        def close(self):
+            closed.append(True)
+
+    app = CompressionMiddleware(wsgi_app(None, "text/plain", Body()))
+    environ = {"REQUEST_METHOD": "GET", "HTTP_ACCEPT_ENCODING": "gzip"}
+    body = app(environ, lambda status, headers, exc_info=None: None)
+    body.close()
+    assert closed == [True]
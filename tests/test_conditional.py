@@ -0,0 +1,93 @@
+# tests/test_conditional.py
+from datetime import datetime, timedelta
+
+
+def transaction_rows():
+    return [
+        {
+            "date_time": datetime(2025, 6, 1) + timedelta(days=i),
+            "amount": 100 + i,
+            "description": f"txn {i}",
+        }
+        for i in range(5)
+    ]
+
+
+def test_list_transactions_304_until_data_changes(client, add_transactions, login):
+    ids = add_transactions(transaction_rows())
+    login(client)
+    first = client.get("/api/transactions")
+    assert first.status_code == 200
+    etag = first.headers["ETag"]
+    assert first.headers["Cache-Control"] == "private, no-cache"
+
+    again = client.get("/api/transactions", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+    # an in-place update keeps count and max(id) but moves updated_at
+    resp = client.put(f"/api/transactions/{ids[1]}", json={"amount": 999})
+    assert resp.status_code == 200
+    changed = client.get("/api/transactions", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert 999.0 in [t["amount"] for t in changed.get_json()]
+
+
+def test_etag_depends_on_query_and_skips_analysis(
+    client, monkeypatch, add_transactions, login
+):
+    from main import api_routes
+
+    add_transactions(transaction_rows())
+    login(client)
+    morning = client.get("/api/analysis/regression?period=morning")
+    everything = client.get("/api/analysis/regression?period=all")
+    assert morning.headers["ETag"] != everything.headers["ETag"]
+
+    def fail(*args, **kwargs):
+        raise AssertionError("view ran despite a matching ETag")
+
+    monkeypatch.setattr(api_routes, "_regression_payload", fail)
+    resp = client.get(
+        "/api/analysis/regression?period=all",
+        headers={"If-None-Match": everything.headers["ETag"]},
+    )
+    assert resp.status_code == 304
+
+
+def test_abtest_post_is_not_conditional(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    etag = client.get("/api/analysis/abtest").headers["ETag"]
+    resp = client.post(
+        "/api/analysis/abtest",
+        json={"group_by": "half"},
+        headers={"If-None-Match": etag},
+    )
+    assert resp.status_code == 200
+    assert "ETag" not in resp.headers
+
+
+def test_own_summary_etag_ignores_other_users_writes(
+    client, add_user, add_transactions, login
+):
+    add_transactions(transaction_rows())
+    other_id = add_user("other")
+    login(client)
+    mine = client.get("/api/analysis/summary?user=me")
+    everyone = client.get("/api/analysis/summary")
+    assert mine.status_code == everyone.status_code == 200
+
+    add_transactions(transaction_rows(), user_id=other_id)
+    again = client.get(
+        "/api/analysis/summary?user=me",
+        headers={"If-None-Match": mine.headers["ETag"]},
+    )
+    assert again.status_code == 304
+    changed = client.get(
+        "/api/analysis/summary", headers={"If-None-Match": everyone.headers["ETag"]}
+    )
+    assert changed.status_code == 200
+    assert changed.get_json()["n"] == 10
@@ -0,0 +1,126 @@
+# tests/test_db_fixtures.py
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from werkzeug.security import generate_password_hash
+
+from extensions import db
+from main.cache import result_cache
+from models import Transaction, User
+from tests.conftest import (
+    POSTGRES_BASE_URL,
+    _template_name,
+    _worker_name,
+    clone_worker_database,
+    drop_worker_database,
+    rolled_back,
+)
+
+
+def _count():
+    return db.session.query(Transaction).count()
+
+
+def test_commits_are_rolled_back_afterwards(app):
+    with app.app_context():
+        before = _count()
+    with rolled_back(app):
+        db.session.add(
+            User(name="fixture_user", password_hash=generate_password_hash("pw"))
+        )
+        db.session.commit()
+        client = app.test_client()
+        resp = client.post(
+            "/api/login", json={"email": "fixture_user", "password": "pw"}
+        )
+        assert resp.status_code == 200
+        resp = client.post(
+            "/api/transactions",
+            json={"dateTime": "2025-06-01T10:00:00", "amount": 42},
+        )
+        assert resp.status_code == 201
+        txn_id = resp.get_json()["id"]
+        resp = client.put(f"/api/transactions/{txn_id}", json={"amount": 43})
+        assert resp.status_code == 200
+        assert _count() == before + 1
+        assert client.get("/api/transactions").status_code == 200
+    with app.app_context():
+        assert _count() == before
+        assert db.session.get(Transaction, txn_id) is None
+        assert User.query.filter_by(name="fixture_user").count() == 0
+    assert len(result_cache.backend) == 0
+
+
+def test_failed_commit_keeps_the_outer_transaction(db_session):
+    user = User(name="first", password_hash="x")
+    db.session.add(user)
+    db.session.commit()
+    db.session.add(User(name="first", password_hash="x"))
+    with pytest.raises(IntegrityError):
+        db.session.commit()
+    db.session.rollback()
+    db.session.add(User(name="second", password_hash="x"))
+    db.session.commit()
+    assert db.session.get(User, user.id).name == "first"
+    assert User.query.filter(User.name.in_(["first", "second"])).count() == 2
+
+
+def test_db_session_is_the_apps_session(db_session):
+    assert db.session is db_session
+    db.session.add(User(name="transient", password_hash="x"))
+    db.session.commit()
+    assert User.query.filter_by(name="transient").count() == 1
+
+
+def test_worker_and_template_database_names(monkeypatch):
+    base = make_url("postgresql://u:p@localhost/budget_test")
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw3")
+    assert _worker_name(base) == "budget_test_gw3"
+    monkeypatch.delenv("PYTEST_XDIST_WORKER")
+    assert _worker_name(base) == "budget_test_main"
+    # one template per schema version, shared by every worker
+    template = _template_name(base)
+    assert template.startswith("budget_test_tmpl_")
+    assert _template_name(base) == template
+
+
+def test_template_name_follows_the_schema():
+    base = make_url("postgresql://u:p@localhost/budget_test")
+    before = _template_name(base)
+    table = db.Table("template_probe", db.metadata, db.Column("id", db.Integer))
+    try:
+        assert _template_name(base) != before
+    finally:
+        db.metadata.remove(table)
+    assert _template_name(base) == before
+
+
+@pytest.mark.skipif(
+    not POSTGRES_BASE_URL, reason="set TEST_DATABASE_URL to a Postgres database"
+)
+def test_worker_database_is_a_seeded_clone(test_database, monkeypatch):
+    url = make_url(test_database)
+    assert url.database == _worker_name(make_url(POSTGRES_BASE_URL))
+    engine = create_engine(url)
+    try:
+        with engine.connect() as conn:
+            names = conn.execute(text("SELECT name FROM users")).scalars().all()
+    finally:
+        engine.dispose()
+    assert "demo_user" in names
+
+    # a second worker gets its own clone of the same template
+    monkeypatch.setenv("PYTEST_XDIST_WORKER", "gw_other")
+    other = clone_worker_database(POSTGRES_BASE_URL)
+    try:
+        assert make_url(other).database.endswith("_gw_other")
+        engine = create_engine(other)
+        try:
+            with engine.connect() as conn:
+                count = conn.scalar(text("SELECT count(*) FROM transactions"))
+        finally:
+            engine.dispose()
+        assert count == 0
+    finally:
+        drop_worker_database(other)
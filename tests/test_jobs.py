@@ -0,0 +1,140 @@
+# tests/test_jobs.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from main.jobs import JOB_QUEUED, JOB_RUNNING, _utcnow, dedupe_key, jobs
+from models import AnalysisJob
+
+
+def transaction_rows():
+    return [
+        {
+            "date_time": datetime(2025, 6, 1, 9) + timedelta(days=i, hours=i),
+            "amount": 100 + 3 * i,
+            "description": f"txn {i}",
+        }
+        for i in range(6)
+    ]
+
+
+@pytest.fixture
+def inline_jobs(app):
+    """Run jobs synchronously at submit time."""
+    previous = app.config["JOB_WORKERS"]
+    app.config["JOB_WORKERS"] = 0
+    yield
+    app.config["JOB_WORKERS"] = previous
+
+
+def test_regression_job_result_matches_sync_endpoint(
+    client, inline_jobs, add_transactions, login
+):
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.post(
+        "/api/analysis/jobs", json={"kind": "regression", "params": {"period": "all"}}
+    )
+    assert resp.status_code == 202
+    body = resp.get_json()
+    assert body["deduplicated"] is False
+    assert resp.headers["Location"].endswith(f"/api/analysis/jobs/{body['id']}")
+
+    job = client.get(resp.headers["Location"]).get_json()
+    assert job["status"] == "done"
+    expected = client.get("/api/analysis/regression?period=all").get_json()
+    assert job["result"]["slope"] == pytest.approx(expected["slope"])
+    assert job["result"]["intercept"] == pytest.approx(expected["intercept"])
+
+
+def test_abtest_job_runs(client, inline_jobs, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.post(
+        "/api/analysis/jobs",
+        json={"kind": "abtest", "params": {"group_by": "half"}},
+    )
+    job = client.get(f"/api/analysis/jobs/{resp.get_json()['id']}").get_json()
+    assert job["status"] == "done"
+    assert {"groupA", "groupB", "p_value"} <= set(job["result"])
+
+
+def test_identical_in_flight_job_is_deduplicated(
+    client, app, add_transactions, login, demo_user_id
+):
+    add_transactions(transaction_rows())
+    login(client)
+    params = {"group_by": "weekday"}
+    with app.app_context():
+        db.session.add(
+            AnalysisJob(
+                id="a" * 32,
+                user_id=demo_user_id,
+                kind="regression",
+                dedupe_key=dedupe_key(demo_user_id, "regression", params),
+                status=JOB_QUEUED,
+                created_at=_utcnow(),
+            )
+        )
+        db.session.commit()
+
+    resp = client.post(
+        "/api/analysis/jobs", json={"kind": "regression", "params": params}
+    )
+    assert resp.status_code == 202
+    assert resp.get_json() == {"id": "a" * 32, "status": "queued", "deduplicated": True}
+
+
+def test_job_validation_and_unknown_id(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.post("/api/analysis/jobs", json={"kind": "nope"})
+    assert resp.status_code == 400
+    resp = client.post(
+        "/api/analysis/jobs",
+        json={"kind": "regression", "params": {"start_date": "bad"}},
+    )
+    assert resp.status_code == 400
+    assert client.get("/api/analysis/jobs/" + "0" * 32).status_code == 404
+
+
+def test_stuck_in_flight_jobs_time_out(client, app, inline_jobs, login, demo_user_id):
+    login(client)
+    params = {"group_by": "weekday"}
+    long_ago = _utcnow() - timedelta(seconds=app.config["JOB_TIMEOUT"] + 60)
+    db.session.add_all(
+        [
+            # its worker died mid-run: it must not dedupe the new submission
+            AnalysisJob(
+                id="b" * 32,
+                user_id=demo_user_id,
+                kind="regression",
+                dedupe_key=dedupe_key(demo_user_id, "regression", params),
+                status=JOB_RUNNING,
+                created_at=long_ago,
+                started_at=long_ago,
+            ),
+            AnalysisJob(
+                id="c" * 32,
+                user_id=demo_user_id,
+                kind="abtest",
+                dedupe_key="c" * 64,
+                status=JOB_QUEUED,
+                created_at=long_ago,
+            ),
+        ]
+    )
+    db.session.commit()
+
+    resp = client.post(
+        "/api/analysis/jobs", json={"kind": "regression", "params": params}
+    )
+    assert resp.get_json()["deduplicated"] is False
+    for job_id in ("b" * 32, "c" * 32):
+        job = client.get(f"/api/analysis/jobs/{job_id}").get_json()
+        assert job["status"] == "failed"
+        assert job["error"] == "timed out"
+    # a worker picking up the timed-out queued job leaves it alone
+    jobs._run(app, "c" * 32, lambda params: 1 / 0, {})
+    assert client.get(f"/api/analysis/jobs/{'c' * 32}").get_json()["status"] == "failed"
@@ -0,0 +1,102 @@
+# tests/test_metrics.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from main import metrics
+from models import Transaction, User
+from tests.conftest import DEMO_PASSWORD
+
+
+@pytest.fixture
+def metrics_app(monkeypatch, fresh_schema):
+    from app import create_app
+    from tests.conftest import build_schema, test_config
+
+    monkeypatch.setenv("METRICS_ENABLED", "1")
+    # restored afterwards so the shared app stays uninstrumented
+    monkeypatch.setattr(metrics, "_enabled", False)
+    app = create_app()
+    app.config.update(test_config)
+    with app.app_context():
+        # the same database as the shared app's on Postgres; fresh_schema
+        # rebuilds it afterwards
+        build_schema(db.engine)
+        demo = User.query.filter_by(name="demo_user").one()
+        for i in range(20):
+            db.session.add(
+                Transaction(
+                    user_id=demo.id,
+                    date_time=datetime(2025, 6, 1) + timedelta(hours=7 * i),
+                    amount=100 + (i * 13) % 50,
+                )
+            )
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def test_histogram_exposition_is_cumulative():
+    histogram = metrics.Histogram("t_seconds", "Test", ("op",), buckets=(0.1, 1))
+    histogram.observe(0.05, "a")
+    histogram.observe(0.5, "a")
+    histogram.observe(5, "a")
+    registry = metrics.Registry()
+    registry.register(histogram)
+    counter = registry.register(metrics.Counter("t_total", "Things", ("k",)))
+    counter.inc('q"x')
+    text = registry.exposition()
+    assert "# TYPE t_seconds histogram" in text
+    assert 't_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 't_seconds_bucket{op="a",le="1.0"} 2' in text
+    assert 't_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 't_seconds_count{op="a"} 3' in text
+    assert 't_seconds_sum{op="a"} 5.55' in text
+    assert 't_total{k="q\\"x"} 1' in text
+
+
+def test_span_is_a_no_op_when_disabled(monkeypatch):
+    monkeypatch.setattr(metrics, "_enabled", False)
+    before = list(metrics.SPAN_DURATION.samples())
+    with metrics.span("test.disabled"):
+        pass
+    assert list(metrics.SPAN_DURATION.samples()) == before
+
+
+def test_metrics_endpoint_reports_requests_sql_and_spans(metrics_app):
+    client = metrics_app.test_client()
+    resp = client.post(
+        "/api/login", json={"email": "demo_user", "password": DEMO_PASSWORD}
+    )
+    assert resp.status_code == 200
+    assert client.get("/api/analysis/regression").status_code == 200
+    assert client.get("/api/analysis/abtest").status_code == 200
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert (
+        'http_request_duration_seconds_count{endpoint="api.api_regression",'
+        'method="GET",status="200"}'
+    ) in text
+    assert 'db_query_duration_seconds_count{statement="SELECT"}' in text
+    assert "db_pool_checkout_seconds_count" in text
+    for stage in ("fetch", "filter", "stats", "chart", "encode"):
+        assert f'span_duration_seconds_count{{span="regression.{stage}"}}' in text
+    assert 'span_duration_seconds_count{span="abtest.chart"}' in text
+    assert 'result_cache_requests_total{result="misses"}' in text
+    assert 'singleflight_calls{kind="executions"}' in text
+
+
+def test_metrics_token(metrics_app, monkeypatch):
+    from app import create_app
+
+    monkeypatch.setenv("METRICS_TOKEN", "s3cret")
+    app = create_app()
+    client = app.test_client()
+    assert client.get("/metrics").status_code == 401
+    resp = client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert resp.status_code == 200
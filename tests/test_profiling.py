@@ -0,0 +1,106 @@
+# tests/test_profiling.py
+import pstats
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import Transaction, User
+from tests.conftest import DEMO_PASSWORD
+
+TOKEN = "prof-token"
+
+
+@pytest.fixture
+def profiling_app(monkeypatch, tmp_path, fresh_schema):
+    from app import create_app
+    from tests.conftest import build_schema, test_config
+
+    monkeypatch.setenv("PROFILING_ENABLED", "1")
+    monkeypatch.setenv("PROFILING_TOKEN", TOKEN)
+    monkeypatch.setenv("PROFILE_DIR", str(tmp_path))
+    monkeypatch.setenv("PROFILE_KEEP", "2")
+    app = create_app()
+    app.config.update(test_config)
+    with app.app_context():
+        # the same database as the shared app's on Postgres; fresh_schema
+        # rebuilds it afterwards
+        build_schema(db.engine)
+        demo = User.query.filter_by(name="demo_user").one()
+        db.session.add(
+            Transaction(user_id=demo.id, date_time=datetime(2025, 6, 1), amount=120)
+        )
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+def _login(client):
+    resp = client.post(
+        "/api/login", json={"email": "demo_user", "password": DEMO_PASSWORD}
+    )
+    assert resp.status_code == 200
+
+
+def test_untagged_requests_are_not_profiled(profiling_app, tmp_path):
+    client = profiling_app.test_client()
+    _login(client)
+    resp = client.get("/api/transactions")
+    assert resp.status_code == 200
+    assert "X-Profile-Id" not in resp.headers
+    resp = client.get("/api/transactions", headers={"X-Profile": "wrong"})
+    assert "X-Profile-Id" not in resp.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_tagged_request_is_profiled_with_sql(profiling_app, tmp_path):
+    client = profiling_app.test_client()
+    _login(client)
+    resp = client.get("/api/transactions", headers={"X-Profile": TOKEN})
+    assert resp.status_code == 200
+    profile_id = resp.headers["X-Profile-Id"]
+
+    resp = client.get(f"/api/profiles/{profile_id}", headers={"X-Profile": TOKEN})
+    assert resp.status_code == 200
+    summary = resp.get_json()
+    assert summary["endpoint"] == "api.list_transactions"
+    assert summary["status"] == 200
+    assert summary["sql_count"] >= 1
+    assert any("FROM transactions" in q["statement"] for q in summary["sql"])
+    assert all(q["duration_ms"] is not None for q in summary["sql"])
+    assert summary["top_functions"]
+
+    resp = client.get(
+        f"/api/profiles/{profile_id}?format=pstats", headers={"X-Profile": TOKEN}
+    )
+    assert resp.status_code == 200
+    stats = pstats.Stats(str(tmp_path / f"{profile_id}.pstats"))
+    assert stats.total_calls > 0
+
+
+def test_profile_download_requires_token(profiling_app):
+    client = profiling_app.test_client()
+    resp = client.get("/api/transactions?_profile=" + TOKEN)
+    profile_id = resp.headers["X-Profile-Id"]
+    assert client.get(f"/api/profiles/{profile_id}").status_code == 403
+    resp = client.get(f"/api/profiles/{profile_id}", headers={"X-Profile": "nope"})
+    assert resp.status_code == 403
+    resp = client.get("/api/profiles/../secret", headers={"X-Profile": TOKEN})
+    assert resp.status_code == 404
+    resp = client.get("/api/profiles/" + "0" * 32, headers={"X-Profile": TOKEN})
+    assert resp.status_code == 404
+
+
+def test_only_newest_profiles_are_kept(profiling_app, tmp_path):
+    client = profiling_app.test_client()
+    for _ in range(4):
+        client.get("/api/transactions", headers={"X-Profile": TOKEN})
+    assert len(list(tmp_path.glob("*.json"))) == 2
+    assert len(list(tmp_path.glob("*.pstats"))) == 2
+
+
+def test_profiling_disabled_by_default(app):
+    assert app.config["PROFILING_ENABLED"] is False
+    resp = app.test_client().get("/api/profiles/" + "0" * 32)
+    assert resp.status_code == 404
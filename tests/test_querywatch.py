@@ -0,0 +1,124 @@
+# tests/test_querywatch.py
+import logging
+from datetime import datetime, timedelta
+
+import pytest
+
+from extensions import db
+from main.querywatch import watch_queries
+from models import Transaction, User
+
+
+def add_users(users=4, per_user=3):
+    """The demo user plus users - 1 more, each with per_user transactions."""
+    ids = [
+        db.session.execute(db.select(User.id).filter_by(name="demo_user")).scalar_one()
+    ]
+    for i in range(1, users):
+        user = User(name=f"user{i}", password_hash="x")
+        db.session.add(user)
+        db.session.flush()
+        ids.append(user.id)
+    for user_id in ids:
+        for j in range(per_user):
+            db.session.add(
+                Transaction(
+                    user_id=user_id,
+                    date_time=datetime(2025, 6, 1) + timedelta(days=j),
+                    amount=100 + 10 * j,
+                )
+            )
+    db.session.commit()
+
+
+def test_lazy_relationship_loop_is_reported_as_repeated(app, db_session):
+    add_users()
+    with app.app_context():
+        with watch_queries() as log:
+            for user in User.query.all():
+                len(user.transactions)
+        assert len(log) == 5
+        [(statement, count)] = log.repeated().items()
+        assert count == 4
+        assert "FROM transactions" in statement
+        assert "possible N+1" in log.report()
+
+
+def test_nested_watches_both_record(app, db_session):
+    add_users(users=1)
+    with app.app_context():
+        with watch_queries() as outer:
+            User.query.all()
+            with watch_queries() as inner:
+                Transaction.query.all()
+        assert len(outer) == 2
+        assert len(inner) == 1
+    with watch_queries() as idle:
+        pass
+    assert len(idle) == 0
+
+
+def test_endpoints_stay_within_query_budget(
+    client, app, query_budget, db_session, login
+):
+    add_users()
+    login(client)
+    with query_budget(2):
+        assert client.get("/api/transactions?include=total").status_code == 200
+    with query_budget(3):
+        assert client.get("/api/analysis/regression").status_code == 200
+    with app.app_context():
+        txn_id = db.session.execute(db.select(Transaction.id)).scalars().first()
+    with query_budget(4):
+        resp = client.put(f"/api/transactions/{txn_id}", json={"amount": 1})
+        assert resp.status_code == 200
+
+
+def test_query_budget_fails_when_exceeded(app, query_budget, db_session):
+    add_users()
+    with app.app_context():
+        with pytest.raises(AssertionError, match="over budget of 1"):
+            with query_budget(1, max_repeats=10):
+                for user in User.query.all():
+                    len(user.transactions)
+        with pytest.raises(AssertionError, match="possible N\\+1"):
+            with query_budget(100):
+                for user in User.query.all():
+                    len(user.transactions)
+
+
+def test_request_watch_counts_and_warns(monkeypatch, caplog, fresh_schema):
+    from app import create_app
+    from tests.conftest import DEMO_PASSWORD, build_schema, test_config
+
+    monkeypatch.setenv("QUERY_WATCH_ENABLED", "1")
+    monkeypatch.setenv("QUERY_WATCH_REPEAT", "2")
+    app = create_app()
+    app.config.update(test_config)
+
+    def n_plus_one():
+        return {u.name: len(u.transactions) for u in User.query.all()}
+
+    app.add_url_rule("/n-plus-one", "n_plus_one", n_plus_one)
+    with app.app_context():
+        build_schema(db.engine)
+        add_users(users=3)
+    client = app.test_client()
+
+    with caplog.at_level(logging.WARNING):
+        resp = client.get("/n-plus-one")
+    assert resp.status_code == 200
+    assert resp.headers["X-Query-Count"] == "4"
+    assert "GET /n-plus-one" in caplog.text
+    assert "repeated 3x (possible N+1)" in caplog.text
+
+    caplog.clear()
+    app.config["SLOW_QUERY_MS"] = 0
+    with caplog.at_level(logging.WARNING):
+        resp = client.post(
+            "/api/login", json={"email": "demo_user", "password": DEMO_PASSWORD}
+        )
+    assert resp.headers["X-Query-Count"] == "1"
+    assert "slow (" in caplog.text
+    with app.app_context():
+        db.drop_all()
@@ -0,0 +1,103 @@
+# tests/test_search.py
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_mock_engine
+
+from extensions import db
+from models import Transaction
+
+DESCRIPTIONS = [
+    "Coffee beans",
+    "coffee coffee coffee",
+    "Grocery run",
+    "Refund 100% coffee",
+    "Office_supplies",
+]
+
+
+def transaction_rows():
+    return [
+        {
+            "date_time": datetime(2025, 6, 1) + timedelta(days=i),
+            "amount": 10 + i,
+            "description": description,
+        }
+        for i, description in enumerate(DESCRIPTIONS)
+    ]
+
+
+def search(client, **params):
+    resp = client.get("/api/transactions/search", query_string=params)
+    assert resp.status_code == 200, resp.get_json()
+    return resp.get_json()
+
+
+def found(client, **params):
+    return [r["id"] for r in search(client, **params)["results"]]
+
+
+def test_fts_matches_words_and_ranks_best_first(client, add_transactions, login):
+    seeded = add_transactions(transaction_rows())
+    login(client)
+    body = search(client, q="COFFEE")
+    assert body["mode"] == "fts"
+    ids = [r["id"] for r in body["results"]]
+    assert sorted(ids) == [seeded[0], seeded[1], seeded[3]]
+    # the description repeating the term ranks first
+    assert ids[0] == seeded[1]
+    ranks = [r["rank"] for r in body["results"]]
+    assert ranks == sorted(ranks, reverse=True)
+    assert body["results"][0]["dateTime"] == "2025-06-02T00:00:00"
+
+    assert found(client, q="coffee refund") == [seeded[3]]
+    assert found(client, q="coffee", limit=1, offset=1) == ids[1:2]
+    # FTS operators in user input are treated as plain words
+    assert search(client, q='coffee" OR "grocery')["results"] == []
+
+
+def test_fts_index_follows_updates_and_deletes(client, add_transactions, login):
+    seeded = add_transactions(transaction_rows())
+    login(client)
+    db.session.get(Transaction, seeded[2]).description = "Tea leaves"
+    db.session.commit()
+    client.delete(f"/api/transactions/{seeded[0]}")
+    assert found(client, q="tea") == [seeded[2]]
+    assert found(client, q="grocery") == []
+    assert sorted(found(client, q="coffee")) == [seeded[1], seeded[3]]
+
+
+def test_substring_mode_matches_literally(client, add_transactions, login):
+    seeded = add_transactions(transaction_rows())
+    login(client)
+    assert found(client, q="ffee b", mode="substring") == [seeded[0]]
+    assert found(client, q="0%", mode="substring") == [seeded[3]]
+    assert found(client, q="e_s", mode="substring") == [seeded[4]]
+    assert found(client, q="%", mode="substring")[0] == seeded[3]
+
+
+def test_search_rejects_bad_params(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    url = "/api/transactions/search"
+    assert client.get(url).status_code == 400
+    assert client.get(url, query_string={"q": "x", "mode": "regex"}).status_code == 400
+    assert client.get(url, query_string={"q": "x", "limit": "0"}).status_code == 400
+    assert client.get(url, query_string={"q": "x", "offset": "a"}).status_code == 400
+
+
+def test_create_all_builds_the_postgres_search_column_and_indexes():
+    # databases built without the migrations (seed.py, the tests' Postgres
+    # template) need description_tsv too
+    statements = []
+    engine = create_mock_engine(
+        "postgresql://",
+        lambda sql, *args, **kw: statements.append(
+            str(sql.compile(dialect=engine.dialect))
+        ),
+    )
+    db.metadata.create_all(engine, checkfirst=False)
+    ddl = "\n".join(statements)
+    assert "ADD COLUMN description_tsv tsvector GENERATED ALWAYS" in ddl
+    assert "ix_transactions_description_tsv" in ddl
+    assert "gin_trgm_ops" in ddl
+    assert ddl.index("CREATE TABLE transactions") < ddl.index("description_tsv")
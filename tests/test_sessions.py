@@ -0,0 +1,100 @@
+# tests/test_sessions.py
+from datetime import datetime, timedelta
+
+import pytest
+
+from auth.sessions import SQLSessionInterface
+from extensions import db
+from models import User, UserSession
+from tests.conftest import DEMO_PASSWORD, hash_password
+
+
+@pytest.fixture
+def sql_sessions(app, monkeypatch, fresh_schema):
+    """
+    Server-side sessions plus an other_user (id 2). The store commits on its
+    own connections, so these tests commit too and the schema is rebuilt.
+    """
+    store = SQLSessionInterface(cache_ttl=60)
+    monkeypatch.setattr(app, "session_interface", store)
+    with app.app_context():
+        db.session.add(
+            User(name="other_user", password_hash=hash_password(DEMO_PASSWORD))
+        )
+        db.session.commit()
+    return store
+
+
+def session_rows(app):
+    with app.app_context():
+        return db.session.execute(db.select(UserSession)).scalars().all()
+
+
+def test_sql_sessions_store_data_server_side(client, app, sql_sessions, login):
+    resp = login(client)
+    cookie = resp.headers["Set-Cookie"]
+    (row,) = session_rows(app)
+    assert row.user_id == 1
+    assert row.id in cookie
+    assert "user_id" not in cookie
+    assert client.get("/api/me").get_json() == {"id": 1, "name": "demo_user"}
+
+    # an unchanged session is neither rewritten nor re-sent
+    assert "Set-Cookie" not in client.get("/api/me").headers
+
+    client.post("/api/logout")
+    assert session_rows(app) == []
+    assert client.get("/api/me").status_code == 401
+
+
+def test_login_rotates_session_id(client, app, sql_sessions, login):
+    login(client)
+    (first,) = session_rows(app)
+    login(client, "other_user")
+    (second,) = session_rows(app)
+    assert second.id != first.id
+    assert second.user_id == 2
+
+
+def test_revoke_ends_every_session_of_the_user(app, sql_sessions, login):
+    laptop, phone, other = app.test_client(), app.test_client(), app.test_client()
+    login(laptop)
+    login(phone)
+    login(other, "other_user")
+
+    resp = laptop.post("/api/sessions/revoke")
+    assert resp.get_json() == {"revoked": 2}
+    assert phone.get("/api/me").status_code == 401
+    assert laptop.get("/api/me").status_code == 401
+    assert other.get("/api/me").status_code == 200
+    assert [row.user_id for row in session_rows(app)] == [2]
+
+
+def test_expired_sessions_are_ignored_and_swept(client, app, sql_sessions, login):
+    login(client)
+    sql_sessions._cache.clear()
+    with app.app_context():
+        row = db.session.execute(db.select(UserSession)).scalar_one()
+        row.expires_at = datetime.utcnow() - timedelta(seconds=1)
+        db.session.commit()
+        assert client.get("/api/me").status_code == 401
+        assert sql_sessions.sweep() == 1
+    assert session_rows(app) == []
+
+
+def test_revoke_needs_server_side_sessions(client, db_session, login):
+    login(client)
+    assert client.post("/api/sessions/revoke").status_code == 501
+
+
+def test_current_user_is_cached_across_requests(client, demo_user_id, login):
+    from auth.utils import forget_user
+
+    forget_user(demo_user_id)
+    login(client)
+    assert client.get("/api/me").get_json()["name"] == "demo_user"
+    db.session.get(User, demo_user_id).name = "renamed"
+    db.session.commit()
+    assert client.get("/api/me").get_json()["name"] == "demo_user"
+    forget_user(demo_user_id)
+    assert client.get("/api/me").get_json()["name"] == "renamed"
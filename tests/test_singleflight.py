@@ -0,0 +1,108 @@
+# tests/test_singleflight.py
+import threading
+import time
+
+import pytest
+
+from main.singleflight import SingleFlight
+from tests.conftest import DEMO_PASSWORD
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    executions = []
+
+    def slow(x):
+        executions.append(x)
+        started.set()
+        release.wait(5)
+        return {"value": x * 2}
+
+    results = []
+
+    def call():
+        results.append(flight.do("key", slow, 21))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(4)]
+    for t in followers:
+        t.start()
+    # wait until every follower has joined the in-flight call
+    deadline = time.monotonic() + 5
+    while flight.stats()["coalesced"] < 4 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for t in [leader] + followers:
+        t.join(5)
+
+    assert executions == [21]
+    assert results == [{"value": 42}] * 5
+    assert all(r is results[0] for r in results)
+    assert flight.stats() == {
+        "calls": 5,
+        "executions": 1,
+        "coalesced": 4,
+        "in_flight": 0,
+    }
+
+
+def test_errors_propagate_and_next_call_runs_fresh():
+    flight = SingleFlight()
+
+    def boom():
+        raise ValueError("bad")
+
+    with pytest.raises(ValueError):
+        flight.do("k", boom)
+    assert flight.do("k", lambda: 1) == 1
+    assert flight.stats()["executions"] == 2
+
+
+def test_regression_endpoint_coalesces_concurrent_requests(app, monkeypatch):
+    # reads the seeded demo user only: concurrent requests can't share the
+    # one connection of a rolled-back test
+    from main import api_routes
+
+    seed_called = threading.Event()
+    release = threading.Event()
+    calls = []
+    real = api_routes._compute_regression
+
+    def gated(*args):
+        calls.append(args)
+        seed_called.set()
+        release.wait(5)
+        return real(*args)
+
+    monkeypatch.setattr(api_routes, "_compute_regression", gated)
+    monkeypatch.setattr(api_routes, "analysis_flight", SingleFlight())
+
+    def request(out):
+        client = app.test_client()
+        client.post(
+            "/api/login", json={"email": "demo_user", "password": DEMO_PASSWORD}
+        )
+        out.append(client.get("/api/analysis/regression?period=all").status_code)
+
+    statuses = []
+    first = threading.Thread(target=request, args=(statuses,))
+    first.start()
+    assert seed_called.wait(5)
+    second = threading.Thread(target=request, args=(statuses,))
+    second.start()
+    deadline = time.monotonic() + 5
+    while (
+        api_routes.analysis_flight.stats()["coalesced"] < 1
+        and time.monotonic() < deadline
+    ):
+        time.sleep(0.01)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert statuses == [200, 200]
+    assert len(calls) == 1
@@ -0,0 +1,62 @@
+# tests/test_sqltiming.py
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from main import sqltiming
+from main.querywatch import watch_queries
+
+
+@pytest.fixture
+def timed():
+    """Statements reported to a subscribed listener, as (statement, seconds)."""
+    seen = []
+
+    def listener(conn, statement, parameters, many, seconds):
+        seen.append((statement, seconds))
+
+    sqltiming.subscribe(listener)
+    yield seen
+    sqltiming.unsubscribe(listener)
+
+
+def test_listeners_get_each_statement_once(timed):
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing"))
+        conn.execute(text("SELECT 2"))
+    engine.dispose()
+
+    assert [statement for statement, _ in timed] == ["SELECT 1", "SELECT 2"]
+    assert all(seconds >= 0 for _, seconds in timed)
+
+
+def test_unsubscribed_listeners_are_not_called():
+    seen = []
+
+    def listener(conn, statement, parameters, many, seconds):
+        seen.append(statement)
+
+    engine = create_engine("sqlite://")
+    sqltiming.subscribe(listener)
+    sqltiming.subscribe(listener)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        sqltiming.unsubscribe(listener)
+        conn.execute(text("SELECT 2"))
+    engine.dispose()
+    assert seen == ["SELECT 1"]
+
+
+def test_one_set_of_engine_hooks_serves_every_feature(timed):
+    engine = create_engine("sqlite://")
+    with watch_queries() as log, engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    engine.dispose()
+
+    assert len(log) == 1 and timed == [("SELECT 1", timed[0][1])]
+    assert event.contains(
+        Engine, "after_cursor_execute", sqltiming._after_cursor_execute
+    )
@@ -1,38 +1,30 @@
 # tests/test_transactions.py
 
 from datetime import datetime
+from decimal import Decimal
 
-from werkzeug.security import generate_password_hash
+import numpy as np
+import pytest
+from flask.json.provider import DefaultJSONProvider
 
-from extensions import db
-from models import Transaction, User
+from main.json_provider import OrjsonProvider, orjson
+from models import Transaction
 
 
-def seed_demo_user_txn(app):
-    """Helper to seed a demo user and a single transaction for testing."""
-    with app.app_context():
-        db.drop_all()
-        db.create_all()
-        user = User(
-            name="demo_user", password_hash=generate_password_hash("password123")
-        )
-        db.session.add(user)
-        db.session.commit()
-        txn = Transaction(
-            user_id=user.id,
-            date_time=datetime.fromisoformat("2025-06-01T00:00:00"),
-            amount=100.0,
-        )
-        db.session.add(txn)
-        db.session.commit()
-        return user.id, txn.id
-
-
-def test_api_update_transaction(client, app):
+@pytest.fixture
+def demo_txn_id(add_transactions):
+    """A single transaction of the demo user's, for testing."""
+    (txn_id,) = add_transactions(
+        [{"date_time": datetime.fromisoformat("2025-06-01T00:00:00"), "amount": 100.0}]
+    )
+    return txn_id
+
+
+def test_api_update_transaction(client, demo_txn_id):
     """
     Update an existing transaction via PUT and verify the new values.
     """
-    user_id, txn_id = seed_demo_user_txn(app)
+    txn_id = demo_txn_id
 
     # Perform login
     resp_login = client.post(
@@ -51,20 +43,10 @@ def test_api_update_transaction(client, app):
     assert data.get("amount") == new_data["amount"]
 
 
-def test_api_update_nonexistent_transaction(client, app):
+def test_api_update_nonexistent_transaction(client, db_session):
     """
     Attempt to update a non-existent transaction and expect a 404.
     """
-    # Seed only the user
-    with app.app_context():
-        db.drop_all()
-        db.create_all()
-        user = User(
-            name="demo_user", password_hash=generate_password_hash("password123")
-        )
-        db.session.add(user)
-        db.session.commit()
-
     # Perform login
     resp_login = client.post(
         "/api/login", json={"email": "demo_user", "password": "password123"}
@@ -77,37 +59,130 @@ def test_api_update_nonexistent_transaction(client, app):
     assert "error" in resp.get_json()
 
 
-def test_api_create_transaction(client, app):
+def test_api_create_transaction(client, app, db_session, login):
     """
     Creating a new transaction via POST should return 201 with the new payload
     and persist it to the database.
     """
-    # 1) Seed demo user (no transactions yet)
-    with app.app_context():
-        db.drop_all()
-        db.create_all()
-        user = User(name="demo_user", password_hash=generate_password_hash("pass"))
-        db.session.add(user)
-        db.session.commit()
-
-    # 2) Log in
-    resp = client.post("/api/login", json={"email": "demo_user", "password": "pass"})
-    assert resp.status_code == 200
+    # 1) Log in as the demo user (no transactions yet)
+    login(client)
 
-    # 3) POST a new transaction
+    # 2) POST a new transaction
     payload = {"dateTime": "2025-07-01T10:15:00", "amount": 42.50}
     resp = client.post("/api/transactions", json=payload)
 
-    # 4) It should 201 and return id, dateTime, amount
+    # 3) It should 201 and return id, dateTime, amount
     assert resp.status_code == 201
     data = resp.get_json()
     assert "id" in data
     assert data["dateTime"] == payload["dateTime"]
     assert data["amount"] == payload["amount"]
 
-    # 5) And the row should actually be in Postgres/SQLite
+    # 4) And the row should actually be in Postgres/SQLite
     with app.app_context():
         txn = Transaction.query.get(data["id"])
         assert txn is not None
         assert txn.amount == payload["amount"]
         assert txn.date_time.isoformat() == payload["dateTime"]
+
+
+def test_api_list_transactions_column_shape(client, demo_txn_id):
+    """
+    ?shape=columns returns one array per field, matching the row listing.
+    """
+    client.post("/api/login", json={"email": "demo_user", "password": "password123"})
+
+    rows = client.get("/api/transactions").get_json()
+    columns = client.get("/api/transactions?shape=columns").get_json()
+    assert columns == {
+        "id": [r["id"] for r in rows],
+        "dateTime": [r["dateTime"] for r in rows],
+        "amount": [r["amount"] for r in rows],
+        "description": [r["description"] for r in rows],
+    }
+    assert client.get("/api/transactions?shape=bogus").status_code == 400
+
+
+def test_orjson_provider_matches_default_output(app):
+    """
+    The orjson provider (when installed) encodes like the stdlib provider.
+    """
+    if orjson is None:
+        pytest.skip("orjson not installed")
+    payload = {"b": [1, 2.5, None], "a": {"dateTime": "2025-06-01T00:00:00"}}
+    default, fast = DefaultJSONProvider(app), OrjsonProvider(app)
+    with app.app_context():
+        # stdlib output only differs by a trailing newline
+        expected = default.response(payload).get_data().rstrip(b"\n")
+        assert fast.response(payload).get_data() == expected
+    assert fast.loads(fast.dumps(payload)) == payload
+    assert fast.loads(fast.dumps({"x": Decimal("1.50"), "y": np.float64(2.0)})) == {
+        "x": 1.5,
+        "y": 2.0,
+    }
+    assert isinstance(app.json, OrjsonProvider)
+
+
+@pytest.fixture
+def filter_transactions(add_transactions):
+    """Six transactions of the demo user's, of varied amounts and descriptions."""
+    return add_transactions(
+        {
+            "date_time": datetime(2025, 6, day, 12),
+            "amount": amount,
+            "description": description,
+        }
+        for day, amount, description in [
+            (1, 50, "coffee beans"),
+            (2, 120, "groceries"),
+            (3, 75.5, "Coffee shop"),
+            (4, 300, "rent 100%"),
+            (5, 10, None),
+            (6, 120, "groceries"),
+        ]
+    )
+
+
+def test_api_list_transactions_filters_sort_and_totals(client, filter_transactions):
+    """
+    Filters, sort and include=total,count are applied in SQL.
+    """
+    client.post("/api/login", json={"email": "demo_user", "password": "password123"})
+
+    resp = client.get(
+        "/api/transactions?min_amount=50&max_amount=200&sort=-amount,dateTime"
+        "&include=total,count"
+    )
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [t["amount"] for t in data["transactions"]] == [120.0, 120.0, 75.5, 50.0]
+    assert data["transactions"][0]["dateTime"] == "2025-06-02T12:00:00"
+    assert data["total"] == 365.5
+    assert data["count"] == 4
+
+    # case-insensitive substring, wildcards in q are literal
+    coffee = client.get("/api/transactions?q=COFFEE").get_json()
+    assert sorted(t["description"] for t in coffee) == ["Coffee shop", "coffee beans"]
+    literal = client.get("/api/transactions?q=100%25").get_json()
+    assert [t["description"] for t in literal] == ["rent 100%"]
+
+    window = client.get(
+        "/api/transactions?start=2025-06-03&end=2025-06-05T23:59&include=count"
+    ).get_json()
+    assert window["count"] == 3 and len(window["transactions"]) == 3
+
+    empty = client.get("/api/transactions?min_amount=1000&include=total,count")
+    assert empty.get_json() == {"transactions": [], "total": 0.0, "count": 0}
+
+
+def test_api_list_transactions_rejects_bad_filters(client, filter_transactions):
+    client.post("/api/login", json={"email": "demo_user", "password": "password123"})
+    for query in (
+        "min_amount=abc",
+        "start=yesterday",
+        "sort=description",
+        "include=avg",
+    ):
+        resp = client.get(f"/api/transactions?{query}")
+        assert resp.status_code == 400, query
+        assert "error" in resp.get_json()
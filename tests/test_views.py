@@ -0,0 +1,99 @@
+# tests/test_views.py
+from datetime import datetime, timedelta
+
+from extensions import db
+from models import Transaction
+
+
+def transaction_rows(n=5):
+    return [
+        {
+            "date_time": datetime(2025, 6, 1, 9) + timedelta(days=i),
+            "amount": 100 + i,
+            "description": f"txn {i}",
+        }
+        for i in range(n)
+    ]
+
+
+def test_transactions_page_is_paged_with_sql_total(
+    client, app, add_transactions, login
+):
+    add_transactions(transaction_rows(n=7))
+    app.config["TRANSACTIONS_PER_PAGE"] = 3
+    login(client)
+    first = client.get("/transactions").get_data(as_text=True)
+    assert "2025-06-01 09:00:00" in first
+    assert "2025-06-04 09:00:00" not in first
+    # total covers every row, not just this page
+    assert "721.00" in first
+    assert "Page 1 of 3" in first
+
+    last = client.get("/transactions?page=3").get_data(as_text=True)
+    assert "2025-06-07 09:00:00" in last
+    assert "2025-06-01 09:00:00" not in last
+    assert client.get("/transactions?page=4").status_code == 404
+
+
+def test_add_edit_delete_use_the_database(client, app, add_transactions, login):
+    ids = add_transactions(transaction_rows())
+    login(client)
+    resp = client.post("/add", data={"dateTime": "2025-07-01T10:30", "amount": "42"})
+    assert resp.status_code == 302
+    with app.app_context():
+        txn = db.session.execute(
+            db.select(Transaction).order_by(Transaction.id.desc())
+        ).scalar()
+        new_id = txn.id
+        assert new_id not in ids
+        assert float(txn.amount) == 42.0
+        assert txn.date_time == datetime(2025, 7, 1, 10, 30)
+
+    second, third = ids[1], ids[2]
+    assert "2025-06-02T09:00" in client.get(f"/edit/{second}").get_data(as_text=True)
+    edit = {"date": "2025-06-02T11:00", "amount": "7.5"}
+    assert client.post(f"/edit/{second}", data=edit).status_code == 302
+    bad = {"date": "x", "amount": "1"}
+    assert client.post(f"/edit/{second}", data=bad).status_code == 400
+    assert client.get(f"/edit/{new_id + 1}").status_code == 404
+
+    assert client.get(f"/delete/{third}").status_code == 302
+    with app.app_context():
+        assert db.session.get(Transaction, third) is None
+        txn = db.session.get(Transaction, second)
+        assert (txn.date_time, float(txn.amount)) == (datetime(2025, 6, 2, 11), 7.5)
+
+
+def test_search_redirects_to_filtered_listing(client, add_transactions, login):
+    add_transactions(transaction_rows())
+    login(client)
+    resp = client.post("/search", data={"min_amount": "101", "max_amount": "102"})
+    assert resp.status_code == 302
+    page = client.get(resp.headers["Location"]).get_data(as_text=True)
+    assert "2025-06-02 09:00:00" in page
+    assert "2025-06-03 09:00:00" in page
+    assert "2025-06-01 09:00:00" not in page
+    assert "203.00" in page
+    assert client.post("/search", data={"min_amount": "a"}).status_code == 400
+
+
+def test_transactions_page_streams_every_row_with_per_page_zero(
+    client, add_transactions, login
+):
+    add_transactions(transaction_rows(n=7))
+    login(client)
+    resp = client.get("/transactions?per_page=0&min_amount=102")
+    assert resp.is_streamed
+    assert resp.mimetype == "text/html"
+    page = resp.get_data(as_text=True)
+    assert page.count("/edit/") == 5
+    assert "520.00" in page
+    assert "Page 1 of" not in page
+
+
+def test_streamed_template_output_is_joined_into_chunks():
+    from main.routes import _chunked
+
+    parts = ["ab", "cd", "e", "fghij", "k"]
+    assert list(_chunked(iter(parts), size=4)) == ["abcd", "efghij", "k"]
+    assert list(_chunked(iter([]), size=4)) == []